@@ -0,0 +1,163 @@
+"""
+Bearer token verification shared by every authenticated route.
+
+Supabase access tokens are JWTs, so they can be checked locally instead of
+calling /auth/v1/user on every request: HS256 tokens with the project's JWT
+secret, asymmetric ones against the project's JWKS (fetched once and
+cached). Verified tokens are kept in a TTL cache that never outlives the
+token's own expiry. The remote check is only used when neither a secret
+nor a JWKS key can verify the token.
+
+Configuration (environment variables):
+    SUPABASE_JWT_SECRET   project JWT secret for HS256 tokens (optional)
+    SUPABASE_JWKS_URL     JWKS endpoint (default <SUPABASE_URL>/auth/v1/.well-known/jwks.json)
+    AUTH_JWT_AUDIENCE     expected audience claim (default "authenticated")
+    AUTH_CACHE_TTL        seconds a verified token is cached (default 60)
+    AUTH_CACHE_SIZE       max cached tokens (default 10000)
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+import jwt
+from fastapi import HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from .database import get_supabase, supabase_url
+
+SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET", "")
+SUPABASE_JWKS_URL = os.getenv("SUPABASE_JWKS_URL", f"{supabase_url}/auth/v1/.well-known/jwks.json")
+AUTH_JWT_AUDIENCE = os.getenv("AUTH_JWT_AUDIENCE", "authenticated")
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "60"))
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+
+ASYMMETRIC_ALGORITHMS = ["RS256", "ES256", "EdDSA"]
+
+class TokenCache:
+    """
+    LRU of token -> user, each entry valid until its own deadline
+    """
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            user, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return user
+
+    def set(self, token: str, user: Dict, expires_at: float) -> None:
+        with self._lock:
+            self._entries[token] = (user, expires_at)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+token_cache = TokenCache(AUTH_CACHE_SIZE)
+auth_counters = {"cache_hits": 0, "local_verifications": 0, "remote_verifications": 0, "rejected": 0}
+
+_jwks_client: Optional[jwt.PyJWKClient] = None
+
+def _get_jwks_client() -> jwt.PyJWKClient:
+    global _jwks_client
+    if _jwks_client is None:
+        _jwks_client = jwt.PyJWKClient(SUPABASE_JWKS_URL, cache_keys=True, lifespan=3600)
+    return _jwks_client
+
+def _user_from_claims(claims: Dict) -> Dict:
+    return {
+        "id": claims["sub"],
+        "email": claims.get("email"),
+        "role": claims.get("role"),
+        "aud": claims.get("aud"),
+        "exp": claims.get("exp")
+    }
+
+async def _verify_locally(token: str) -> Optional[Dict]:
+    """
+    Verify signature, expiry and audience without a network call. Returns
+    None when no local key material can verify this token.
+    """
+    algorithm = jwt.get_unverified_header(token).get("alg")
+    if algorithm == "HS256" and SUPABASE_JWT_SECRET:
+        return jwt.decode(token, SUPABASE_JWT_SECRET, algorithms=["HS256"], audience=AUTH_JWT_AUDIENCE)
+    if algorithm in ASYMMETRIC_ALGORITHMS and supabase_url:
+        try:
+            # PyJWKClient caches the key set, so this only hits the network on a new kid
+            signing_key = await run_in_threadpool(_get_jwks_client().get_signing_key_from_jwt, token)
+        except jwt.PyJWKClientError:
+            return None
+        return jwt.decode(token, signing_key.key, algorithms=[algorithm], audience=AUTH_JWT_AUDIENCE)
+    return None
+
+async def _verify_remotely(token: str) -> Dict:
+    response = await run_in_threadpool(get_supabase().auth.get_user, token)
+    user = response.user
+    # the token is already known to be valid; only its exp claim is read unverified
+    claims = jwt.decode(token, options={"verify_signature": False})
+    return {
+        "id": user.id,
+        "email": user.email,
+        "role": user.role,
+        "aud": user.aud,
+        "exp": claims.get("exp")
+    }
+
+async def verify_token(token: str) -> Dict:
+    """
+    Return the user behind an access token, raising HTTPException(401) if
+    the token is invalid or expired
+    """
+    user = token_cache.get(token)
+    if user is not None:
+        auth_counters["cache_hits"] += 1
+        return user
+
+    try:
+        claims = await _verify_locally(token)
+        if claims is not None:
+            user = _user_from_claims(claims)
+            auth_counters["local_verifications"] += 1
+        else:
+            user = await _verify_remotely(token)
+            auth_counters["remote_verifications"] += 1
+    except Exception as e:
+        auth_counters["rejected"] += 1
+        raise HTTPException(status_code=401, detail=f"Invalid or expired token: {str(e)}")
+
+    expires_at = time.time() + AUTH_CACHE_TTL
+    if user.get("exp"):
+        expires_at = min(expires_at, float(user["exp"]))
+    token_cache.set(token, user, expires_at)
+    return user
+
+def bearer_token(request: Request) -> str:
+    """
+    Extract the token from the Authorization header
+    """
+    auth_header = request.headers.get("Authorization")
+    if not auth_header:
+        raise HTTPException(status_code=401, detail="Authorization header is missing")
+    if not auth_header.startswith("Bearer "):
+        raise HTTPException(status_code=401, detail="Invalid authorization header format. Must be 'Bearer <token>'")
+    return auth_header.split(" ")[1]
+
+async def get_current_user(request: Request) -> Dict:
+    """
+    FastAPI dependency resolving the authenticated user of a request
+    """
+    return await verify_token(bearer_token(request))
+
+def auth_stats() -> Dict:
+    return {**auth_counters, "cached_tokens": len(token_cache)}
@@ -0,0 +1,60 @@
+"""
+Shared Supabase client used by every route and tool.
+
+A single client means one pooled HTTP session per Supabase service, so the
+many round trips of a processing job reuse kept-alive TLS connections. The
+client is created in the FastAPI lifespan (init_supabase) and closed on
+shutdown; scripts that import the tools without running the app get it
+created lazily on first use.
+"""
+import os
+from typing import Optional
+from supabase import create_client, Client
+from supabase.lib.client_options import ClientOptions
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+supabase_url = os.getenv("SUPABASE_URL", "")
+supabase_key = os.getenv("SUPABASE_KEY", "")
+
+_client: Optional[Client] = None
+
+def init_supabase() -> Client:
+    """
+    Create the shared client and open its REST session up front
+    """
+    global _client
+    if _client is None:
+        _client = create_client(
+            supabase_url,
+            supabase_key,
+            options=ClientOptions(
+                persist_session=False,
+                auto_refresh_token=False,
+                postgrest_client_timeout=float(os.getenv("SUPABASE_TIMEOUT", "10"))
+            )
+        )
+        # the REST client is built lazily by supabase-py; build it now so
+        # the first request doesn't pay for it
+        _client.postgrest
+    return _client
+
+def get_supabase() -> Client:
+    """
+    Return the shared client, creating it if the lifespan has not run
+    """
+    return _client if _client is not None else init_supabase()
+
+def close_supabase() -> None:
+    """
+    Close the pooled HTTP sessions of the shared client
+    """
+    global _client
+    if _client is None:
+        return
+    _client.postgrest.aclose()
+    if _client._storage is not None:
+        _client.storage.aclose()
+    _client = None
@@ -5,5 +5,7 @@ router = APIRouter(prefix="/api/document", tags=["document"])
 # Import and include the extract_document route
 from .extract_document.extract_document import router as extract_document
 from .process_document.process_document import router as process_document
+from .process_document.process_documents import router as process_documents
 router.include_router(extract_document)
-router.include_router(process_document)
\ No newline at end of file
+router.include_router(process_document)
+router.include_router(process_documents)
\ No newline at end of file
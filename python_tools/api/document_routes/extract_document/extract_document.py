@@ -1,14 +1,98 @@
 from fastapi import APIRouter, HTTPException
-from PyPDF2 import PdfReader
-import io
-import requests
-from typing import Dict
+import os
+import hashlib
+import re
+import httpx
+from typing import BinaryIO, Dict, List, Optional, Tuple
 from pydantic import BaseModel, HttpUrl
+from fastapi.concurrency import run_in_threadpool
+from dotenv import load_dotenv
+from .pdf_text import NamedSpooledTemporaryFile, extract_pages, read_pdf_prefix
+
+# Load environment variables
+load_dotenv()
 
 router = APIRouter()
 
+# Download limits (environment variables, sizes in bytes, timeouts in seconds)
+DOCUMENT_MAX_BYTES = int(os.getenv("DOCUMENT_MAX_BYTES", str(50 * 1024 * 1024)))
+DOCUMENT_SPOOL_BYTES = int(os.getenv("DOCUMENT_SPOOL_BYTES", str(5 * 1024 * 1024)))
+DOCUMENT_CONNECT_TIMEOUT = float(os.getenv("DOCUMENT_CONNECT_TIMEOUT", "10"))
+DOCUMENT_READ_TIMEOUT = float(os.getenv("DOCUMENT_READ_TIMEOUT", "60"))
+
+# Pooled client so repeated downloads from the storage host reuse connections
+http_client = httpx.AsyncClient(
+    follow_redirects=True,
+    timeout=httpx.Timeout(DOCUMENT_READ_TIMEOUT, connect=DOCUMENT_CONNECT_TIMEOUT),
+    limits=httpx.Limits(max_connections=20, max_keepalive_connections=10)
+)
+
 class DocumentUrl(BaseModel):
     url: HttpUrl
+    # stop extracting once the joined page text reaches this many characters;
+    # None extracts every page
+    max_chars: Optional[int] = None
+
+class DocumentTooLarge(Exception):
+    """
+    Raised when a download exceeds DOCUMENT_MAX_BYTES
+    """
+
+async def download_document(url: str) -> Tuple[BinaryIO, str]:
+    """
+    Stream a document into a spooled temporary file, which stays in memory
+    up to DOCUMENT_SPOOL_BYTES and rolls over to a named file on disk after
+    that, which extract_pages hands to its pool workers as is. Aborts
+    once DOCUMENT_MAX_BYTES is exceeded.
+
+    Returns:
+        Tuple[BinaryIO, str]: the spooled file positioned at 0, and the sha256 of its bytes
+    """
+    spool = NamedSpooledTemporaryFile(max_size=DOCUMENT_SPOOL_BYTES, suffix=".pdf")
+    hasher = hashlib.sha256()
+    size = 0
+    try:
+        async with http_client.stream("GET", url) as response:
+            response.raise_for_status()  # Raise an exception for bad status codes
+
+            declared_size = int(response.headers.get("content-length") or 0)
+            if declared_size > DOCUMENT_MAX_BYTES:
+                raise DocumentTooLarge(f"Document is {declared_size} bytes, limit is {DOCUMENT_MAX_BYTES}")
+
+            async for chunk in response.aiter_bytes():
+                size += len(chunk)
+                if size > DOCUMENT_MAX_BYTES:
+                    raise DocumentTooLarge(f"Document exceeds the {DOCUMENT_MAX_BYTES} byte limit")
+                hasher.update(chunk)
+                spool.write(chunk)
+    except BaseException:
+        spool.close()
+        raise
+
+    spool.seek(0)
+    return spool, hasher.hexdigest()
+
+_WHITESPACE = re.compile(r"\s+")
+
+def fingerprint_document(file_hash: str, pages: List[str], total_pages: int) -> Dict:
+    """
+    Content fingerprint used for duplicate detection: a hash of the raw
+    bytes, and a hash of the case- and whitespace-normalized text so a
+    re-exported copy of the same document still matches.
+
+    The text hash is only set when pages holds the text of the whole
+    document. When a character budget stopped extraction early, two
+    documents sharing their first pages would otherwise match, so such a
+    document is matched on its file hash alone.
+    """
+    if len(pages) < total_pages:
+        return {"file_hash": file_hash, "text_hash": None}
+    normalized_text = _WHITESPACE.sub(" ", " ".join(page or "" for page in pages)).strip().lower()
+    return {
+        "file_hash": file_hash,
+        # scanned PDFs without a text layer would all share the empty-text hash
+        "text_hash": hashlib.sha256(normalized_text.encode("utf-8")).hexdigest() if normalized_text else None
+    }
 
 @router.post("/extract-document")
 async def extract_document(doc_url: DocumentUrl) -> Dict:
@@ -17,25 +101,27 @@ async def extract_document(doc_url: DocumentUrl) -> Dict:
     """
     try:
         # Fetch the document from the URL
-        response = requests.get(str(doc_url.url))
-        response.raise_for_status()  # Raise an exception for bad status codes
-        
-        # Create a PDF reader object
-        doc_file = io.BytesIO(response.content)
-        doc_reader = PdfReader(doc_file)
+        spool, file_hash = await download_document(str(doc_url.url))
         
-        # Extract text from each page
-        text_content = []
-        for page in doc_reader.pages:
-            text_content.append(page.extract_text())
+        # Extract text from each page off the event loop, reading from the spooled file
+        with spool:
+            if doc_url.max_chars:
+                total_pages, text_content = await run_in_threadpool(read_pdf_prefix, spool, doc_url.max_chars)
+            else:
+                text_content = await extract_pages(spool)
+                total_pages = len(text_content)
         
         return {
             "url": str(doc_url.url),
-            "total_pages": len(doc_reader.pages),
-            "content": text_content
+            "total_pages": total_pages,
+            "pages_extracted": len(text_content),
+            "content": text_content,
+            "fingerprint": fingerprint_document(file_hash, text_content, total_pages)
         }
     
-    except requests.RequestException as e:
+    except DocumentTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except httpx.HTTPError as e:
         raise HTTPException(status_code=400, detail=f"Error fetching document: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing document: {str(e)}") 
\ No newline at end of file
@@ -0,0 +1,159 @@
+"""
+PDF text extraction, spread over a process pool for large documents.
+
+PyPDF2's extract_text is pure Python and CPU-bound. Small documents are
+extracted in a thread; documents with at least PDF_PARALLEL_MIN_PAGES pages
+are written to a temporary file and split into page ranges, each handled
+by a pool worker that opens the file once.
+
+Configuration (environment variables):
+    PDF_EXTRACT_WORKERS     size of the process pool (default: CPU count, 0 disables it)
+    PDF_PARALLEL_MIN_PAGES  page count from which the pool is used (default 20)
+
+Callers that only need a prompt's worth of text use read_pdf_prefix, which
+stops parsing once a character budget is filled.
+"""
+import asyncio
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+from fastapi.concurrency import run_in_threadpool
+from PyPDF2 import PdfReader
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", str(os.cpu_count() or 1)))
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "20"))
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+def iter_pdf_pages(doc_reader: PdfReader) -> Iterator[str]:
+    """
+    Lazily extract page texts in order; pages after the last one consumed
+    are never parsed
+    """
+    for page in doc_reader.pages:
+        yield page.extract_text()
+
+def read_pdf_prefix(stream: BinaryIO, max_chars: int) -> Tuple[int, List[str]]:
+    """
+    Extract pages only until their space-joined text reaches max_chars,
+    which is all the downstream prompts look at.
+
+    Returns:
+        Tuple[int, List[str]]: total page count of the document, and the texts of the pages read
+    """
+    doc_reader = PdfReader(stream)
+    pages, length = [], 0
+    for text in iter_pdf_pages(doc_reader):
+        pages.append(text)
+        length += len(text) + 1
+        if length >= max_chars:
+            break
+    return len(doc_reader.pages), pages
+
+def read_pdf_pages(stream: BinaryIO) -> List[str]:
+    """
+    Extract the text of every page of a PDF in the calling thread
+    """
+    return list(iter_pdf_pages(PdfReader(stream)))
+
+def extract_page_range(path: str, start: int, end: int) -> List[str]:
+    """
+    Pool worker: open the PDF once and extract pages [start, end)
+    """
+    with open(path, "rb") as f:
+        doc_reader = PdfReader(f)
+        return [doc_reader.pages[i].extract_text() for i in range(start, end)]
+
+def page_ranges(total_pages: int, parts: int) -> List[tuple]:
+    """
+    Split [0, total_pages) into at most `parts` contiguous, ordered ranges
+    """
+    parts = max(1, min(parts, total_pages))
+    size, extra = divmod(total_pages, parts)
+    ranges, start = [], 0
+    for i in range(parts):
+        end = start + size + (1 if i < extra else 0)
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=PDF_EXTRACT_WORKERS)
+    return _pool
+
+def shutdown_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+def _extract_if_small(stream: BinaryIO) -> Tuple[int, Optional[List[str]]]:
+    """
+    Open the PDF once; extract it right away unless it is big enough for the pool
+    """
+    doc_reader = PdfReader(stream)
+    total_pages = len(doc_reader.pages)
+    if PDF_EXTRACT_WORKERS > 0 and total_pages >= PDF_PARALLEL_MIN_PAGES:
+        stream.seek(0)
+        return total_pages, None
+    return total_pages, [page.extract_text() for page in doc_reader.pages]
+
+class NamedSpooledTemporaryFile(tempfile.SpooledTemporaryFile):
+    """
+    SpooledTemporaryFile that rolls over into a NamedTemporaryFile, so once
+    it is on disk the pool workers can open it by path instead of a copy
+    """
+    def rollover(self):
+        if self._rolled:
+            return
+        memory = self._file
+        self._file = tempfile.NamedTemporaryFile(**self._TemporaryFileArgs)
+        del self._TemporaryFileArgs
+        position = memory.tell()
+        self._file.write(memory.getvalue())
+        self._file.seek(position)
+        self._rolled = True
+
+def _spill_to_disk(stream: BinaryIO) -> Tuple[str, bool]:
+    """
+    A path the pool workers can open, and whether it is a copy to delete
+    afterwards. A stream already on disk under a name is used in place.
+    """
+    name = getattr(stream, "name", None)
+    if isinstance(name, str) and os.path.isfile(name):
+        stream.flush()
+        return name, False
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
+        shutil.copyfileobj(stream, f)
+        return f.name, True
+
+async def extract_pages(stream: BinaryIO) -> List[str]:
+    """
+    Extract the text of every page, in page order, without blocking the
+    event loop. Uses the process pool for documents of at least
+    PDF_PARALLEL_MIN_PAGES pages.
+    """
+    total_pages, text_content = await run_in_threadpool(_extract_if_small, stream)
+    if text_content is not None:
+        return text_content
+
+    path, is_copy = await run_in_threadpool(_spill_to_disk, stream)
+    try:
+        loop = asyncio.get_running_loop()
+        pool = get_pool()
+        chunks = await asyncio.gather(*[
+            loop.run_in_executor(pool, extract_page_range, path, start, end)
+            for start, end in page_ranges(total_pages, PDF_EXTRACT_WORKERS)
+        ])
+    finally:
+        if is_copy:
+            os.unlink(path)
+    return [text for chunk in chunks for text in chunk]
@@ -0,0 +1,239 @@
+"""
+In-process background queue and worker pool for document processing jobs.
+
+Jobs are pushed by POST /process-document?enqueue=true and picked up by a
+bounded pool of asyncio workers that run the same pipeline as the
+synchronous endpoint. Progress is visible through the document_jobs status
+column (pending -> in_progress -> parsed / failed).
+
+Every job a process holds (queued, running in a worker, or run inline by
+/process-document and /process-documents) has its last_run_at refreshed on
+each sweep, which acts as its lease. The sweep runs every
+DOCUMENT_JOB_SWEEP_INTERVAL seconds from the queue itself and reclaims
+pending/in_progress jobs whose lease is older than DOCUMENT_JOB_STALE_AFTER,
+i.e. whose process died, whether or not this process restarted since.
+
+Configuration (environment variables):
+    DOCUMENT_WORKERS             number of concurrent workers (default 2)
+    DOCUMENT_QUEUE_SIZE          max queued jobs before enqueue is rejected (default 100)
+    DOCUMENT_DRAIN_TIMEOUT       seconds to wait for queued jobs on shutdown (default 30)
+    DOCUMENT_JOB_STALE_AFTER     seconds without a lease refresh after which a
+                                 pending/in_progress job is considered orphaned (default 900)
+    DOCUMENT_JOB_SWEEP_INTERVAL  seconds between lease refreshes and recovery sweeps
+                                 (default 60, at most a third of DOCUMENT_JOB_STALE_AFTER)
+"""
+import asyncio
+import os
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Iterable, Iterator, List, Optional, Set
+from fastapi.concurrency import run_in_threadpool
+from .pipeline import run_pipeline
+from ...database import get_supabase
+
+@dataclass
+class DocumentJob:
+    document_url: str
+    job_id: str
+    user_id: str
+
+class JobQueueFull(Exception):
+    """
+    Raised when a job is enqueued while the queue is full or draining.
+    """
+
+# ids per heartbeat update, to keep the in.(...) filter within URL limits
+HEARTBEAT_BATCH = 200
+
+class DocumentJobQueue:
+    def __init__(self, concurrency: int, max_size: int, drain_timeout: float, stale_after: float, sweep_interval: float):
+        self.concurrency = concurrency
+        self.max_size = max_size
+        self.drain_timeout = drain_timeout
+        self.stale_after = stale_after
+        # a held job must be refreshed several times before it could look stale
+        self.sweep_interval = min(sweep_interval, stale_after / 3)
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._sweeper: Optional[asyncio.Task] = None
+        self._held: Set[str] = set()
+        self._accepting = False
+        self.counters = {"sweeps": 0, "recovered": 0, "heartbeat_errors": 0}
+
+    async def start(self) -> None:
+        """
+        Spawn the worker tasks, re-enqueue jobs orphaned by a previous crash
+        and start the periodic lease refresh and recovery sweep.
+        """
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._accepting = True
+        self._workers = [
+            asyncio.create_task(self._worker(i)) for i in range(self.concurrency)
+        ]
+        print(f"⚙️  Started {self.concurrency} document workers")
+        await self.recover_stuck_jobs()
+        self._sweeper = asyncio.create_task(self._sweep_loop())
+
+    def enqueue(self, job: DocumentJob) -> None:
+        if not self._accepting or self._queue is None:
+            raise JobQueueFull("Document queue is not accepting jobs")
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise JobQueueFull(f"Document queue is full ({self.max_size} jobs waiting)")
+        self._held.add(job.job_id)
+
+    @contextmanager
+    def holding(self, job_ids: Iterable[str]) -> Iterator[None]:
+        """
+        Keep the lease of jobs processed outside the worker pool for as long
+        as the block runs
+        """
+        job_ids = [str(job_id) for job_id in job_ids]
+        self._held.update(job_ids)
+        try:
+            yield
+        finally:
+            self._held.difference_update(job_ids)
+
+    async def drain(self) -> None:
+        """
+        Stop accepting jobs, give queued and running jobs drain_timeout
+        seconds to finish, then cancel the workers. Anything cut short stays
+        in_progress and is reclaimed by a recovery sweep once its lease expires.
+        """
+        if self._queue is None:
+            return
+        self._accepting = False
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            await asyncio.gather(self._sweeper, return_exceptions=True)
+            self._sweeper = None
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=self.drain_timeout)
+        except asyncio.TimeoutError:
+            print(f"⚠️  Drain timed out with {self._queue.qsize()} jobs still queued")
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def heartbeat(self) -> None:
+        """
+        Refresh last_run_at of every unfinished job this process holds
+        """
+        supabase = get_supabase()
+        held = sorted(self._held)
+        now = datetime.utcnow().isoformat()
+        for start in range(0, len(held), HEARTBEAT_BATCH):
+            try:
+                await run_in_threadpool(
+                    supabase.table("document_jobs")
+                    .update({"last_run_at": now})
+                    .in_("id", held[start:start + HEARTBEAT_BATCH])
+                    .in_("status", ["pending", "in_progress"])
+                    .execute
+                )
+            except Exception as e:
+                self.counters["heartbeat_errors"] += 1
+                print(f"🚨 Could not refresh document job leases: {str(e)}")
+
+    async def recover_stuck_jobs(self) -> int:
+        """
+        Re-enqueue jobs left pending or in_progress without a lease refresh
+        for longer than stale_after seconds, as many as the queue has room
+        for. The status is flipped back to pending with a conditional update
+        so that only one process claims each job.
+        """
+        room = self.max_size - self._queue.qsize() if self._queue else 0
+        if room <= 0:
+            return 0
+        supabase = get_supabase()
+        cutoff = (datetime.utcnow() - timedelta(seconds=self.stale_after)).isoformat()
+        try:
+            response = await run_in_threadpool(
+                supabase.table("document_jobs")
+                .select("id, user_id, file_url, status")
+                .in_("status", ["pending", "in_progress"])
+                .lt("last_run_at", cutoff)
+                .order("last_run_at")
+                .limit(room)
+                .execute
+            )
+        except Exception as e:
+            print(f"🚨 Could not look up stuck jobs: {str(e)}")
+            return 0
+
+        recovered = 0
+        for row in response.data or []:
+            if str(row["id"]) in self._held:
+                # still ours; a heartbeat must have failed
+                continue
+            claimed = await run_in_threadpool(
+                supabase.table("document_jobs")
+                .update({"status": "pending", "last_run_at": datetime.utcnow().isoformat()})
+                .eq("id", row["id"])
+                .eq("status", row["status"])
+                # not if its owner refreshed the lease since the lookup
+                .lt("last_run_at", cutoff)
+                .execute
+            )
+            if not claimed.data:
+                continue
+            try:
+                self.enqueue(DocumentJob(
+                    document_url=row["file_url"],
+                    job_id=str(row["id"]),
+                    user_id=row["user_id"]
+                ))
+                recovered += 1
+            except JobQueueFull:
+                break
+
+        if recovered:
+            self.counters["recovered"] += recovered
+            print(f"♻️  Recovered {recovered} stuck document jobs")
+        return recovered
+
+    def stats(self) -> dict:
+        return {
+            "workers": len(self._workers),
+            "queued": self._queue.qsize() if self._queue else 0,
+            "max_size": self.max_size,
+            "accepting": self._accepting,
+            "held_jobs": len(self._held),
+            "sweep_interval": self.sweep_interval,
+            **self.counters
+        }
+
+    async def _sweep_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                await self.heartbeat()
+                await self.recover_stuck_jobs()
+                self.counters["sweeps"] += 1
+            except Exception as e:
+                print(f"🚨 Document job sweep failed: {str(e)}")
+
+    async def _worker(self, worker_id: int) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                print(f"⚙️  worker {worker_id} picked up job {job.job_id}")
+                await run_pipeline(job.document_url, job.job_id, job.user_id)
+            except Exception as e:
+                # run_pipeline already marked the job as failed
+                print(f"❌ worker {worker_id} job {job.job_id} failed: {str(e)}")
+            finally:
+                self._held.discard(job.job_id)
+                self._queue.task_done()
+
+job_queue = DocumentJobQueue(
+    concurrency=int(os.getenv("DOCUMENT_WORKERS", "2")),
+    max_size=int(os.getenv("DOCUMENT_QUEUE_SIZE", "100")),
+    drain_timeout=float(os.getenv("DOCUMENT_DRAIN_TIMEOUT", "30")),
+    stale_after=float(os.getenv("DOCUMENT_JOB_STALE_AFTER", "900")),
+    sweep_interval=float(os.getenv("DOCUMENT_JOB_SWEEP_INTERVAL", "60"))
+)
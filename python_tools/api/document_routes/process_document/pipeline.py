@@ -0,0 +1,225 @@
+"""
+Runs the document processing stages end to end for one job.
+"""
+import os
+from typing import Dict, List, Optional
+from datetime import datetime
+from ..extract_document.extract_document import extract_document
+from ..extract_document.extract_document import DocumentUrl
+from .tools.validate_document import validate_document
+from .tools.extract_data import extract_data
+from .tools.classify_and_extract import classify_and_extract
+from .tools.save_document_results import save_document_results
+from .tools.update_in_db import update_in_db
+from .tools.create_journal_entry import create_journal_entry
+from .tools.create_ledger_entry import create_ledger_entry
+from .tools.find_duplicate import find_duplicate_document
+
+# "two_call" runs validate_document then extract_data; "combined" sends all
+# req_formats schemas once and gets the type and fields back together
+LLM_EXTRACTION_MODE = os.getenv("LLM_EXTRACTION_MODE", "two_call")
+
+# characters of document text the LLM prompts use (they slice full_text[:4000]);
+# extraction stops once this much text is read, 0 extracts every page
+DOCUMENT_TEXT_BUDGET = int(os.getenv("DOCUMENT_TEXT_BUDGET", "4000"))
+
+# what to do when a document's fingerprint matches one already parsed:
+# "reuse" points the job at the existing result, "flag" fails the job with
+# a duplicate message, "off" processes it again. A file can only be saved
+# once per user (migrations/008), so under "off" an identical file is still
+# analysed again but then reuses the saved result.
+DUPLICATE_DOCUMENT_POLICY = os.getenv("DUPLICATE_DOCUMENT_POLICY", "reuse")
+
+async def resolve_duplicate(fingerprint: Dict, job_id: str, user_id: str) -> Optional[Dict]:
+    """
+    Short-circuit a job whose document was already processed for this user.
+    Returns the job outcome when the duplicate policy handled it, or None
+    when the pipeline should run normally.
+    """
+    if DUPLICATE_DOCUMENT_POLICY == "off":
+        return None
+
+    duplicate = await find_duplicate_document(user_id, fingerprint)
+    if not duplicate or not duplicate["job"]:
+        return None
+    return await apply_duplicate_policy(duplicate["job"], job_id, user_id)
+
+async def resolve_saved_duplicate(duplicate_of: Dict, job_id: str, user_id: str) -> Dict:
+    """
+    Settle a job whose file save_document_results found already saved, by
+    an earlier or a concurrent call. Nothing was written for it, so under
+    "off" it reuses the saved result too.
+    """
+    if duplicate_of["job"] is None:
+        await mark_job_failed(job_id, f"Duplicate of document {duplicate_of['document_id']}, which has no parsed job")
+        return {"status": "duplicate_flagged", "user_id": user_id, "duplicate_of": duplicate_of}
+    policy = "flag" if DUPLICATE_DOCUMENT_POLICY == "flag" else "reuse"
+    return await apply_duplicate_policy(duplicate_of["job"], job_id, user_id, policy)
+
+async def apply_duplicate_policy(existing_job: Dict, job_id: str, user_id: str, policy: Optional[str] = None) -> Dict:
+    """
+    Point the job at existing_job's results, or fail it under "flag"
+    (policy defaults to DUPLICATE_DOCUMENT_POLICY)
+    """
+    policy = policy or DUPLICATE_DOCUMENT_POLICY
+    print("♻️", f"job {job_id} duplicates document {existing_job['document_id']}")
+    if policy == "flag":
+        await mark_job_failed(job_id, f"Duplicate of already processed document {existing_job['document_id']}")
+        status = "duplicate_flagged"
+    else:
+        await update_in_db(
+            item_id=str(job_id),
+            updated_data={
+                "status": "parsed",
+                "document_id": existing_job["document_id"],
+                "journal_entry_id": existing_job["journal_entry_id"],
+                "debit_ledger_entry_id": existing_job["debit_ledger_entry_id"],
+                "credit_ledger_entry_id": existing_job["credit_ledger_entry_id"]
+            },
+            table_name="document_jobs"
+        )
+        status = "duplicate"
+
+    return {
+        "status": status,
+        "user_id": user_id,
+        "duplicate_of": existing_job
+    }
+
+async def analyse_document(content: List[str], document_url: str, job_id: str, user_id: str, fingerprint: Optional[Dict] = None) -> Dict:
+    """
+    Run the LLM stages for one document: validation, data extraction and
+    journal entry creation. Nothing is written apart from job failures, so
+    callers decide how and when to persist the result.
+    """
+    if LLM_EXTRACTION_MODE == "combined":
+        # validate, classify and extract in one LLM call
+        combined = await classify_and_extract(content, job_id)
+        validation_results = combined["validation"]
+        extracted_data = combined["extraction"]
+        print("⭐⭐", validation_results)
+    else:
+        # Validate the document content
+        validation_results = await validate_document(content, job_id)
+        print("⭐⭐", validation_results)
+
+        # extract doc data
+        extracted_data = await extract_data(content, validation_results["document_type"], job_id)
+    complete_extracted_data = {}
+    complete_extracted_data["extracted_data"] = extracted_data["extracted_data"]
+    complete_extracted_data["document_type"] = validation_results["document_type"]
+    complete_extracted_data["file_url"] = str(document_url)
+    complete_extracted_data["user_id"] = user_id
+    complete_extracted_data["job_id"] = str(job_id)
+    if fingerprint:
+        complete_extracted_data["file_hash"] = fingerprint["file_hash"]
+        complete_extracted_data["text_hash"] = fingerprint["text_hash"]
+    print("⭐⭐⭐", complete_extracted_data)
+
+    # create journal entry
+    journal_entry = await create_journal_entry(complete_extracted_data, job_id)
+    print("⭐⭐⭐⭐⭐", journal_entry)
+    complete_journal_entry = journal_entry["journal_entries"]
+    complete_journal_entry["user_id"] = user_id
+
+    return {
+        "validation": validation_results,
+        "extracted_data": complete_extracted_data,
+        "journal_entry": complete_journal_entry
+    }
+
+async def build_result_item(analysis: Dict, job_id: str, user_id: str) -> Dict:
+    """
+    Assemble the rows save_document_results writes for one analysed document
+    """
+    complete_journal_entry = analysis["journal_entry"]
+    complete_journal_entry["entry_date"] = analysis["extracted_data"]["extracted_data"]["date"]
+    print("⭐⭐⭐⭐⭐⭐", complete_journal_entry)
+
+    # ledger entry 
+    # here we return two ledger entries for each of the account involved in the transaction.
+    ledger_entries = await create_ledger_entry(complete_journal_entry, job_id)
+    print("⭐⭐⭐⭐⭐⭐⭐⭐", ledger_entries)
+    if not ledger_entries["success"]:
+        raise Exception(f"Error creating ledger entry: {ledger_entries['error']}")
+    for entry in ledger_entries["ledger_entries"]:
+        entry["user_id"] = user_id
+
+    return {
+        "job_id": str(job_id),
+        "document": analysis["extracted_data"],
+        "journal_entry": complete_journal_entry,
+        "ledger_entries": ledger_entries["ledger_entries"]
+    }
+
+async def run_pipeline(document_url: str, job_id: str, user_id: str) -> Dict:
+    """
+    Run every processing stage for one document and record the outcome on
+    its document_jobs row. Shared by the synchronous endpoint and the
+    background workers in job_queue.
+    """
+    try:
+        # starting new process
+        print("⭐", "starting new process")
+        result = await update_in_db(
+            item_id=str(job_id),
+            updated_data={
+                "status": "in_progress",
+                "last_run_at": datetime.utcnow().isoformat()
+            },
+            table_name="document_jobs"
+        )
+
+        # Extract document content using the extract_document function
+        doc_data = await extract_document(DocumentUrl(url=document_url, max_chars=DOCUMENT_TEXT_BUDGET or None))
+
+        duplicate = await resolve_duplicate(doc_data["fingerprint"], job_id, user_id)
+        if duplicate:
+            duplicate["document_url"] = str(document_url)
+            return duplicate
+        
+        analysis = await analyse_document(doc_data["content"], document_url, job_id, user_id, doc_data["fingerprint"])
+        validation_results = analysis["validation"]
+        complete_extracted_data = analysis["extracted_data"]
+
+        # save document, journal entry and ledger entries in one transaction
+        item = await build_result_item(analysis, job_id, user_id)
+        saved = await save_document_results([item])
+        if not saved["success"]:
+            raise Exception(f"Error saving document results: {saved['error']}")
+        print("⭐⭐⭐⭐", saved["data"][0])
+        if saved["data"][0].get("duplicate_of"):
+            duplicate = await resolve_saved_duplicate(saved["data"][0]["duplicate_of"], job_id, user_id)
+            duplicate["document_url"] = str(document_url)
+            return duplicate
+
+        return {
+            "document_url": str(document_url),
+            "user_id": user_id,
+            "status": "completed" if validation_results["is_valid"] else "validation_failed",
+            "total_pages": doc_data["total_pages"],
+            "content": doc_data["content"],
+            "validation": validation_results,
+            "extracted_data": complete_extracted_data,
+            "journal_entry": item["journal_entry"],
+            "ledger_entries": item["ledger_entries"],
+            "saved": saved["data"][0]
+        }
+    
+    except Exception as e:
+        await mark_job_failed(job_id, str(e))
+        raise
+
+async def mark_job_failed(job_id: str, error_message: str) -> None:
+    """
+    Update the job status to failed with error message
+    """
+    await update_in_db(
+        item_id=str(job_id),
+        updated_data={
+            "status": "failed",
+            "error_message": error_message,
+            "last_run_at": datetime.utcnow().isoformat()
+        },
+        table_name="document_jobs"
+    )
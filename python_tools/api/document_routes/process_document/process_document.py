@@ -1,142 +1,105 @@
-from fastapi import APIRouter, HTTPException, Request
-import requests
-import os
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import JSONResponse
 from typing import Dict
 from pydantic import BaseModel, HttpUrl
-from datetime import datetime
-from ..extract_document.extract_document import extract_document
-from ..extract_document.extract_document import DocumentUrl
-from .tools.validate_document import validate_document
-from .tools.extract_data import extract_data
-from .tools.save_to_db import save_to_db
-from .tools.update_in_db import update_in_db
-from .tools.create_journal_entry import create_journal_entry
-from .tools.create_ledger_entry import create_ledger_entry
+from ...auth import get_current_user
+from .pipeline import run_pipeline
+from .job_queue import job_queue, DocumentJob, JobQueueFull
+from .tools.llm_cache import llm_cache
+from .tools.llm_gateway import gateway_stats
+from .tools.model_tiers import model_tier_stats
+from .tools.journal_rules import journal_rules
+from .tools.pattern_extractor import pattern_extractor
 
 router = APIRouter()
 
-supabase_url = os.getenv("SUPABASE_URL", "")
-supabase_key = os.getenv("SUPABASE_KEY", "")
-
 class DocumentRequest(BaseModel):
     document_url: HttpUrl
     job_id: str
 
 @router.post("/process-document")
-async def process_document(payload: DocumentRequest ,request: Request) -> Dict:
-    """
-    Process a document from the given URL for a specific user
+async def process_document(payload: DocumentRequest, enqueue: bool = False, user: Dict = Depends(get_current_user)):
     """
-    try:
-        auth_header = request.headers.get("Authorization")
-
-        response = requests.get(
-            f'{supabase_url}/auth/v1/user',
-            headers={
-                'Authorization': auth_header,
-                'apikey': supabase_key
-            }
-        )
-
-        user_data = response.json()
-        user_id = user_data["id"]
-
-        print("👉👉", user_id)
+    Process a document from the given URL for a specific user.
 
-        # starting new process
-        print("⭐", "starting new process")
-        result = await update_in_db(
-            item_id=str(payload.job_id),
-            updated_data={"status": "in_progress"},  # Only include the field you want to update
-            table_name="document_jobs"
+    With enqueue=true the job is handed to the background worker pool and
+    the endpoint returns 202 with the job_id straight away; progress is then
+    reported through the document_jobs status column.
+    """
+    user_id = user["id"]
+
+    print("👉👉", user_id)
+
+    if enqueue:
+        try:
+            job_queue.enqueue(DocumentJob(
+                document_url=str(payload.document_url),
+                job_id=str(payload.job_id),
+                user_id=user_id
+            ))
+        except JobQueueFull as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        return JSONResponse(
+            status_code=202,
+            content={"job_id": str(payload.job_id), "status": "pending"}
         )
 
-        # Extract document content using the extract_document function
-        doc_data = await extract_document(DocumentUrl(url=payload.document_url))
-        
-        # Validate the document content
-        validation_results = await validate_document(doc_data["content"], payload.job_id)
-        print("⭐⭐", validation_results)
-
-        # extract doc data
-        extracted_data = await extract_data(doc_data["content"], validation_results["document_type"], payload.job_id)
-        complete_extracted_data = {}
-        complete_extracted_data["extracted_data"] = extracted_data["extracted_data"]
-        complete_extracted_data["document_type"] = validation_results["document_type"]
-        complete_extracted_data["file_url"] = str(payload.document_url)
-        complete_extracted_data["user_id"] = user_id
-        complete_extracted_data["job_id"] = str(payload.job_id)
-        print("⭐⭐⭐", complete_extracted_data)
-
-        # save extracted data
-        saving_to_database = await save_to_db(user_id, complete_extracted_data, "documents")
-        print("⭐⭐⭐⭐", saving_to_database)
+    try:
+        with job_queue.holding([payload.job_id]):
+            return await run_pipeline(str(payload.document_url), str(payload.job_id), user_id)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing document: {str(e)}")
 
-        # create journal entry
-        journal_entry = await create_journal_entry(complete_extracted_data, payload.job_id)
-        print("⭐⭐⭐⭐⭐", journal_entry)
-        complete_journal_entry = journal_entry["journal_entries"]
-        complete_journal_entry["user_id"] = user_id
-        complete_journal_entry["entry_date"] = saving_to_database["data"][0]["extracted_data"]["date"]
-        complete_journal_entry["source_id"] = saving_to_database["data"][0]["id"]
-        print("⭐⭐⭐⭐⭐⭐", complete_journal_entry)
+@router.get("/queue-stats")
+async def queue_stats() -> Dict:
+    """
+    Report the background worker pool size and current queue depth
+    """
+    return job_queue.stats()
 
-        # save journal entry
-        save_journal_entry = await save_to_db(user_id, complete_journal_entry, "journal_entries")
-        print("⭐⭐⭐⭐⭐⭐⭐", save_journal_entry)
+@router.get("/llm-cache-stats")
+async def llm_cache_stats() -> Dict:
+    """
+    Report hit/miss counters and size of the LLM result cache
+    """
+    if llm_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **llm_cache.stats()}
 
-        # ledger entry 
-        # here we return two ledger entries for each of the account involved in the transaction.
-        ledger_entries = await create_ledger_entry(complete_journal_entry, payload.job_id)
-        print("⭐⭐⭐⭐⭐⭐⭐⭐", ledger_entries)
+@router.get("/llm-gateway-stats")
+async def llm_gateway_stats() -> Dict:
+    """
+    Report the adaptive concurrency limit, queue depth and wait times of
+    the LLM gateway
+    """
+    return gateway_stats()
 
-        # saving ledger entries
-        save_entry_results = []
-        for entry in ledger_entries["ledger_entries"]:
-            complete_entry = entry
-            complete_entry["user_id"] = user_id
-            complete_entry["journal_entry_id"] = save_journal_entry["data"][0]["id"]
-            save_entry = await save_to_db(user_id, complete_entry, "ledger_entries")
-            save_entry_results.append(save_entry)
-        
-        print("⭐⭐⭐⭐⭐⭐⭐⭐⭐", save_entry_results)
+@router.get("/model-tier-stats")
+async def model_tier_stats_route() -> Dict:
+    """
+    Report per stage which models answered, how often and why answers were
+    escalated to a larger model, and stage latency per model
+    """
+    return model_tier_stats()
 
-        # end of process
-        result = await update_in_db(
-            item_id=str(payload.job_id),
-            updated_data={
-                "status": "parsed",
-                "document_id": saving_to_database["data"][0]["id"],
-                "journal_entry_id": save_journal_entry["data"][0]["id"],
-                "debit_ledger_entry_id": save_entry_results[0]["data"][0]["id"],
-                "credit_ledger_entry_id": save_entry_results[1]["data"][0]["id"]
-                },
-            table_name="document_jobs"
-        )
+@router.get("/journal-rules-stats")
+async def journal_rules_stats() -> Dict:
+    """
+    Report how many journal entries the chart-of-accounts rules produced and
+    how often, and why, they fell back to the LLM
+    """
+    if journal_rules is None:
+        return {"enabled": False}
+    return {"enabled": True, **journal_rules.stats()}
 
-        return {
-            "document_url": str(payload.document_url),
-            "user_id": user_id,
-            "status": "completed" if validation_results["is_valid"] else "validation_failed",
-            "total_pages": doc_data["total_pages"],
-            "content": doc_data["content"],
-            "validation": validation_results,
-            "extracted_data": complete_extracted_data,
-            "saving_to_database": saving_to_database,
-            "journal_entry": complete_journal_entry,
-            "save_journal_entry": save_journal_entry
-        }
-    
-    except Exception as e:
-        error_message = str(e)
-        # Update the job status to failed with error message
-        await update_in_db(
-            item_id=str(payload.job_id),
-            updated_data={
-                "status": "failed",
-                "error_message": error_message,
-                "last_run_at": datetime.utcnow().isoformat()
-            },
-            table_name="document_jobs"
-        )
-        raise HTTPException(status_code=500, detail=f"Error processing document: {error_message}")
+@router.get("/pattern-extractor-stats")
+async def pattern_extractor_stats() -> Dict:
+    """
+    Report how often the pattern extractor let extract_data skip the LLM and
+    which fields it found or still had to ask the LLM for
+    """
+    if pattern_extractor is None:
+        return {"enabled": False}
+    return {"enabled": True, **pattern_extractor.stats()}
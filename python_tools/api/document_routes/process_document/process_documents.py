@@ -0,0 +1,227 @@
+"""
+Batch ingestion: runs many documents through the processing stages as a pipeline.
+
+Downloads and PDF parsing run concurrently and feed a queue that the LLM
+workers drain, so fetching the next documents overlaps with classifying
+the current ones. Database writes are deferred until every document has
+been analysed and then sent to save_document_results in chunks. A chunk
+the database rejects is retried one document at a time, so a bad row only
+fails its own job.
+
+Copies of the same file within a batch (same file hash) are analysed once:
+later copies skip the LLM stage and follow the first copy's outcome under
+DUPLICATE_DOCUMENT_POLICY.
+
+Configuration (environment variables):
+    BATCH_MAX_DOCUMENTS       max documents accepted per request (default 500)
+    BATCH_FETCH_CONCURRENCY   parallel downloads / PDF parses (default 8)
+    BATCH_LLM_CONCURRENCY     parallel LLM workers (default 2)
+    BATCH_SAVE_CHUNK          documents per save_document_results call (default 50)
+"""
+from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+import os
+import time
+from typing import Dict, List
+from pydantic import BaseModel
+from datetime import datetime
+from ..extract_document.extract_document import extract_document
+from ..extract_document.extract_document import DocumentUrl
+from ...auth import get_current_user
+from .process_document import DocumentRequest
+from .job_queue import job_queue
+from .pipeline import (
+    DOCUMENT_TEXT_BUDGET, analyse_document, apply_duplicate_policy, build_result_item, mark_job_failed,
+    resolve_duplicate, resolve_saved_duplicate
+)
+from .tools.save_document_results import save_document_results
+from .tools.update_in_db import update_in_db
+
+router = APIRouter()
+
+BATCH_MAX_DOCUMENTS = int(os.getenv("BATCH_MAX_DOCUMENTS", "500"))
+BATCH_FETCH_CONCURRENCY = int(os.getenv("BATCH_FETCH_CONCURRENCY", "8"))
+BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", "2"))
+BATCH_SAVE_CHUNK = max(1, int(os.getenv("BATCH_SAVE_CHUNK", "50")))
+
+class BatchRequest(BaseModel):
+    documents: List[DocumentRequest]
+
+@router.post("/process-documents")
+async def process_documents(payload: BatchRequest, user: Dict = Depends(get_current_user)) -> Dict:
+    """
+    Process a batch of documents for the authenticated user
+    """
+    if not payload.documents:
+        raise HTTPException(status_code=400, detail="No documents provided")
+    if len(payload.documents) > BATCH_MAX_DOCUMENTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Batch too large: {len(payload.documents)} documents (max {BATCH_MAX_DOCUMENTS})"
+        )
+    job_ids = [item.job_id for item in payload.documents]
+    duplicate_job_ids = sorted({job_id for job_id in job_ids if job_ids.count(job_id) > 1})
+    if duplicate_job_ids:
+        raise HTTPException(status_code=400, detail=f"Duplicate job_id in batch: {', '.join(duplicate_job_ids)}")
+
+    # keep the jobs' leases fresh so no recovery sweep reclaims them mid-batch
+    with job_queue.holding(job_ids):
+        return await run_batch(payload.documents, user["id"])
+
+async def run_batch(documents: List[DocumentRequest], user_id: str) -> Dict:
+    """
+    Run the three stages over a validated batch and report per-job outcomes
+    """
+    started_at = time.perf_counter()
+    results = {
+        item.job_id: {"job_id": item.job_id, "document_url": str(item.document_url), "status": "pending", "error": None}
+        for item in documents
+    }
+
+    async def fail(job_id: str, error_message: str) -> None:
+        results[job_id]["status"] = "failed"
+        results[job_id]["error"] = error_message
+        await mark_job_failed(job_id, error_message)
+
+    # Stage 1: download + parse, feeding the LLM stage as documents become ready
+    parsed_queue: asyncio.Queue = asyncio.Queue(maxsize=BATCH_FETCH_CONCURRENCY * 2)
+    fetch_slots = asyncio.Semaphore(BATCH_FETCH_CONCURRENCY)
+    # file hash -> job analysing it, and later copies -> that job
+    batch_files: Dict[str, str] = {}
+    copies: Dict[str, str] = {}
+
+    async def fetch(item: DocumentRequest) -> None:
+        async with fetch_slots:
+            await update_in_db(
+                item_id=item.job_id,
+                updated_data={"status": "in_progress", "last_run_at": datetime.utcnow().isoformat()},
+                table_name="document_jobs"
+            )
+            try:
+                doc_data = await extract_document(DocumentUrl(url=item.document_url, max_chars=DOCUMENT_TEXT_BUDGET or None))
+                duplicate = await resolve_duplicate(doc_data["fingerprint"], item.job_id, user_id)
+            except Exception as e:
+                await fail(item.job_id, str(e))
+                return
+            if duplicate:
+                record_duplicate(results, item.job_id, duplicate)
+                return
+            first = batch_files.setdefault(doc_data["fingerprint"]["file_hash"], item.job_id)
+            if first != item.job_id:
+                print("♻️", f"job {item.job_id} repeats the file of job {first} in this batch")
+                copies[item.job_id] = first
+                return
+        await parsed_queue.put((item, doc_data))
+
+    # Stage 2: validation, extraction and journal entry per document
+    analysed: List[Dict] = []
+
+    async def llm_worker() -> None:
+        while True:
+            item, doc_data = await parsed_queue.get()
+            try:
+                analysis = await analyse_document(doc_data["content"], str(item.document_url), item.job_id, user_id, doc_data["fingerprint"])
+                analysis["job_id"] = item.job_id
+                analysed.append(analysis)
+                results[item.job_id]["total_pages"] = doc_data["total_pages"]
+                results[item.job_id]["validation_status"] = "completed" if analysis["validation"]["is_valid"] else "validation_failed"
+            except Exception as e:
+                await fail(item.job_id, str(e))
+            finally:
+                parsed_queue.task_done()
+
+    workers = [asyncio.create_task(llm_worker()) for _ in range(BATCH_LLM_CONCURRENCY)]
+    await asyncio.gather(*[fetch(item) for item in documents])
+    await parsed_queue.join()
+    for worker in workers:
+        worker.cancel()
+    await asyncio.gather(*workers, return_exceptions=True)
+
+    # Stage 3: batched writes
+    parsed_jobs = await save_batch(user_id, analysed, results, fail) if analysed else {}
+    for job_id, first in copies.items():
+        if first in parsed_jobs:
+            record_duplicate(results, job_id, await apply_duplicate_policy(parsed_jobs[first], job_id, user_id))
+        else:
+            await fail(job_id, f"Duplicate of job {first} in this batch, which failed: {results[first]['error']}")
+
+    elapsed = time.perf_counter() - started_at
+    items = list(results.values())
+    succeeded = sum(1 for item in items if item["status"] == "parsed")
+    return {
+        "user_id": user_id,
+        "results": items,
+        "summary": {
+            "total": len(items),
+            "succeeded": succeeded,
+            "failed": len(items) - succeeded,
+            "elapsed_seconds": round(elapsed, 3),
+            "documents_per_second": round(len(items) / elapsed, 3) if elapsed else None
+        }
+    }
+
+async def save_batch(user_id: str, analysed: List[Dict], results: Dict, fail) -> Dict[str, Dict]:
+    """
+    Write documents, journal entries and ledger entries for every analysed
+    document, and mark their jobs parsed, BATCH_SAVE_CHUNK documents per
+    save_document_results call. Each call is one transaction, so when a
+    chunk fails its documents are saved one by one and only the ones the
+    database rejects are marked failed. Documents whose file turns out to
+    be saved already are settled by the duplicate policy.
+
+    Returns:
+        Dict[str, Dict]: job_id -> the parsed job whose results each job now
+        points at, for every job that ended up parsed
+    """
+    parsed_jobs: Dict[str, Dict] = {}
+    items = []
+    for a in analysed:
+        try:
+            items.append(await build_result_item(a, a["job_id"], user_id))
+        except Exception as e:
+            await fail(a["job_id"], str(e))
+
+    for start in range(0, len(items), BATCH_SAVE_CHUNK):
+        chunk = items[start:start + BATCH_SAVE_CHUNK]
+        saved = await save_document_results(chunk)
+        if saved["success"]:
+            await record_saved(saved["data"], results, user_id, parsed_jobs)
+            continue
+        if len(chunk) > 1:
+            print("⚠️", f"Saving {len(chunk)} documents failed, retrying one by one: {saved['error']}")
+        for item in chunk:
+            single = saved if len(chunk) == 1 else await save_document_results([item])
+            if single["success"]:
+                await record_saved(single["data"], results, user_id, parsed_jobs)
+            else:
+                await fail(item["job_id"], f"Error saving document results: {single['error']}")
+    return parsed_jobs
+
+async def record_saved(saved_rows: List[Dict], results: Dict, user_id: str, parsed_jobs: Dict[str, Dict]) -> None:
+    for saved_ids in saved_rows:
+        job_id = saved_ids["job_id"]
+        if saved_ids.get("duplicate_of"):
+            duplicate = await resolve_saved_duplicate(saved_ids["duplicate_of"], job_id, user_id)
+            record_duplicate(results, job_id, duplicate)
+            if duplicate["status"] == "duplicate":
+                parsed_jobs[job_id] = duplicate["duplicate_of"]
+            continue
+        results[job_id].update({
+            "status": "parsed",
+            "document_id": saved_ids["document_id"],
+            "journal_entry_id": saved_ids["journal_entry_id"],
+            "ledger_entry_ids": saved_ids["ledger_entry_ids"]
+        })
+        parsed_jobs[job_id] = {
+            "id": job_id,
+            "document_id": saved_ids["document_id"],
+            "journal_entry_id": saved_ids["journal_entry_id"],
+            "debit_ledger_entry_id": saved_ids["debit_ledger_entry_id"],
+            "credit_ledger_entry_id": saved_ids["credit_ledger_entry_id"]
+        }
+
+def record_duplicate(results: Dict, job_id: str, duplicate: Dict) -> None:
+    results[job_id].update({
+        "status": "parsed" if duplicate["status"] == "duplicate" else "failed",
+        "duplicate_of": duplicate["duplicate_of"]
+    })
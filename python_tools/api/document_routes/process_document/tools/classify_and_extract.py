@@ -0,0 +1,142 @@
+"""
+Validates, classifies and extracts data from a document in a single LLM call.
+
+The two-call path sends the same document text to the model twice, once in
+validate_document and again in extract_data. This tool sends every schema
+from req_formats along with the text once and asks for the document type,
+validity, confidence and the fields for that type in one JSON response.
+"""
+
+from fastapi import HTTPException
+from typing import Dict, List, Optional, Tuple
+import json
+from dotenv import load_dotenv
+from datetime import datetime
+from .extract_data import req_formats, check_extracted_fields
+from .validate_document import check_analysis
+from .update_in_db import update_in_db
+from .model_tiers import json_prompt_completion
+
+# Load environment variables
+load_dotenv()
+
+PROMPT_VERSION = "1"
+
+def check_combined(analysis) -> Tuple[Optional[str], Optional[float]]:
+    """
+    Schema problem (or None) and confidence of a combined reply: the
+    analysis checks plus the extracted fields of the chosen type, with the
+    lower of the model's confidence and the share of fields found
+    """
+    problem, confidence = check_analysis(analysis)
+    if problem or not analysis["is_valid"]:
+        return problem, confidence
+    problem, found = check_extracted_fields(analysis["document_type"], analysis.get("extracted_data"))
+    if problem:
+        return f"extracted_data: {problem}", None
+    return None, min(confidence, found)
+
+async def classify_and_extract(content: List[str], job_id: str = None) -> Dict:
+    """
+    Validate and extract a document in one round trip.
+
+    Returns:
+        Dict: {"validation": <validate_document result>, "extraction": <extract_data result>}
+    """
+    try:
+        validation_results = {
+            "is_valid": True,
+            "checks": {
+                "has_content": False,
+                "has_required_fields": False
+            },
+            "errors": None,
+            "document_type": None,
+            "confidence_score": 0.0
+        }
+
+        # Check if content exists
+        if not content or len(content) == 0:
+            raise ValueError("Document has no content")
+
+        validation_results["checks"]["has_content"] = True
+
+        # Combine all pages for analysis
+        full_text = " ".join(content)
+
+        prompt = f"""
+        Analyze the following document content and determine:
+        1. Is this a financial document or invoice or some receipt?
+        2. What type of document is it specifically? Choose one of the keys of the schemas below.
+        3. Does it contain essential financial fields (amounts, dates, parties involved)?
+        4. What is your confidence score (0-1) in this assessment?
+        5. Extract the fields of the schema for that document type. If a field is not found, set it to null.
+
+        Schemas per document type (field: type and description):
+        {json.dumps(req_formats)}
+
+        Document content:
+        {full_text[:4000]}
+
+        Respond in JSON format. Ensure all dates are in YYYY-MM-DD format.
+        {{
+            "is_valid": boolean,
+            "document_type": string,
+            "has_required_fields": boolean,
+            "confidence_score": float,
+            "explanation": string,
+            "extracted_data": object with the fields of the chosen schema
+        }}
+        """
+
+        analysis_data = await json_prompt_completion(
+            "classify_and_extract", PROMPT_VERSION,
+            "You are a document analysis and data extraction expert specializing in financial documents and invoices.",
+            prompt, full_text[:4000], check=check_combined
+        )
+
+        # Map the analysis data to validation results
+        validation_results["checks"]["has_required_fields"] = analysis_data.get("has_required_fields", False)
+        validation_results["document_type"] = analysis_data.get("document_type", None)
+        validation_results["confidence_score"] = analysis_data.get("confidence_score", 0.0)
+        validation_results["is_valid"] = analysis_data.get("is_valid", False)
+
+        document_type = validation_results["document_type"]
+        if document_type not in req_formats:
+            raise ValueError(f"Unsupported document type: {document_type}")
+
+        if not validation_results["is_valid"] and job_id:
+            await update_in_db(
+                item_id=job_id,
+                updated_data={
+                    "status": "failed",
+                    "error_message": f"Document validation failed: {analysis_data.get('explanation', 'Unknown reason')}",
+                    "last_run_at": datetime.utcnow().isoformat()
+                },
+                table_name="document_jobs"
+            )
+
+        extracted_data = analysis_data.get("extracted_data") or {}
+        return {
+            "validation": validation_results,
+            "extraction": {
+                "document_type": document_type,
+                # keep only the schema's fields, missing ones as null
+                "extracted_data": {field: extracted_data.get(field) for field in req_formats[document_type]},
+                "confidence_score": validation_results["confidence_score"]
+            }
+        }
+
+    except Exception as e:
+        error_message = f"Error during document classification and extraction: {str(e)}"
+        if job_id:
+            await update_in_db(
+                item_id=job_id,
+                updated_data={
+                    "status": "failed",
+                    "error_message": error_message,
+                    "last_run_at": datetime.utcnow().isoformat()
+                },
+                table_name="document_jobs"
+            )
+        raise HTTPException(status_code=500, detail=error_message)
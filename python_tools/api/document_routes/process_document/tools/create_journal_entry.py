@@ -1,25 +1,40 @@
 """
 Creates journal entries from extracted document data.
 """
-from typing import Dict, List
+from typing import Dict, Optional, Tuple
 from datetime import datetime
-from openai import OpenAI
 from dotenv import load_dotenv
 import json
 from .update_in_db import update_in_db
+from .model_tiers import json_prompt_completion
+from .journal_rules import journal_rules
 
 # Load environment variables
 load_dotenv()
 
-# Initialize OpenAI client
-client = OpenAI(
-    base_url="http://localhost:11434/v1",
-    api_key="ollama",  # required, but unused
-)
+PROMPT_VERSION = "1"
+
+def check_journal_entry(entry) -> Tuple[Optional[str], Optional[float]]:
+    """
+    Schema problem (or None) of a journal entry reply; it carries no confidence
+    """
+    if not isinstance(entry, dict):
+        return "reply is not an object", None
+    for account in ("account_debited", "account_credited"):
+        if not isinstance(entry.get(account), str) or not entry[account].strip():
+            return f"{account} is missing", None
+    if entry["account_debited"] == entry["account_credited"]:
+        return "debit and credit accounts are the same", None
+    amount = entry.get("amount")
+    if isinstance(amount, bool) or not isinstance(amount, (int, float)) or amount <= 0:
+        return "amount is not a positive number", None
+    return None, None
 
 async def create_journal_entry(extracted_data: Dict, job_id: str = None) -> Dict:
     """
-    Create journal entries based on the extracted document data.
+    Create journal entries based on the extracted document data. The
+    chart-of-accounts rules in journal_rules decide known document types;
+    the LLM is only asked when they cannot.
     
     Args:
         extracted_data (Dict): The extracted data from the document
@@ -29,6 +44,18 @@ async def create_journal_entry(extracted_data: Dict, job_id: str = None) -> Dict
         Dict: Journal entries with debit and credit transactions
     """
     try:
+        if journal_rules is not None:
+            entry, reason = journal_rules.journal_entry(
+                extracted_data.get("document_type"), extracted_data["extracted_data"]
+            )
+            if entry is not None:
+                return {
+                    "success": True,
+                    "journal_entries": entry,
+                    "error": None
+                }
+            print("📒", f"journal rules fell back to the LLM: {reason}")
+
         extracted_data_json = json.dumps(extracted_data["extracted_data"])
 
         prompt =  f"""
@@ -46,25 +73,11 @@ async def create_journal_entry(extracted_data: Dict, job_id: str = None) -> Dict
             Make sure account names end with "A/c" example : Cash A/c, Bank A/c etc.
         """
 
-        # Call OpenAI API
-        response = client.chat.completions.create(
-            model="llama3:latest",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a smart accountant. Your job is to create journal entry from given data."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            temperature=0.1,  # Low temperature for more consistent results
-            response_format={ "type": "json_object" }
+        data = await json_prompt_completion(
+            "create_journal_entry", PROMPT_VERSION,
+            "You are a smart accountant. Your job is to create journal entry from given data.",
+            prompt, extracted_data_json, check=check_journal_entry
         )
-
-        journal_json = response.choices[0].message.content
-        data = json.loads(journal_json)
             
         return {
             "success": True,
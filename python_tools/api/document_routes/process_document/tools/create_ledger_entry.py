@@ -1,22 +1,10 @@
 """
 Creates ledger entries from journal entry data.
 """
-from typing import Dict, List
+from typing import Dict
 from datetime import datetime
-from openai import OpenAI
-from dotenv import load_dotenv
-import json
 from .update_in_db import update_in_db
 
-# Load environment variables
-load_dotenv()
-
-# Initialize OpenAI client
-client = OpenAI(
-    base_url="http://localhost:11434/v1",
-    api_key="ollama",  # required, but unused
-)
-
 async def create_ledger_entry(journal_entry: Dict, job_id: str = None) -> Dict:
     """
     Create ledger entries based on the journal entry data.
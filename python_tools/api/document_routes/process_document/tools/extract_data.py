@@ -3,21 +3,19 @@ Extracts structured data from document content using LLM.
 """
 
 from fastapi import HTTPException
-from typing import Dict, List
-import os
-from openai import OpenAI
+from typing import Dict, List, Optional, Tuple
+import json
 from dotenv import load_dotenv
 from datetime import datetime
 from .update_in_db import update_in_db
+from .model_tiers import json_prompt_completion
+from .pattern_extractor import pattern_extractor
 
 # Load environment variables
 load_dotenv()
 
-# Initialize OpenAI client
-client = OpenAI(
-    base_url="http://localhost:11434/v1",
-    api_key="ollama",  # required, but unused
-)
+PROMPT_VERSION = "1"
+PARTIAL_PROMPT_VERSION = "2"
 
 req_formats = {
   "purchase_invoices" : {
@@ -77,10 +75,63 @@ req_formats = {
   }
 }
 
+def field_kind(description: str) -> str:
+    """
+    "number", "date", "list" or "text", read from a req_formats description
+    """
+    if description.startswith("(number)"):
+        return "number"
+    if description.startswith("(date)"):
+        return "date"
+    if description.startswith("(["):
+        return "list"
+    return "text"
+
+def field_is_optional(description: str) -> bool:
+    return "optional" in description
+
+def field_value_ok(kind: str, value) -> bool:
+    if kind == "number":
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+    if kind == "date":
+        try:
+            datetime.strptime(str(value), "%Y-%m-%d")
+            return True
+        except ValueError:
+            return False
+    if kind == "list":
+        return isinstance(value, list)
+    return isinstance(value, str) and bool(value.strip())
+
+def check_extracted_fields(document_type: str, data) -> Tuple[Optional[str], float]:
+    """
+    Check extracted data against the req_formats schema of its type.
+
+    Returns:
+        Tuple[Optional[str], float]: a description of the first field with a
+        wrongly typed value (None if all are fine), and the share of required
+        fields that hold a usable value, used as the extraction confidence
+    """
+    fields = req_formats.get(document_type, {})
+    if not isinstance(data, dict):
+        return "reply is not an object", 0.0
+    required = [field for field, description in fields.items() if not field_is_optional(description)]
+    found = 0
+    for field, description in fields.items():
+        value = data.get(field)
+        if value is None:
+            continue
+        if not field_value_ok(field_kind(description), value):
+            return f"{field} is not a valid {field_kind(description)}", 0.0
+        if field in required:
+            found += 1
+    return None, found / len(required) if required else 1.0
 
 async def extract_data(content: List[str], document_type: str, job_id: str = None) -> Dict:
     """
-    Extract structured data from document content based on document type
+    Extract structured data from document content based on document type.
+    Fields the pattern extractor reads confidently are taken as they are;
+    the LLM is asked only for the rest, or not at all.
     """
     try:
         # Combine all pages for analysis
@@ -102,8 +153,57 @@ async def extract_data(content: List[str], document_type: str, job_id: str = Non
                 )
             raise HTTPException(status_code=400, detail=error_message)
 
-        # Prepare the prompt for data extraction
-        prompt = f"""
+        found = {}
+        missing = list(fields)
+        if pattern_extractor is not None:
+            found = pattern_extractor.extract(document_type, "\n".join(content))
+            missing = pattern_extractor.missing_fields(document_type, fields, found)
+            pattern_extractor.record(found, missing, len(fields))
+        known = {field: value for field, (value, _) in found.items()}
+
+        if not missing:
+            print("⚡", f"{document_type} fields read by patterns, skipping the LLM")
+            return {
+                "document_type": document_type,
+                "extracted_data": {field: known.get(field) for field in fields},
+                "confidence_score": min(
+                    (found[field][1] for field, description in fields.items()
+                     if field in found and not field_is_optional(description)),
+                    default=1.0
+                )
+            }
+
+        def merge(reply):
+            # the LLM's answer wins for the fields it was asked, unless it has none
+            if not isinstance(reply, dict):
+                return reply
+            merged = {field: known.get(field) for field in fields}
+            for field in missing:
+                if reply.get(field) is not None:
+                    merged[field] = reply[field]
+            return merged
+
+        if len(missing) < len(fields):
+            # only ask for what the patterns could not read
+            settled = {field: value for field, value in known.items() if field not in missing}
+            context = pattern_extractor.context(document_type, missing, "\n".join(content))
+            prompt = f"""
+        Extract only these fields from the document content. If a field is not found, set it to null.
+        {json.dumps({field: fields[field] for field in missing})}
+
+        Already read from the document: {json.dumps(settled, default=str)}
+
+        Relevant parts of the document content:
+        {context}
+
+        Respond in JSON format with only those fields. Ensure all dates are in YYYY-MM-DD format.
+        """
+            prompt_version = PARTIAL_PROMPT_VERSION
+            cache_stage = f"extract_data:{document_type}:partial"
+            cache_payload = json.dumps([missing, settled], default=str) + context
+        else:
+            # Prepare the prompt for data extraction
+            prompt = f"""
         Extract the following information from the document content. If a field is not found, set it to null.
         
         Document content:
@@ -114,33 +214,22 @@ async def extract_data(content: List[str], document_type: str, job_id: str = Non
 
         Respond in JSON format with the extracted data. Ensure all dates are in YYYY-MM-DD format.
         """
-
-        # Call OpenAI API
-        response = client.chat.completions.create(
-            model="llama3:latest",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a document data extraction expert. Extract only the requested fields and format them according to the specified types."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            temperature=0.1,  # Low temperature for more consistent results
-            response_format={ "type": "json_object" }
-        )
-
-        # Parse the response
-        extracted_data = response.choices[0].message.content
-        import json
-        data = json.loads(extracted_data)
+            prompt_version = PROMPT_VERSION
+            cache_stage = f"extract_data:{document_type}"
+            cache_payload = full_text[:4000]
+
+        data = merge(await json_prompt_completion(
+            "extract_data", prompt_version,
+            "You are a document data extraction expert. Extract only the requested fields and format them according to the specified types.",
+            prompt, cache_payload,
+            check=lambda reply: check_extracted_fields(document_type, merge(reply)),
+            cache_stage=cache_stage
+        ))
 
         return {
             "document_type": document_type,
             "extracted_data": data,
-            "confidence_score": 0.95  # You might want to get this from the LLM response
+            "confidence_score": check_extracted_fields(document_type, data)[1]
         }
 
     except Exception as e:
@@ -0,0 +1,48 @@
+"""
+Looks up documents the user has already processed with the same content fingerprint.
+"""
+from typing import Dict, Optional
+from fastapi.concurrency import run_in_threadpool
+from ....database import get_supabase
+
+async def find_duplicate_document(user_id: str, fingerprint: Dict) -> Optional[Dict]:
+    """
+    Find an earlier document of this user with the same file hash or
+    normalized text hash, together with the job that produced it.
+
+    Args:
+        user_id (str): The ID of the user owning the documents
+        fingerprint (Dict): {"file_hash": str, "text_hash": str or None}
+
+    Returns:
+        Optional[Dict]: {"document": <documents row>, "job": <document_jobs row or None>}
+    """
+    filters = [f"file_hash.eq.{fingerprint['file_hash']}"]
+    if fingerprint.get("text_hash"):
+        filters.append(f"text_hash.eq.{fingerprint['text_hash']}")
+
+    supabase = get_supabase()
+
+    # served by the (user_id, file_hash) and (user_id, text_hash) indexes
+    query = supabase.table("documents") \
+        .select("id, job_id, file_url, document_type") \
+        .eq("user_id", user_id)
+    # postgrest-py 0.11 has no or_() builder; add the or= filter directly
+    query.params = query.params.add("or", f"({','.join(filters)})")
+    documents = await run_in_threadpool(query.limit(1).execute)
+    if not documents.data:
+        return None
+
+    document = documents.data[0]
+    jobs = await run_in_threadpool(
+        supabase.table("document_jobs")
+        .select("id, document_id, journal_entry_id, debit_ledger_entry_id, credit_ledger_entry_id")
+        .eq("document_id", document["id"])
+        .eq("status", "parsed")
+        .limit(1)
+        .execute
+    )
+    return {
+        "document": document,
+        "job": jobs.data[0] if jobs.data else None
+    }
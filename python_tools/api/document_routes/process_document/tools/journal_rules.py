@@ -0,0 +1,265 @@
+"""
+Rule-based journal entries for the document types in req_formats.
+
+For these types the accounts follow from the document itself: a purchase
+invoice debits Purchases A/c and credits Cash A/c, Bank A/c or the vendor
+depending on its payment mode, a cash receipt debits Cash A/c and credits
+the payer, and so on. Account names come from a chart of accounts that can
+be overridden with a JSON file. Documents the rules cannot decide (unknown
+payment mode, missing party or amount, a bank line with no recognisable
+counter-account) are left to the LLM, and every fallback is counted with
+its reason.
+
+Configuration (environment variables):
+    JOURNAL_RULES_ENABLED    "false" sends every document to the LLM (default true)
+    CHART_OF_ACCOUNTS_PATH   JSON file whose top-level keys replace those of
+                             DEFAULT_CHART_OF_ACCOUNTS (optional)
+"""
+import json
+import os
+import re
+from typing import Dict, Optional, Tuple
+
+DEFAULT_CHART_OF_ACCOUNTS = {
+    "accounts": {
+        "purchases": "Purchases A/c",
+        "sales": "Sales A/c",
+        "cash": "Cash A/c",
+        "bank": "Bank A/c"
+    },
+    # first match wins; "party" settles against the vendor or customer
+    "payment_modes": [
+        ["bank", ["bank", "netbanking", "card", "cheque", "check", "neft", "imps", "rtgs", "upi", "transfer", "online", "wire"]],
+        ["cash", ["cash"]],
+        ["party", ["credit", "on account", "net", "due", "later"]]
+    ],
+    # expense_category (lower case) -> account; others become "<Category> Expenses A/c"
+    "expense_categories": {
+        "travel": "Travel Expenses A/c",
+        "utilities": "Utilities Expenses A/c",
+        "rent": "Rent A/c",
+        "salary": "Salaries A/c",
+        "salaries": "Salaries A/c",
+        "office supplies": "Office Expenses A/c",
+        "repairs": "Repairs and Maintenance A/c"
+    },
+    # counter-account of a bank transaction, matched against its description;
+    # keywords match at the start of a word, so "rent" also matches "rental"
+    # but not "current"
+    "bank_descriptions": [
+        ["Salaries A/c", ["salary", "payroll"]],
+        ["Rent A/c", ["rent"]],
+        ["Interest A/c", ["interest"]],
+        ["Bank Charges A/c", ["charge", "fee", "commission"]]
+    ]
+}
+
+def load_chart_of_accounts(path: Optional[str]) -> Dict:
+    chart = dict(DEFAULT_CHART_OF_ACCOUNTS)
+    if path:
+        with open(path) as f:
+            chart.update(json.load(f))
+    return chart
+
+def _amount(value) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, str):
+        try:
+            value = float(value.replace(",", "").strip())
+        except ValueError:
+            return None
+    if isinstance(value, (int, float)) and value > 0:
+        return value
+    return None
+
+def _keyword_pattern(keywords) -> "re.Pattern":
+    return re.compile(r"\b(?:" + "|".join(re.escape(keyword) for keyword in keywords) + ")")
+
+def _party_account(name) -> Optional[str]:
+    if not isinstance(name, str) or not name.strip():
+        return None
+    name = name.strip()
+    return name if name.endswith("A/c") else f"{name} A/c"
+
+class NeedsLLM(Exception):
+    """
+    Raised by a rule when the document does not determine the entry. The
+    message is a fixed reason, so fallbacks can be counted by it.
+    """
+
+class JournalRules:
+    def __init__(self, chart: Dict):
+        self.chart = chart
+        self._payment_modes = [(kind, _keyword_pattern(keywords)) for kind, keywords in chart["payment_modes"]]
+        self._bank_descriptions = [
+            (account, _keyword_pattern(keywords)) for account, keywords in chart["bank_descriptions"]
+        ]
+        self.counters = {"rule_entries": 0, "llm_fallbacks": 0}
+        self.fallback_reasons: Dict[str, int] = {}
+        self.by_type: Dict[str, Dict[str, int]] = {}
+        self._rules = {
+            "purchase_invoices": self._purchase_invoice,
+            "sales_invoices": self._sales_invoice,
+            "cash_receipts": self._cash_receipt,
+            "cash_payments": self._cash_payment,
+            "expense_bills": self._expense_bill,
+            "bank_transactions": self._bank_transaction
+        }
+
+    def journal_entry(self, document_type: str, data: Dict) -> Tuple[Optional[Dict], Optional[str]]:
+        """
+        Returns:
+            Tuple[Optional[Dict], Optional[str]]: the journal entry, or None and
+            the reason the LLM has to decide
+        """
+        rule = self._rules.get(document_type)
+        try:
+            if rule is None:
+                raise NeedsLLM("no rule for document type")
+            if not isinstance(data, dict):
+                raise NeedsLLM("extracted data is not an object")
+            entry, reason = rule(data), None
+            if entry["account_debited"] == entry["account_credited"]:
+                raise NeedsLLM("debit and credit accounts are the same")
+        except NeedsLLM as e:
+            entry, reason = None, str(e)
+
+        counts = self.by_type.setdefault(str(document_type), {"rule_entries": 0, "llm_fallbacks": 0})
+        outcome = "rule_entries" if entry else "llm_fallbacks"
+        self.counters[outcome] += 1
+        counts[outcome] += 1
+        if reason:
+            self.fallback_reasons[reason] = self.fallback_reasons.get(reason, 0) + 1
+        return entry, reason
+
+    def stats(self) -> Dict:
+        total = self.counters["rule_entries"] + self.counters["llm_fallbacks"]
+        return {
+            **self.counters,
+            "fallback_rate": self.counters["llm_fallbacks"] / total if total else 0.0,
+            "fallback_reasons": dict(self.fallback_reasons),
+            "by_type": {document_type: dict(counts) for document_type, counts in self.by_type.items()}
+        }
+
+    def _account(self, key: str) -> str:
+        return self.chart["accounts"][key]
+
+    def _settlement(self, mode, party: Optional[str], default: str, allow_party: bool = True) -> str:
+        """
+        Account a document is settled through: cash, bank or the party itself
+        """
+        if mode is None or (isinstance(mode, str) and not mode.strip()):
+            kind = default
+        else:
+            text = str(mode).lower()
+            kind = next(
+                (kind for kind, pattern in self._payment_modes if pattern.search(text)),
+                None
+            )
+            if kind is None:
+                raise NeedsLLM("unrecognised payment mode")
+        if kind == "party":
+            if not allow_party:
+                raise NeedsLLM("payment mode settles in neither cash nor bank")
+            if party is None:
+                raise NeedsLLM("party name missing")
+            return party
+        return self._account(kind)
+
+    @staticmethod
+    def _require_amount(value) -> float:
+        amount = _amount(value)
+        if amount is None:
+            raise NeedsLLM("amount missing or not positive")
+        return amount
+
+    def _purchase_invoice(self, data: Dict) -> Dict:
+        vendor = _party_account(data.get("vendor_name"))
+        number = f" (invoice {data['invoice_number']})" if data.get("invoice_number") else ""
+        return {
+            "account_debited": self._account("purchases"),
+            "account_credited": self._settlement(data.get("payment_mode"), vendor, default="party"),
+            "amount": self._require_amount(data.get("total_amount")),
+            "description": f"Goods purchased from {data.get('vendor_name') or 'vendor'}{number}"
+        }
+
+    def _sales_invoice(self, data: Dict) -> Dict:
+        customer = _party_account(data.get("customer_name"))
+        terms = data.get("payment_terms")
+        # payment terms such as "Net 30" mean a credit sale; only explicit
+        # cash or bank terms settle the invoice on the spot
+        try:
+            debit = self._settlement(terms, customer, default="party")
+        except NeedsLLM:
+            if customer is None:
+                raise
+            debit = customer
+        number = f" (invoice {data['invoice_number']})" if data.get("invoice_number") else ""
+        return {
+            "account_debited": debit,
+            "account_credited": self._account("sales"),
+            "amount": self._require_amount(data.get("total_amount")),
+            "description": f"Goods sold to {data.get('customer_name') or 'customer'}{number}"
+        }
+
+    def _cash_receipt(self, data: Dict) -> Dict:
+        payer = _party_account(data.get("payer_name"))
+        if payer is None:
+            raise NeedsLLM("party name missing")
+        debit = self._settlement(data.get("payment_mode"), None, default="cash", allow_party=False)
+        return {
+            "account_debited": debit,
+            "account_credited": payer,
+            "amount": self._require_amount(data.get("amount")),
+            "description": data.get("description") or f"Received from {data['payer_name']}"
+        }
+
+    def _cash_payment(self, data: Dict) -> Dict:
+        payee = _party_account(data.get("payee_name"))
+        if payee is None:
+            raise NeedsLLM("party name missing")
+        credit = self._settlement(data.get("payment_mode"), None, default="cash", allow_party=False)
+        return {
+            "account_debited": payee,
+            "account_credited": credit,
+            "amount": self._require_amount(data.get("amount")),
+            "description": data.get("description") or f"Paid to {data['payee_name']}"
+        }
+
+    def _expense_bill(self, data: Dict) -> Dict:
+        category = data.get("expense_category")
+        if not isinstance(category, str) or not category.strip():
+            raise NeedsLLM("expense category missing")
+        category = category.strip()
+        account = self.chart["expense_categories"].get(category.lower())
+        if account is None:
+            account = _party_account(category.title() if "expense" in category.lower() else f"{category.title()} Expenses")
+        vendor = _party_account(data.get("vendor_name"))
+        return {
+            "account_debited": account,
+            "account_credited": self._settlement(data.get("payment_mode"), vendor, default="party"),
+            "amount": self._require_amount(data.get("amount")),
+            "description": f"{category} expense" + (f" billed by {data['vendor_name']}" if data.get("vendor_name") else "")
+        }
+
+    def _bank_transaction(self, data: Dict) -> Dict:
+        debit_amount, credit_amount = _amount(data.get("debit_amount")), _amount(data.get("credit_amount"))
+        if bool(debit_amount) == bool(credit_amount):
+            raise NeedsLLM("bank transaction needs exactly one of debit_amount and credit_amount")
+        description = str(data.get("description") or "")
+        counter = next(
+            (account for account, pattern in self._bank_descriptions if pattern.search(description.lower())),
+            None
+        )
+        if counter is None:
+            raise NeedsLLM("no counter-account for bank transaction")
+        bank = self._account("bank")
+        if debit_amount:
+            # money left the account
+            return {"account_debited": counter, "account_credited": bank, "amount": debit_amount, "description": description}
+        return {"account_debited": bank, "account_credited": counter, "amount": credit_amount, "description": description}
+
+journal_rules = None
+if os.getenv("JOURNAL_RULES_ENABLED", "true").lower() != "false":
+    journal_rules = JournalRules(load_chart_of_accounts(os.getenv("CHART_OF_ACCOUNTS_PATH")))
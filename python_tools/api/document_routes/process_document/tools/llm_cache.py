@@ -0,0 +1,142 @@
+"""
+Content-addressed cache for LLM stage results.
+
+Results are keyed by a hash of (stage, model, prompt version, normalized
+input), so a re-uploaded or retried document skips the model entirely.
+Only answers the caller accepted are stored, so a malformed or weak one
+is never replayed.
+Lookups go through an in-memory LRU first and a SQLite file second; the
+SQLite tier is a ByteBoundedStore (api/sqlite_store.py), trimmed by least
+recent access once it grows past its byte budget. Lookups that miss the memory tier and
+all writes run in the threadpool, so SQLite I/O never blocks the event loop.
+
+Configuration (environment variables):
+    LLM_CACHE_ENABLED         "false" disables the cache (default true)
+    LLM_CACHE_MEMORY_ENTRIES  entries kept in the in-memory tier (default 1024)
+    LLM_CACHE_PATH            SQLite file for the on-disk tier (default .cache/llm_cache.sqlite3)
+    LLM_CACHE_MAX_BYTES       size budget of the on-disk tier (default 256 MiB)
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from fastapi.concurrency import run_in_threadpool
+from ....sqlite_store import ByteBoundedStore, open_db
+
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_text(text: str) -> str:
+    """
+    Collapse whitespace so re-extracted copies of the same PDF hash equally
+    """
+    return _WHITESPACE.sub(" ", text).strip()
+
+class LLMCache:
+    def __init__(self, memory_entries: int, disk_path: Optional[str], disk_max_bytes: int):
+        self.memory_entries = memory_entries
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk: Optional[ByteBoundedStore] = None
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0}
+
+        if disk_path:
+            self._disk = ByteBoundedStore(open_db(disk_path), "llm_cache", disk_max_bytes)
+
+    @staticmethod
+    def key(stage: str, model: str, prompt_version: str, payload: str) -> str:
+        digest = hashlib.sha256()
+        for part in (stage, model, prompt_version, normalize_text(payload)):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def get_memory(self, key: str) -> Optional[Any]:
+        """
+        Look in the in-memory tier only, without counting a miss; safe to
+        call on the event loop
+        """
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.counters["memory_hits"] += 1
+                return json.loads(self._memory[key])
+            return None
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Look in both tiers. May read SQLite, so async callers run it in the threadpool.
+        """
+        cached = self.get_memory(key)
+        if cached is not None:
+            return cached
+        with self._lock:
+            if self._disk is not None:
+                encoded = self._disk.get(key)
+                if encoded is not None:
+                    self._remember(key, encoded)
+                    self.counters["disk_hits"] += 1
+                    return json.loads(encoded)
+
+            self.counters["misses"] += 1
+            return None
+
+    def set(self, key: str, value: Any) -> None:
+        # entries are kept encoded so callers never share a mutable result
+        encoded = json.dumps(value)
+        with self._lock:
+            self._remember(key, encoded)
+            self.counters["writes"] += 1
+            if self._disk is not None:
+                self._disk.put(key, encoded, len(encoded))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.counters["memory_hits"] + self.counters["disk_hits"] + self.counters["misses"]
+            hits = self.counters["memory_hits"] + self.counters["disk_hits"]
+            return {
+                **self.counters,
+                "hit_ratio": hits / lookups if lookups else 0.0,
+                "evictions": self._disk.evictions if self._disk else 0,
+                "memory_entries": len(self._memory),
+                "disk_bytes": self._disk.total_bytes if self._disk else 0
+            }
+
+    def _remember(self, key: str, encoded: str) -> None:
+        self._memory[key] = encoded
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+async def cached_result(stage: str, model: str, prompt_version: str, payload: str) -> Tuple[Optional[str], Optional[Any]]:
+    """
+    Cache key and cached result of this stage input, the result None on a
+    miss; (None, None) when the cache is disabled
+    """
+    if llm_cache is None:
+        return None, None
+    key = LLMCache.key(stage, model, prompt_version, payload)
+    cached = llm_cache.get_memory(key)
+    if cached is None:
+        cached = await run_in_threadpool(llm_cache.get, key)
+    return key, cached
+
+async def store_result(key: Optional[str], value: Any) -> None:
+    """
+    Cache a result under the key cached_result returned. Callers store only
+    results they accepted, so a malformed or rejected answer is asked again
+    instead of being served from the cache. value must be JSON-serializable.
+    """
+    if llm_cache is None or key is None:
+        return
+    await run_in_threadpool(llm_cache.set, key, value)
+
+llm_cache = None
+if os.getenv("LLM_CACHE_ENABLED", "true").lower() != "false":
+    llm_cache = LLMCache(
+        memory_entries=int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "1024")),
+        disk_path=os.getenv("LLM_CACHE_PATH", os.path.join(".cache", "llm_cache.sqlite3")),
+        disk_max_bytes=int(os.getenv("LLM_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+    )
@@ -0,0 +1,176 @@
+"""
+Single entry point for chat completions against the local Ollama server.
+
+Every LLM tool goes through chat_completion, which shares one pooled
+AsyncOpenAI client and admits requests through a global adaptive limiter.
+The limit grows by one slot per window of fast, successful completions and
+is halved when a completion fails or takes longer than LLM_TARGET_LATENCY
+(AIMD), so a burst of uploads queues here instead of over-subscribing the
+model. Callers that wait longer than LLM_QUEUE_TIMEOUT for a slot get
+LLMQueueTimeout.
+
+Configuration (environment variables):
+    LLM_BASE_URL             OpenAI-compatible endpoint (default http://localhost:11434/v1)
+    LLM_API_KEY              API key sent to it (default "ollama", unused by Ollama)
+    LLM_REQUEST_TIMEOUT      seconds before one completion is abandoned (default 300)
+    LLM_INITIAL_CONCURRENCY  starting limit (default 2)
+    LLM_MIN_CONCURRENCY      the limit never drops below this (default 1)
+    LLM_MAX_CONCURRENCY      the limit never grows past this (default 8)
+    LLM_TARGET_LATENCY       seconds above which a completion counts as overload (default 30)
+    LLM_QUEUE_TIMEOUT        seconds a caller may wait for a slot (default 120)
+"""
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Deque, Dict
+from openai import AsyncOpenAI
+from dotenv import load_dotenv
+from ....latency_stats import latency_ms
+
+# Load environment variables
+load_dotenv()
+
+client = AsyncOpenAI(
+    base_url=os.getenv("LLM_BASE_URL", "http://localhost:11434/v1"),
+    api_key=os.getenv("LLM_API_KEY", "ollama"),  # required, but unused
+    timeout=float(os.getenv("LLM_REQUEST_TIMEOUT", "300")),
+)
+
+class LLMQueueTimeout(Exception):
+    """
+    Raised when a completion waited longer than the queue timeout for a slot.
+    """
+
+class AdaptiveLimiter:
+    def __init__(self, initial: int, minimum: int, maximum: int, target_latency: float, queue_timeout: float):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = float(max(minimum, min(initial, maximum)))
+        self.target_latency = target_latency
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        # a decrease only counts once per window, so one slow batch of
+        # concurrent completions halves the limit once, not once each
+        self._last_decrease = 0.0
+        self._wait_times: Deque[float] = deque(maxlen=1000)
+        self._latencies: Deque[float] = deque(maxlen=1000)
+        self.counters = {
+            "completions": 0, "errors": 0, "cancelled": 0, "slow": 0,
+            "queue_timeouts": 0, "increases": 0, "decreases": 0
+        }
+        self.max_queued = 0
+
+    async def acquire(self) -> None:
+        start = time.perf_counter()
+        if not self._waiters and self.in_flight < int(self.limit):
+            self.in_flight += 1
+            self._wait_times.append(0.0)
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.max_queued = max(self.max_queued, len(self._waiters))
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                # the slot arrived just as the wait ran out; keep it
+                pass
+            else:
+                waiter.cancel()
+                self._waiters.remove(waiter)
+                self.counters["queue_timeouts"] += 1
+                raise LLMQueueTimeout(
+                    f"LLM backend busy: waited {self.queue_timeout:g}s for one of {int(self.limit)} slots"
+                )
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # a slot was handed over to a caller that went away
+                self.in_flight -= 1
+                self._wake()
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            raise
+        self._wait_times.append(time.perf_counter() - start)
+
+    def release(self, latency: float, ok: bool, cancelled: bool = False) -> None:
+        self.in_flight -= 1
+        if cancelled:
+            # the caller went away; says nothing about the backend's load
+            self.counters["cancelled"] += 1
+            self._wake()
+            return
+        self._latencies.append(latency)
+        now = time.monotonic()
+        if ok:
+            self.counters["completions"] += 1
+        else:
+            self.counters["errors"] += 1
+
+        if not ok or latency > self.target_latency:
+            if ok:
+                self.counters["slow"] += 1
+            if now - self._last_decrease > min(latency, self.target_latency):
+                self.limit = max(float(self.minimum), self.limit / 2)
+                self._last_decrease = now
+                self.counters["decreases"] += 1
+        elif self.limit < self.maximum:
+            # +1 slot after roughly `limit` fast completions
+            previous = int(self.limit)
+            self.limit = min(float(self.maximum), self.limit + 1 / self.limit)
+            if int(self.limit) > previous:
+                self.counters["increases"] += 1
+        self._wake()
+
+    def stats(self) -> Dict:
+        waits, latencies = latency_ms(self._wait_times), latency_ms(self._latencies)
+        return {
+            **self.counters,
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "queued": len(self._waiters),
+            "max_queued": self.max_queued,
+            "wait_p50_ms": waits["p50_ms"],
+            "wait_p99_ms": waits["p99_ms"],
+            "latency_p50_ms": latencies["p50_ms"],
+            "latency_p99_ms": latencies["p99_ms"]
+        }
+
+    def _wake(self) -> None:
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if waiter.done():
+                continue
+            self.in_flight += 1
+            waiter.set_result(None)
+
+limiter = AdaptiveLimiter(
+    initial=int(os.getenv("LLM_INITIAL_CONCURRENCY", "2")),
+    minimum=int(os.getenv("LLM_MIN_CONCURRENCY", "1")),
+    maximum=int(os.getenv("LLM_MAX_CONCURRENCY", "8")),
+    target_latency=float(os.getenv("LLM_TARGET_LATENCY", "30")),
+    queue_timeout=float(os.getenv("LLM_QUEUE_TIMEOUT", "120"))
+)
+
+async def chat_completion(**kwargs):
+    """
+    client.chat.completions.create behind the global limiter; takes the same
+    arguments and returns the same response
+    """
+    await limiter.acquire()
+    start = time.perf_counter()
+    try:
+        response = await client.chat.completions.create(**kwargs)
+    except asyncio.CancelledError:
+        limiter.release(time.perf_counter() - start, ok=False, cancelled=True)
+        raise
+    except Exception:
+        limiter.release(time.perf_counter() - start, ok=False)
+        raise
+    limiter.release(time.perf_counter() - start, ok=True)
+    return response
+
+def gateway_stats() -> Dict:
+    return limiter.stats()
@@ -0,0 +1,208 @@
+"""
+Per-stage model tiers with escalation on weak answers.
+
+Each LLM stage runs on an ordered list of models, cheapest first. The first
+model whose reply parses as JSON, passes the stage's schema check and
+reports a confidence at or above the stage's threshold answers; otherwise
+the next model is asked. The last model's parsed reply is always accepted.
+Each model's answer is cached only once it passes the check, so a reply
+that escalated, or a weak one of the last tier, is asked for again.
+Which tier answered, why earlier tiers were passed over and how long each
+tier took are counted per stage, so thresholds can be tuned against
+throughput.
+
+Configuration (environment variables):
+    LLM_LARGE_MODEL             model every stage ends on (default llama3:latest)
+    LLM_SMALL_MODEL             fast model tried first by validate_document and
+                                extract_data (default unset: large model only)
+    LLM_MODELS_<STAGE>          comma-separated tiers of one stage, overriding the above,
+                                e.g. LLM_MODELS_VALIDATE_DOCUMENT=llama3.2:3b,llama3:latest
+    LLM_ESCALATE_BELOW          confidence below which an answer escalates (default 0.7)
+    LLM_ESCALATE_BELOW_<STAGE>  threshold of one stage
+"""
+import json
+import os
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+from ....latency_stats import latency_ms
+from .llm_cache import cached_result, store_result
+from .llm_gateway import chat_completion
+
+# Load environment variables
+load_dotenv()
+
+LLM_LARGE_MODEL = os.getenv("LLM_LARGE_MODEL", "llama3:latest")
+LLM_SMALL_MODEL = os.getenv("LLM_SMALL_MODEL", "")
+LLM_ESCALATE_BELOW = float(os.getenv("LLM_ESCALATE_BELOW", "0.7"))
+
+# cheap stages: document type classification and schema-guided extraction
+SMALL_FIRST_STAGES = ("validate_document", "extract_data")
+
+def stage_models(stage: str) -> List[str]:
+    configured = os.getenv(f"LLM_MODELS_{stage.upper()}")
+    if configured:
+        return [model.strip() for model in configured.split(",") if model.strip()]
+    if LLM_SMALL_MODEL and LLM_SMALL_MODEL != LLM_LARGE_MODEL and stage in SMALL_FIRST_STAGES:
+        return [LLM_SMALL_MODEL, LLM_LARGE_MODEL]
+    return [LLM_LARGE_MODEL]
+
+def escalation_threshold(stage: str) -> float:
+    return float(os.getenv(f"LLM_ESCALATE_BELOW_{stage.upper()}", str(LLM_ESCALATE_BELOW)))
+
+class TierStats:
+    def __init__(self, samples: int = 1000):
+        self.samples = samples
+        self._stages: Dict[str, Dict] = {}
+
+    def _stage(self, stage: str) -> Dict:
+        if stage not in self._stages:
+            self._stages[stage] = {
+                "calls": 0,
+                "escalated_calls": 0,
+                "escalations": {"invalid_json": 0, "schema": 0, "low_confidence": 0},
+                # weak answers of the last tier, accepted for lack of a bigger model
+                "unresolved": {"schema": 0, "low_confidence": 0},
+                "answered_by": {},
+                "latencies": deque(maxlen=self.samples),
+                "model_latencies": {}
+            }
+        return self._stages[stage]
+
+    def record_attempt(self, stage: str, model: str, latency: float, problem: Optional[str], escalating: bool) -> None:
+        entry = self._stage(stage)
+        model_latencies: Deque[float] = entry["model_latencies"].setdefault(model, deque(maxlen=self.samples))
+        model_latencies.append(latency)
+        if problem:
+            entry["escalations" if escalating else "unresolved"][problem] += 1
+
+    def record_call(self, stage: str, model: str, latency: float, escalated: bool) -> None:
+        entry = self._stage(stage)
+        entry["calls"] += 1
+        entry["answered_by"][model] = entry["answered_by"].get(model, 0) + 1
+        entry["latencies"].append(latency)
+        if escalated:
+            entry["escalated_calls"] += 1
+
+    def stats(self) -> Dict:
+        stages = {}
+        for stage, entry in self._stages.items():
+            stages[stage] = {
+                "models": stage_models(stage),
+                "escalate_below": escalation_threshold(stage),
+                "calls": entry["calls"],
+                "escalated_calls": entry["escalated_calls"],
+                "escalation_rate": entry["escalated_calls"] / entry["calls"] if entry["calls"] else 0.0,
+                "escalations": dict(entry["escalations"]),
+                "unresolved": dict(entry["unresolved"]),
+                "answered_by": dict(entry["answered_by"]),
+                "latency": latency_ms(entry["latencies"]),
+                "model_latency": {
+                    model: latency_ms(samples) for model, samples in entry["model_latencies"].items()
+                }
+            }
+        return stages
+
+tier_stats = TierStats()
+
+async def tiered_completion(
+    stage: str,
+    prompt_version: str,
+    payload: str,
+    call: Callable[[str], Awaitable[Dict]],
+    check: Callable[[Dict], Tuple[Optional[str], Optional[float]]],
+    cache_stage: Optional[str] = None
+) -> Dict:
+    """
+    Ask the stage's models in order until one gives an acceptable answer.
+
+    Args:
+        stage (str): stage name, used for configuration and stats
+        prompt_version (str): the stage's PROMPT_VERSION, part of the cache key
+        payload (str): the input the cache key is derived from
+        call: awaits one model and returns its parsed JSON reply; a
+              ValueError (json.JSONDecodeError included) counts as an invalid reply
+        check: returns (schema problem or None, confidence or None) for a reply
+        cache_stage (str, optional): cache namespace when it differs from stage
+
+    Returns:
+        Dict: the accepted reply
+    """
+    models = stage_models(stage)
+    threshold = escalation_threshold(stage)
+    started = time.perf_counter()
+    for tier, model in enumerate(models):
+        last_tier = tier == len(models) - 1
+        attempt_started = time.perf_counter()
+        problem = None
+        # each model's answer is cached under its own key, once it is accepted
+        key, answer = await cached_result(cache_stage or stage, model, prompt_version, payload)
+        cached = answer is not None
+        if not cached:
+            try:
+                answer = await call(model)
+            except ValueError:
+                if last_tier:
+                    raise
+                problem = "invalid_json"
+
+        if answer is not None:
+            schema_problem, confidence = check(answer)
+            if schema_problem:
+                problem = "schema"
+            elif confidence is not None and confidence < threshold:
+                problem = "low_confidence"
+
+        tier_stats.record_attempt(
+            stage, model, time.perf_counter() - attempt_started, problem, escalating=not last_tier
+        )
+        if problem is None and not cached:
+            await store_result(key, answer)
+        if problem is None or last_tier:
+            tier_stats.record_call(stage, model, time.perf_counter() - started, escalated=tier > 0)
+            return answer
+        print("⤴️", f"{stage}: escalating from {model} ({problem})")
+
+async def json_prompt_completion(
+    stage: str,
+    prompt_version: str,
+    system: str,
+    prompt: str,
+    payload: str,
+    check: Callable[[Dict], Tuple[Optional[str], Optional[float]]],
+    cache_stage: Optional[str] = None
+) -> Dict:
+    """
+    Send a system and user prompt through the shared gateway and return the
+    JSON reply accepted by tiered_completion.
+
+    Args:
+        stage (str): stage name, used for configuration and stats
+        prompt_version (str): the stage's PROMPT_VERSION; bump it when the
+                              prompt changes so cached answers are not reused
+        system (str): system message
+        prompt (str): user message
+        payload (str): the input the cache key is derived from
+        check: returns (schema problem or None, confidence or None) for a reply
+        cache_stage (str, optional): cache namespace when it differs from stage
+
+    Returns:
+        Dict: the accepted reply
+    """
+    async def call(model: str) -> Dict:
+        response = await chat_completion(
+            model=model,
+            messages=[
+                {"role": "system", "content": system},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.1,  # Low temperature for more consistent results
+            response_format={ "type": "json_object" }
+        )
+        return json.loads(response.choices[0].message.content)
+
+    return await tiered_completion(stage, prompt_version, payload, call, check, cache_stage)
+
+def model_tier_stats() -> Dict:
+    return tier_stats.stats()
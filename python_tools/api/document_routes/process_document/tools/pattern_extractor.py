@@ -0,0 +1,362 @@
+"""
+Pattern-based pre-extraction of req_formats fields ahead of the LLM.
+
+Machine-generated documents label their fields ("Invoice No:", "Grand
+Total", "Payment Mode"), so many values can be read with regular
+expressions. Every field of a type has an ordered list of compiled
+patterns, each with a confidence; the first pattern that matches and parses
+sets the field. Line items are read from "description qty rate amount"
+rows and only trusted when their amounts add up to the document total.
+
+extract_data skips the LLM when every required field was found with at
+least PATTERN_MIN_CONFIDENCE, and otherwise asks it only for the fields
+that are missing or below it. That prompt carries only the lines around
+the labels of those fields, plus the top of the document for fields whose
+label appears nowhere, up to PATTERN_CONTEXT_CHARS.
+
+Configuration (environment variables):
+    PATTERN_EXTRACTOR_ENABLED  "false" sends every document to the LLM as before (default true)
+    PATTERN_MIN_CONFIDENCE     confidence a found field needs to skip the LLM (default 0.85)
+    PATTERN_DATE_ORDER         "dmy" or "mdy", how numeric dates like 04/05/2024 are read (default dmy)
+    PATTERN_CONTEXT_CHARS      document text sent with a partial prompt (default 1500)
+"""
+import os
+import re
+from collections import namedtuple
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+PATTERN_DATE_ORDER = os.getenv("PATTERN_DATE_ORDER", "dmy")
+PATTERN_CONTEXT_CHARS = int(os.getenv("PATTERN_CONTEXT_CHARS", "1500"))
+
+# lines kept on either side of a label line in a partial prompt
+CONTEXT_LINES = 2
+
+# label matches the field's label alone, so the line can be found even when
+# its value did not parse
+FieldPattern = namedtuple("FieldPattern", ["regex", "confidence", "parse", "last", "label"])
+
+_FLAGS = re.IGNORECASE | re.MULTILINE
+_SEP = r"\s*[:#\-]?\s*"
+_CURRENCY = r"(?:rs\.?|inr|₹|\$|usd|eur|€|£)?\s*"
+_NUMBER = r"(\d{1,3}(?:,\d{2,3})+(?:\.\d{1,2})?|\d+(?:\.\d{1,2})?)"
+_AMOUNT = _CURRENCY + _NUMBER
+_DATE = (
+    r"(\d{4}-\d{1,2}-\d{1,2}|\d{1,2}[/.\-]\d{1,2}[/.\-]\d{2,4}"
+    r"|\d{1,2}(?:st|nd|rd|th)?\s+[a-z]{3,9}\.?,?\s+\d{4}|[a-z]{3,9}\.?\s+\d{1,2}(?:st|nd|rd|th)?,?\s+\d{4})"
+)
+# document numbers contain at least one digit
+_REFERENCE = r"((?=[a-z0-9/\-]*\d)[a-z0-9][a-z0-9/\-]{0,31})"
+# the rest of the line, up to a run of spaces that starts the next column
+_LINE = r"([^\n]*?[a-z][^\n]*?)(?:\s{2,}|\s*$)"
+
+def _parse_amount(text: str) -> Optional[float]:
+    try:
+        return float(text.replace(",", ""))
+    except ValueError:
+        return None
+
+_NUMERIC_DATE_FORMATS = {"dmy": ("%d/%m/%Y", "%d/%m/%y"), "mdy": ("%m/%d/%Y", "%m/%d/%y")}
+_TEXT_DATE_FORMATS = ("%Y-%m-%d", "%d %b %Y", "%d %B %Y", "%b %d %Y", "%B %d %Y")
+
+def _parse_date(text: str) -> Optional[str]:
+    text = re.sub(r"(?<=\d)(?:st|nd|rd|th)\b", "", text.strip(), flags=re.IGNORECASE)
+    if re.fullmatch(r"\d{1,2}[/.\-]\d{1,2}[/.\-]\d{2,4}", text):
+        text, formats = re.sub(r"[.\-]", "/", text), _NUMERIC_DATE_FORMATS[PATTERN_DATE_ORDER]
+    else:
+        text, formats = re.sub(r"[\s,.]+", " ", text).strip(), _TEXT_DATE_FORMATS
+    for fmt in formats:
+        try:
+            return datetime.strptime(text, fmt).strftime("%Y-%m-%d")
+        except ValueError:
+            continue
+    return None
+
+def _parse_text(text: str) -> Optional[str]:
+    text = text.strip(" \t:-,.")
+    if not 2 <= len(text) <= 80 or not re.search(r"[a-z]", text, re.IGNORECASE):
+        return None
+    return text
+
+def _parse_reference(text: str) -> Optional[str]:
+    return text.strip("-/")
+
+def _pattern(labels: str, value: str, confidence: float, parse, last: bool = False) -> FieldPattern:
+    return FieldPattern(
+        re.compile(r"\b(?:" + labels + r")" + _SEP + value, _FLAGS), confidence, parse, last,
+        re.compile(r"\b(?:" + labels + r")", _FLAGS)
+    )
+
+def _keyword(keywords: str, confidence: float, parse) -> FieldPattern:
+    regex = re.compile(r"\b(" + keywords + r")\b", _FLAGS)
+    return FieldPattern(regex, confidence, parse, False, regex)
+
+def _keyword_map(mapping: Dict[str, str], confidence: float) -> List[FieldPattern]:
+    return [_keyword(keywords, confidence, lambda _, value=value: value) for value, keywords in mapping.items()]
+
+def _number_patterns(kind: str) -> List[FieldPattern]:
+    return [
+        _pattern(r"(?:" + kind + r")\s*(?:no\.?|number|num|#)", _REFERENCE, 0.95, _parse_reference),
+        _pattern(r"(?:" + kind + r")\s*id", _REFERENCE, 0.85, _parse_reference)
+    ]
+
+def _date_patterns(kinds: str) -> List[FieldPattern]:
+    return [
+        _pattern(r"(?:" + kinds + r")\s+date", _DATE, 0.95, _parse_date),
+        _pattern(r"(?<!due\s)(?<!expiry\s)date(?:d)?", _DATE, 0.85, _parse_date),
+        _keyword(_DATE[1:-1], 0.6, _parse_date)
+    ]
+
+_TOTAL = [
+    _pattern(r"grand\s+total|total\s+amount(?:\s+due)?|invoice\s+total|amount\s+payable|net\s+payable|total\s+due",
+             _AMOUNT, 0.95, _parse_amount, last=True),
+    _pattern(r"(?<!sub\s)(?<!sub)total", _AMOUNT, 0.75, _parse_amount, last=True)
+]
+_TAX = [
+    _pattern(r"total\s+tax|tax\s+amount|total\s+gst|gst\s+amount", _AMOUNT, 0.95, _parse_amount, last=True),
+    _pattern(r"(?:igst|gst|vat|tax)(?:\s*@?\s*\(?\d+(?:\.\d+)?\s*%\)?)?", _AMOUNT, 0.75, _parse_amount, last=True)
+]
+_AMOUNT_PAID = [
+    _pattern(r"amount\s+(?:received|paid)|received\s+amount|paid\s+amount|grand\s+total|total\s+amount|net\s+amount",
+             _AMOUNT, 0.95, _parse_amount, last=True),
+    _pattern(r"amount|(?<!sub\s)(?<!sub)total", _AMOUNT, 0.75, _parse_amount, last=True)
+]
+_PAYMENT_MODE = [
+    _pattern(r"payment\s+mode|mode\s+of\s+payment|payment\s+method|paid\s+(?:by|via)", _LINE, 0.9, _parse_text),
+    _keyword(r"upi|neft|imps|rtgs|cheque|credit\s+card|debit\s+card|bank\s+transfer|cash", 0.6, _parse_text)
+]
+_DESCRIPTION = [
+    _pattern(r"description|narration|particulars|towards|being|purpose|remarks?", _LINE, 0.85, _parse_text)
+]
+
+FIELD_PATTERNS: Dict[str, Dict[str, List[FieldPattern]]] = {
+    "purchase_invoices": {
+        "invoice_number": _number_patterns(r"invoice|inv|bill"),
+        "vendor_name": [
+            _pattern(r"vendor(?:\s+name)?|supplier(?:\s+name)?|seller|sold\s+by|billed\s+by", _LINE, 0.85, _parse_text),
+            _pattern(r"from\s*:", _LINE, 0.7, _parse_text)
+        ],
+        "date": _date_patterns(r"invoice|bill"),
+        "total_amount": _TOTAL,
+        "tax_amount": _TAX,
+        "payment_mode": _PAYMENT_MODE
+    },
+    "sales_invoices": {
+        "invoice_number": _number_patterns(r"invoice|inv|bill"),
+        "customer_name": [
+            _pattern(r"bill(?:ed)?\s+to|customer(?:\s+name)?|sold\s+to|buyer", _LINE, 0.85, _parse_text)
+        ],
+        "date": _date_patterns(r"invoice|bill"),
+        "total_amount": _TOTAL,
+        "tax_amount": _TAX,
+        "payment_terms": [
+            _pattern(r"payment\s+terms|terms(?=\s*:)", _LINE, 0.9, _parse_text),
+            _keyword(r"net\s*\d{1,3}|due\s+on\s+receipt", 0.85, _parse_text)
+        ]
+    },
+    "cash_receipts": {
+        "receipt_number": _number_patterns(r"receipt|voucher"),
+        "payer_name": [
+            _pattern(r"received\s+(?:with\s+thanks\s+)?from|payer(?:\s+name)?", _LINE, 0.85, _parse_text)
+        ],
+        "date": _date_patterns(r"receipt|payment"),
+        "amount": _AMOUNT_PAID,
+        "payment_mode": _PAYMENT_MODE,
+        "description": _DESCRIPTION
+    },
+    "cash_payments": {
+        "payment_number": _number_patterns(r"payment|voucher"),
+        "payee_name": [
+            _pattern(r"paid\s+to|pay\s+to|payee(?:\s+name)?", _LINE, 0.85, _parse_text)
+        ],
+        "date": _date_patterns(r"payment|voucher"),
+        "amount": _AMOUNT_PAID,
+        "payment_mode": _PAYMENT_MODE,
+        "description": _DESCRIPTION
+    },
+    "bank_transactions": {
+        "date": _date_patterns(r"transaction|txn|value|posting"),
+        "description": _DESCRIPTION,
+        "debit_amount": [
+            _pattern(r"debit(?:ed)?(?:\s+amount)?|withdrawal(?:\s+amount)?|dr\.?\s+amount", _AMOUNT, 0.85, _parse_amount)
+        ],
+        "credit_amount": [
+            _pattern(r"credit(?!\s+card)(?:ed)?(?:\s+amount)?|deposit(?:\s+amount)?|cr\.?\s+amount", _AMOUNT, 0.85, _parse_amount)
+        ],
+        "balance": [
+            _pattern(r"(?:closing\s+|available\s+|running\s+)?balance", _AMOUNT, 0.9, _parse_amount, last=True)
+        ],
+        "transaction_type": [
+            _pattern(r"transaction\s+type|txn\s+type|mode", r"(neft|imps|rtgs|upi|cheque|atm|pos|ach|ecs|[a-z]+)", 0.9,
+                     lambda text: text.upper()),
+            _keyword(r"neft|imps|rtgs|upi|cheque|atm|pos|ach|ecs", 0.85, lambda text: text.upper())
+        ]
+    },
+    "expense_bills": {
+        "bill_number": _number_patterns(r"bill|invoice|inv"),
+        "vendor_name": [
+            _pattern(r"vendor(?:\s+name)?|supplier(?:\s+name)?|merchant|billed\s+by", _LINE, 0.85, _parse_text),
+            _pattern(r"from\s*:", _LINE, 0.7, _parse_text)
+        ],
+        "date": _date_patterns(r"bill|invoice"),
+        "expense_category": [
+            _pattern(r"expense\s+(?:category|type|head)|category", _LINE, 0.9, _parse_text),
+            *_keyword_map({
+                "Travel": r"travel|taxi|cab|flight|airfare|train|hotel",
+                "Utilities": r"electricity|water\s+bill|power|internet|broadband|telephone",
+                "Rent": r"rent|lease",
+                "Office Supplies": r"stationery|office\s+supplies",
+                "Repairs": r"repairs?|maintenance"
+            }, 0.7)
+        ],
+        "amount": _AMOUNT_PAID,
+        "tax_amount": _TAX,
+        "payment_mode": _PAYMENT_MODE
+    }
+}
+
+# fields a document needs at least one of, on top of the non-optional ones
+REQUIRED_ANY = {
+    "bank_transactions": [("debit_amount", "credit_amount")]
+}
+
+_ITEM_ROW = re.compile(
+    r"^\s*(?:\d{1,3}[.)]?\s+)?([a-z][^\n]*?)\s+(\d+(?:\.\d+)?)\s+" + _AMOUNT + r"\s+" + _AMOUNT + r"\s*$",
+    _FLAGS
+)
+# looser than _ITEM_ROW: any line with text followed by three numbers, to
+# show the LLM the item table
+_ITEM_LINE = re.compile(r"[a-z][^\n]*?\d[\d,.]*\s+[^\n]*?\d[\d,.]*\s+[^\n]*?\d", _FLAGS)
+
+def _extract_items(text: str, found: Dict[str, Tuple]) -> Optional[Tuple[List[Dict], float]]:
+    """
+    Line items from "description qty rate amount" rows whose qty x rate
+    equals their amount; trusted only when they add up to the total (with or
+    without tax)
+    """
+    items = []
+    for description, qty, rate, amount in _ITEM_ROW.findall(text):
+        qty, rate, amount = float(qty), _parse_amount(rate), _parse_amount(amount)
+        if rate is None or amount is None or abs(qty * rate - amount) > 0.01 * max(amount, 1):
+            continue
+        items.append({"desc": description.strip(), "qty": qty, "rate": rate, "amount": amount})
+    if not items:
+        return None
+    total = found.get("total_amount", (None, 0))[0]
+    tax = found.get("tax_amount", (0, 0))[0] or 0
+    subtotal = round(sum(item["amount"] for item in items), 2)
+    reconciles = total is not None and any(abs(subtotal - target) <= 0.01 for target in (total, total - tax))
+    return items, 0.9 if reconciles else 0.5
+
+class PatternExtractor:
+    def __init__(self, min_confidence: float):
+        self.min_confidence = min_confidence
+        self.counters = {"documents": 0, "llm_skipped": 0, "partial_prompts": 0, "full_prompts": 0}
+        # document text sent with partial prompts, against up to 4000 chars for a full one
+        self.context_chars = 0
+        self.fields_found: Dict[str, int] = {}
+        self.fields_sent_to_llm: Dict[str, int] = {}
+
+    def extract(self, document_type: str, text: str) -> Dict[str, Tuple]:
+        """
+        Returns:
+            Dict[str, Tuple]: field -> (value, confidence) for every field a pattern found
+        """
+        found = {}
+        for field, patterns in FIELD_PATTERNS.get(document_type, {}).items():
+            for pattern in patterns:
+                matches = pattern.regex.findall(text)
+                if pattern.last:
+                    matches = matches[::-1]
+                value = next((parsed for parsed in map(pattern.parse, matches) if parsed is not None), None)
+                if value is not None:
+                    found[field] = (value, pattern.confidence)
+                    break
+        if document_type in ("purchase_invoices", "sales_invoices"):
+            items = _extract_items(text, found)
+            if items is not None:
+                found["items"] = items
+        return found
+
+    def missing_fields(self, document_type: str, fields: Dict[str, str], found: Dict[str, Tuple]) -> List[str]:
+        """
+        Fields to ask the LLM for: none when every required field was found
+        with enough confidence, otherwise every field that was not
+        """
+        confident = {field for field, (_, confidence) in found.items() if confidence >= self.min_confidence}
+        settled = all(
+            field in confident for field, description in fields.items() if "optional" not in description
+        ) and all(confident.intersection(group) for group in REQUIRED_ANY.get(document_type, []))
+        if settled:
+            return []
+        return [field for field in fields if field not in confident]
+
+    def context(self, document_type: str, missing: List[str], text: str, max_chars: int = PATTERN_CONTEXT_CHARS) -> str:
+        """
+        The part of the document a partial prompt needs: the lines around a
+        label of any missing field, then, if some field has no label in the
+        document, lines from the top until max_chars. Lines keep their order,
+        and skipped stretches are marked with "...".
+        """
+        lines = text.splitlines()
+        near_labels = set()
+        unlocated = False
+        for field in missing:
+            labels = [pattern.label for pattern in FIELD_PATTERNS.get(document_type, {}).get(field, [])]
+            if field == "items":
+                labels.append(_ITEM_LINE)
+            hits = [i for i, line in enumerate(lines) if any(label.search(line) for label in labels)]
+            unlocated = unlocated or not hits
+            for i in hits:
+                near_labels.update(range(max(0, i - CONTEXT_LINES), min(len(lines), i + CONTEXT_LINES + 1)))
+
+        keep, size = set(), 0
+        for i in sorted(near_labels) + (list(range(len(lines))) if unlocated else []):
+            if i in keep or not lines[i].strip():
+                continue
+            if size + len(lines[i]) + 1 > max_chars:
+                break
+            keep.add(i)
+            size += len(lines[i]) + 1
+
+        parts, previous = [], -1
+        for i in sorted(keep):
+            if i != previous + 1:
+                parts.append("...")
+            parts.append(lines[i])
+            previous = i
+        context = "\n".join(parts)
+        self.context_chars += len(context)
+        return context
+
+    def record(self, found: Dict[str, Tuple], missing: List[str], field_count: int) -> None:
+        self.counters["documents"] += 1
+        if not missing:
+            self.counters["llm_skipped"] += 1
+        elif len(missing) < field_count:
+            self.counters["partial_prompts"] += 1
+        else:
+            self.counters["full_prompts"] += 1
+        for field in found:
+            self.fields_found[field] = self.fields_found.get(field, 0) + 1
+        for field in missing:
+            self.fields_sent_to_llm[field] = self.fields_sent_to_llm.get(field, 0) + 1
+
+    def stats(self) -> Dict:
+        documents = self.counters["documents"]
+        return {
+            **self.counters,
+            "min_confidence": self.min_confidence,
+            "skip_rate": self.counters["llm_skipped"] / documents if documents else 0.0,
+            "avg_partial_context_chars": (
+                self.context_chars / self.counters["partial_prompts"] if self.counters["partial_prompts"] else None
+            ),
+            "fields_found": dict(self.fields_found),
+            "fields_sent_to_llm": dict(self.fields_sent_to_llm)
+        }
+
+pattern_extractor = None
+if os.getenv("PATTERN_EXTRACTOR_ENABLED", "true").lower() != "false":
+    pattern_extractor = PatternExtractor(
+        min_confidence=float(os.getenv("PATTERN_MIN_CONFIDENCE", "0.85"))
+    )
@@ -0,0 +1,57 @@
+"""
+Saves the results of processed documents in one atomic round trip.
+"""
+from typing import Dict, List
+from fastapi.concurrency import run_in_threadpool
+from ....database import get_supabase
+from ....entries_cache import invalidate_user_entries
+
+async def save_document_results(items: List[Dict]) -> Dict:
+    """
+    Write the documents row, journal entry and ledger entries of every item
+    and mark their jobs parsed, through the save_document_results database
+    function (migrations/002_save_document_results.sql, last redefined in
+    008_documents_unique_file_hash.sql). Everything commits together or not
+    at all. An item whose file the user already has saved writes nothing and
+    comes back with duplicate_of instead. Cached entry listings of the
+    affected users are dropped either way, since a failed call may still
+    have committed.
+
+    Args:
+        items (List[Dict]): {"job_id", "document", "journal_entry", "ledger_entries"} per document
+
+    Returns:
+        Dict: Response whose data lists, per item in the order given, either
+              {"job_id", "document_id", "journal_entry_id", "ledger_entry_ids",
+              "debit_ledger_entry_id", "credit_ledger_entry_id"} or
+              {"job_id", "duplicate_of": {"document_id", "job"}}, where job is
+              the parsed document_jobs row of that document or None
+    """
+    try:
+        try:
+            response = await run_in_threadpool(
+                get_supabase().rpc("save_document_results", {"items": items}).execute
+            )
+        finally:
+            for user_id in {item["journal_entry"]["user_id"] for item in items}:
+                invalidate_user_entries(user_id)
+
+        if hasattr(response, 'error') and response.error:
+            return {
+                "success": False,
+                "error": str(response.error),
+                "data": None
+            }
+
+        return {
+            "success": True,
+            "data": response.data,
+            "error": None
+        }
+
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e),
+            "data": None
+        }
@@ -2,19 +2,10 @@
 saves the extracted data into proper table.
 """
 from typing import Dict, List
-import os
-from supabase import create_client, Client
-from dotenv import load_dotenv
+from fastapi.concurrency import run_in_threadpool
+from ....database import get_supabase
 from datetime import datetime
 
-# Load environment variables
-load_dotenv()
-
-# Initialize Supabase client
-supabase_url = os.getenv("SUPABASE_URL", "")
-supabase_key = os.getenv("SUPABASE_KEY", "")
-supabase = create_client(supabase_url, supabase_key)
-
 async def save_to_db(user_id: str, extracted_data: Dict, table_name: str) -> Dict:
     """
     Save extracted data to the specified Supabase table.
@@ -33,7 +24,9 @@ async def save_to_db(user_id: str, extracted_data: Dict, table_name: str) -> Dic
             extracted_data['user_id'] = user_id
             
         # Insert data into the specified table
-        response = supabase.table(table_name).insert(extracted_data).execute()
+        response = await run_in_threadpool(
+            get_supabase().table(table_name).insert(extracted_data).execute
+        )
         
         if hasattr(response, 'error') and response.error:
             error_message = str(response.error)
@@ -68,11 +61,13 @@ async def update_job_status(job_id: str, error_message: str) -> None:
     Helper function to update job status to failed with error message
     """
     try:
-        supabase.table("document_jobs").update({
-            "status": "failed",
-            "error_message": error_message,
-            "last_run_at": datetime.utcnow().isoformat()
-        }).eq('id', job_id).execute()
+        await run_in_threadpool(
+            get_supabase().table("document_jobs").update({
+                "status": "failed",
+                "error_message": error_message,
+                "last_run_at": datetime.utcnow().isoformat()
+            }).eq('id', job_id).execute
+        )
     except Exception:
         # If this fails, we can't do much more
         pass
\ No newline at end of file
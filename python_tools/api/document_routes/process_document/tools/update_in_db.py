@@ -2,19 +2,10 @@
 Updates existing data in the specified table.
 """
 from typing import Dict
-import os
-from supabase import create_client, Client
-from dotenv import load_dotenv
+from fastapi.concurrency import run_in_threadpool
+from ....database import get_supabase
 from datetime import datetime
 
-# Load environment variables
-load_dotenv()
-
-# Initialize Supabase client
-supabase_url = os.getenv("SUPABASE_URL", "")
-supabase_key = os.getenv("SUPABASE_KEY", "")
-supabase = create_client(supabase_url, supabase_key)
-
 async def update_in_db(item_id: str, updated_data: Dict, table_name: str) -> Dict:
     """
     Update existing data in the specified Supabase table.
@@ -29,7 +20,9 @@ async def update_in_db(item_id: str, updated_data: Dict, table_name: str) -> Dic
     """
     try:
         # Update data in the specified table
-        response = supabase.table(table_name).update(updated_data).eq('id', item_id).execute()
+        response = await run_in_threadpool(
+            get_supabase().table(table_name).update(updated_data).eq('id', item_id).execute
+        )
         
         if hasattr(response, 'error') and response.error:
             error_message = str(response.error)
@@ -64,11 +57,13 @@ async def update_job_status(job_id: str, error_message: str) -> None:
     Helper function to update job status to failed with error message
     """
     try:
-        supabase.table("document_jobs").update({
-            "status": "failed",
-            "error_message": error_message,
-            "last_run_at": datetime.utcnow().isoformat()
-        }).eq('id', job_id).execute()
+        await run_in_threadpool(
+            get_supabase().table("document_jobs").update({
+                "status": "failed",
+                "error_message": error_message,
+                "last_run_at": datetime.utcnow().isoformat()
+            }).eq('id', job_id).execute
+        )
     except Exception:
         # If this fails, we can't do much more
         pass 
\ No newline at end of file
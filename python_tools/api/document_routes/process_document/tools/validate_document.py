@@ -3,22 +3,32 @@ validates if the uploaded document is a financial document/invoice and identifie
 """
 
 from fastapi import HTTPException
-from typing import Dict, List
-import re
-import os
-from openai import OpenAI
+from typing import Dict, List, Optional, Tuple
 from dotenv import load_dotenv
 from datetime import datetime
 from .update_in_db import update_in_db
+from .extract_data import req_formats
+from .model_tiers import json_prompt_completion
 
 # Load environment variables
 load_dotenv()
 
-# Initialize OpenAI client
-client = OpenAI(
-    base_url="http://localhost:11434/v1",
-    api_key="ollama",  # required, but unused
-)
+PROMPT_VERSION = "1"
+
+def check_analysis(analysis) -> Tuple[Optional[str], Optional[float]]:
+    """
+    Schema problem (or None) and confidence of a document analysis reply
+    """
+    if not isinstance(analysis, dict):
+        return "reply is not an object", None
+    if not isinstance(analysis.get("is_valid"), bool):
+        return "is_valid is not a boolean", None
+    if analysis["is_valid"] and analysis.get("document_type") not in req_formats:
+        return f"unknown document_type {analysis.get('document_type')!r}", None
+    confidence = analysis.get("confidence_score")
+    if isinstance(confidence, bool) or not isinstance(confidence, (int, float)) or not 0 <= confidence <= 1:
+        return "confidence_score is not a number between 0 and 1", None
+    return None, float(confidence)
 
 async def validate_document(content: List[str], job_id: str = None) -> Dict:
     """
@@ -78,22 +88,12 @@ async def validate_document(content: List[str], job_id: str = None) -> Dict:
         }}
         """ 
 
-        # Call OpenAI API
-        response = client.chat.completions.create(
-            model="llama3:latest",
-            messages=[
-                {"role": "system", "content": "You are a document analysis expert specializing in financial documents and invoices."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.1,  # Low temperature for more consistent results
-            response_format={ "type": "json_object" }
+        analysis_data = await json_prompt_completion(
+            "validate_document", PROMPT_VERSION,
+            "You are a document analysis expert specializing in financial documents and invoices.",
+            prompt, full_text[:4000], check=check_analysis
         )
 
-        # Parse the response
-        analysis = response.choices[0].message.content
-        import json
-        analysis_data = json.loads(analysis)
-
         # Map the analysis data to validation results
         validation_results["checks"]["has_required_fields"] = analysis_data.get("has_required_fields", False)
         validation_results["document_type"] = analysis_data.get("document_type", None)
@@ -0,0 +1,146 @@
+"""
+Per-user cache of encoded journal entry listings.
+
+The fetch endpoints are called over and over with the same date ranges,
+while a user's entries only change when a processing job saves its
+results. Responses are cached as encoded JSON bodies, keyed on the user
+and every request parameter that shapes the body, in an LRU bounded by
+total bytes. save_document_results drops every entry of the users it
+wrote for.
+
+Each user has a generation counter that invalidation bumps. A response
+computed from a read that started before an invalidation is not stored,
+so a slow query can never put stale rows back after a write. The cache
+lives in one process; with several app processes the TTL bounds how long
+another process's writes can go unseen, as it does for rows written
+outside the pipeline.
+
+Configuration (environment variables):
+    ENTRIES_CACHE_ENABLED    "false" disables the cache (default true)
+    ENTRIES_CACHE_MAX_BYTES  total size of cached bodies (default 32 MiB)
+    ENTRIES_CACHE_TTL        seconds an entry is served at most (default 300)
+"""
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Awaitable, Callable, Dict, Hashable, Optional, Tuple
+from fastapi.responses import Response
+from .json_response import dumps
+from .latency_stats import latency_ms
+
+class EntriesCache:
+    def __init__(self, max_bytes: int, ttl: float):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: "OrderedDict[Tuple, Tuple[bytes, float]]" = OrderedDict()
+        self._keys_by_user: Dict[str, set] = {}
+        self._generations: Dict[str, int] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "writes": 0, "stale_writes_skipped": 0, "invalidations": 0, "evictions": 0}
+        # recent lookup latencies (seconds) for the stats endpoint
+        self._latencies = {"hit": deque(maxlen=1000), "miss": deque(maxlen=1000)}
+
+    def generation(self, user_id: str) -> int:
+        return self._generations.get(user_id, 0)
+
+    def get(self, user_id: str, key: Hashable) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get((user_id, key))
+            if entry is None:
+                self.counters["misses"] += 1
+                return None
+            body, expires_at = entry
+            if expires_at <= time.time():
+                self._drop((user_id, key))
+                self.counters["misses"] += 1
+                return None
+            self._entries.move_to_end((user_id, key))
+            self.counters["hits"] += 1
+            return body
+
+    def set(self, user_id: str, key: Hashable, body: bytes, generation: int) -> None:
+        """
+        Store body unless the user was invalidated since generation was read
+        """
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            if self.generation(user_id) != generation:
+                self.counters["stale_writes_skipped"] += 1
+                return
+            full_key = (user_id, key)
+            if full_key in self._entries:
+                self._drop(full_key)
+            self._entries[full_key] = (body, time.time() + self.ttl)
+            self._keys_by_user.setdefault(user_id, set()).add(full_key)
+            self._bytes += len(body)
+            self.counters["writes"] += 1
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.counters["evictions"] += 1
+
+    def invalidate_user(self, user_id: str) -> None:
+        with self._lock:
+            self._generations[user_id] = self.generation(user_id) + 1
+            for full_key in list(self._keys_by_user.get(user_id, ())):
+                self._drop(full_key)
+            self.counters["invalidations"] += 1
+
+    def record_latency(self, hit: bool, seconds: float) -> None:
+        self._latencies["hit" if hit else "miss"].append(seconds)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.counters["hits"] + self.counters["misses"]
+            latency = {}
+            for kind, samples in self._latencies.items():
+                for name, value in latency_ms(samples).items():
+                    latency[f"{kind}_{name}"] = value
+            return {
+                **self.counters,
+                "hit_ratio": self.counters["hits"] / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                **latency
+            }
+
+    def _drop(self, full_key: Tuple) -> None:
+        body, _ = self._entries.pop(full_key)
+        self._bytes -= len(body)
+        user_keys = self._keys_by_user.get(full_key[0])
+        if user_keys is not None:
+            user_keys.discard(full_key)
+            if not user_keys:
+                del self._keys_by_user[full_key[0]]
+
+async def cached_json_response(user_id: str, key: Hashable, build: Callable[[], Awaitable[Dict]]) -> Response:
+    """
+    Return the cached body for this user and key, or await build() and
+    cache its encoded result
+    """
+    if entries_cache is None:
+        return Response(dumps(await build()), media_type="application/json")
+
+    start = time.perf_counter()
+    body = entries_cache.get(user_id, key)
+    hit = body is not None
+    if not hit:
+        generation = entries_cache.generation(user_id)
+        body = dumps(await build())
+        entries_cache.set(user_id, key, body, generation)
+    entries_cache.record_latency(hit, time.perf_counter() - start)
+    return Response(body, media_type="application/json")
+
+def invalidate_user_entries(user_id: str) -> None:
+    if entries_cache is not None:
+        entries_cache.invalidate_user(user_id)
+
+entries_cache = None
+if os.getenv("ENTRIES_CACHE_ENABLED", "true").lower() != "false":
+    entries_cache = EntriesCache(
+        max_bytes=int(os.getenv("ENTRIES_CACHE_MAX_BYTES", str(32 * 1024 * 1024))),
+        ttl=float(os.getenv("ENTRIES_CACHE_TTL", "300"))
+    )
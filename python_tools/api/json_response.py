@@ -0,0 +1,25 @@
+"""
+Lean JSON serialization for large responses.
+
+Returning a FastJSONResponse from a route skips FastAPI's jsonable_encoder
+pass, which walks and copies every value of the result before it is
+encoded. Bodies are encoded with orjson when it is installed and with the
+standard library json module otherwise.
+"""
+import json
+from typing import Any
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # optional; the stdlib encoder produces the same JSON, only slower
+    orjson = None
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=str)
+    return json.dumps(content, default=str, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,23 @@
+"""
+Latency percentiles reported by the stats endpoints.
+"""
+import statistics
+from typing import Dict, Iterable, Optional
+
+def percentile(samples: Iterable[float], fraction: float) -> Optional[float]:
+    """
+    Nearest-rank percentile of the samples, None when there are none
+    """
+    ordered = sorted(samples)
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+def latency_ms(samples: Iterable[float]) -> Dict[str, Optional[float]]:
+    """
+    p50 and p99 in milliseconds of latencies given in seconds
+    """
+    ordered = sorted(samples)
+    if not ordered:
+        return {"p50_ms": None, "p99_ms": None}
+    return {"p50_ms": statistics.median(ordered) * 1000, "p99_ms": percentile(ordered, 0.99) * 1000}
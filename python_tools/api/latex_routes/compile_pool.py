@@ -0,0 +1,270 @@
+"""
+Bounded pool of pdflatex processes for /latex/convert.
+
+pdflatex is located once when the app starts. Every compile runs as an
+asyncio subprocess in one of a fixed set of working directories, and
+taking a directory is what admits a job, so no more than
+LATEX_COMPILE_WORKERS compiles run at once. Directories are emptied and
+reused instead of creating a new temporary directory per request. Jobs
+wait for a free directory, but once LATEX_QUEUE_SIZE are already waiting,
+new ones are rejected straight away. A compile running past
+LATEX_COMPILE_TIMEOUT is killed. Documents whose preamble has a
+precompiled format (preamble_formats.py) compile only their body on top
+of it.
+
+Configuration (environment variables):
+    LATEX_COMPILE_WORKERS  concurrent pdflatex processes (default 2)
+    LATEX_QUEUE_SIZE       jobs allowed to wait for a worker (default 16)
+    LATEX_COMPILE_TIMEOUT  seconds before a compile is killed (default 30)
+"""
+import asyncio
+import os
+import shutil
+import tempfile
+from typing import List, Optional, Set, Tuple
+from .preamble_formats import preamble_formats, split_preamble
+
+# Known pdflatex paths including your MiKTeX install
+PDFLATEX_PATHS = [
+    r"C:\Users\ashis\AppData\Local\Programs\MiKTeX\miktex\bin\x64\pdflatex.exe",
+    r"C:\Program Files\MiKTeX\miktex\bin\x64\pdflatex.exe",
+    r"C:\Program Files\MiKTeX\miktex\bin\pdflatex.exe",
+    r"C:\texlive\2023\bin\win32\pdflatex.exe",
+    r"C:\texlive\2022\bin\win32\pdflatex.exe"
+]
+
+# pdflatex flags every compile runs with; part of the PDF cache key
+COMPILE_OPTIONS = ["-interaction=nonstopmode"]
+
+def find_pdflatex():
+    # Try system path first
+    path = shutil.which("pdflatex")
+    if path:
+        print(f"✅ Found pdflatex in system PATH: {path}")
+        return path
+
+    # Check known paths
+    for path in PDFLATEX_PATHS:
+        if os.path.exists(path):
+            print(f"✅ Found pdflatex at: {path}")
+            return path
+    return None
+
+class LatexUnavailable(Exception):
+    """
+    Raised when no pdflatex binary was found at startup.
+    """
+
+class LatexQueueFull(Exception):
+    """
+    Raised when a compile is requested while the wait queue is full.
+    """
+
+class LatexTimeout(Exception):
+    """
+    Raised when pdflatex ran past the timeout and was killed.
+    """
+
+class LatexCompileError(Exception):
+    """
+    Raised when pdflatex fails or produces no PDF; the message is its output.
+    """
+
+class LatexCompilePool:
+    def __init__(self, concurrency: int, max_waiting: int, timeout: float):
+        self.concurrency = concurrency
+        self.max_waiting = max_waiting
+        self.timeout = timeout
+        self.pdflatex_path: Optional[str] = None
+        self._base_dir: Optional[str] = None
+        self._work_dirs: Optional[asyncio.Queue] = None
+        self._waiting = 0
+        self._running: List[asyncio.subprocess.Process] = []
+        self._format_builds: Set[asyncio.Task] = set()
+        self.counters = {"compiled": 0, "compiled_from_format": 0, "failed": 0, "timed_out": 0, "rejected": 0}
+
+    def start(self) -> None:
+        """
+        Locate pdflatex and create the reusable working directories
+        """
+        self.pdflatex_path = find_pdflatex()
+        if not self.pdflatex_path:
+            print("⚠️  pdflatex not found; /latex/convert will fail until it is installed")
+        self._base_dir = tempfile.mkdtemp(prefix="latex_pool_")
+        self._work_dirs = asyncio.Queue()
+        for i in range(self.concurrency):
+            work_dir = os.path.join(self._base_dir, str(i))
+            os.makedirs(work_dir)
+            self._work_dirs.put_nowait(work_dir)
+
+    async def stop(self) -> None:
+        """
+        Kill compiles still running and remove the working directories
+        """
+        for task in list(self._format_builds):
+            task.cancel()
+        for process in list(self._running):
+            if process.returncode is None:
+                process.kill()
+        await asyncio.gather(*(process.wait() for process in self._running), return_exceptions=True)
+        if self._base_dir:
+            shutil.rmtree(self._base_dir, ignore_errors=True)
+        self._base_dir = None
+        self._work_dirs = None
+
+    async def compile(self, latex_code: str) -> bytes:
+        """
+        Compile a LaTeX document and return the PDF bytes
+        """
+        if self._work_dirs is None:
+            self.start()
+        if not self.pdflatex_path:
+            raise LatexUnavailable("pdflatex not found. Please install MiKTeX or TeX Live and ensure it's in your PATH.")
+        if self._work_dirs.empty() and self._waiting >= self.max_waiting:
+            self.counters["rejected"] += 1
+            raise LatexQueueFull(f"LaTeX compile queue is full ({self.max_waiting} jobs waiting)")
+
+        self._waiting += 1
+        try:
+            work_dir = await self._work_dirs.get()
+        finally:
+            self._waiting -= 1
+
+        try:
+            return await self._compile_in(work_dir, latex_code)
+        finally:
+            self._clear(work_dir)
+            self._work_dirs.put_nowait(work_dir)
+
+    def stats(self) -> dict:
+        return {
+            **self.counters,
+            "pdflatex": self.pdflatex_path,
+            "workers": self.concurrency,
+            "running": len(self._running),
+            "waiting": self._waiting,
+            "max_waiting": self.max_waiting,
+            "formats": {"enabled": False} if preamble_formats is None else {"enabled": True, **preamble_formats.stats()}
+        }
+
+    async def _compile_in(self, work_dir: str, latex_code: str) -> bytes:
+        preamble, body = split_preamble(latex_code)
+        if preamble_formats is None or preamble is None:
+            return await self._run(work_dir, latex_code)
+
+        key = preamble_formats.key(preamble, COMPILE_OPTIONS)
+        if preamble_formats.get(key):
+            try:
+                pdf_data = await self._run(work_dir, body, format_key=key)
+                self.counters["compiled_from_format"] += 1
+                return pdf_data
+            except LatexCompileError:
+                # either the body is broken or the format is; a full compile
+                # tells which, and reports the error if it is the body
+                self._clear(work_dir)
+                pdf_data = await self._run(work_dir, latex_code)
+                preamble_formats.discard(key)
+                return pdf_data
+
+        if preamble_formats.should_build(key):
+            task = asyncio.ensure_future(self._build_format(key, preamble))
+            self._format_builds.add(task)
+            task.add_done_callback(self._format_builds.discard)
+        return await self._run(work_dir, latex_code)
+
+    async def _build_format(self, key: str, preamble: str) -> None:
+        """
+        Dump a preamble into a format file, in a working directory of its own
+        """
+        work_dir = await self._work_dirs.get()
+        built_path = None
+        try:
+            tex_path = os.path.join(work_dir, "preamble.tex")
+            with open(tex_path, "w", encoding="utf-8") as f:
+                f.write(preamble)
+                f.write("\n\\dump\n")
+
+            print(f"⚙️  Dumping preamble format {key}")
+            returncode, stdout, stderr = await self._exec(
+                work_dir,
+                [self.pdflatex_path, "-ini", *COMPILE_OPTIONS, f"-jobname={key}",
+                 "-output-directory", work_dir, "&pdflatex", tex_path]
+            )
+            fmt_path = os.path.join(work_dir, f"{key}.fmt")
+            if returncode == 0 and os.path.exists(fmt_path):
+                built_path = fmt_path
+            else:
+                print(f"⚠️  Could not dump preamble format {key}: {stdout.decode(errors='replace')[-500:]}")
+        except Exception as e:
+            print(f"⚠️  Could not dump preamble format {key}: {str(e)}")
+        finally:
+            preamble_formats.store(key, built_path)
+            self._clear(work_dir)
+            self._work_dirs.put_nowait(work_dir)
+
+    async def _run(self, work_dir: str, source: str, format_key: Optional[str] = None) -> bytes:
+        tex_path = os.path.join(work_dir, "main.tex")
+        with open(tex_path, "w", encoding="utf-8") as f:
+            f.write(source)
+
+        args = [self.pdflatex_path, *COMPILE_OPTIONS]
+        env = None
+        if format_key:
+            args.append(f"-fmt={format_key}")
+            # trailing separator keeps kpathsea's default format path after ours
+            env = {**os.environ, "TEXFORMATS": preamble_formats.directory + os.pathsep}
+        args += ["-output-directory", work_dir, tex_path]
+
+        print(f"⚙️  Running pdflatex in: {work_dir}")
+        returncode, stdout, stderr = await self._exec(work_dir, args, env)
+
+        pdf_path = os.path.join(work_dir, "main.pdf")
+        if returncode != 0 or not os.path.exists(pdf_path):
+            self.counters["failed"] += 1
+            # pdflatex reports errors on stdout; keep the end, where they are
+            output = stderr.decode(errors="replace") or stdout.decode(errors="replace")[-4000:]
+            raise LatexCompileError(output or "PDF not generated")
+
+        with open(pdf_path, "rb") as f:
+            pdf_data = f.read()
+        self.counters["compiled"] += 1
+        return pdf_data
+
+    async def _exec(self, work_dir: str, args: List[str], env: Optional[dict] = None) -> Tuple[int, bytes, bytes]:
+        """
+        Run pdflatex to completion, killing it after the timeout
+        """
+        process = await asyncio.create_subprocess_exec(
+            *args,
+            cwd=work_dir,
+            env=env,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        self._running.append(process)
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            self.counters["timed_out"] += 1
+            raise LatexTimeout(f"LaTeX compilation timed out after {self.timeout:g}s")
+        finally:
+            self._running.remove(process)
+        return process.returncode, stdout, stderr
+
+    @staticmethod
+    def _clear(work_dir: str) -> None:
+        for name in os.listdir(work_dir):
+            path = os.path.join(work_dir, name)
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                os.remove(path)
+
+latex_pool = LatexCompilePool(
+    concurrency=int(os.getenv("LATEX_COMPILE_WORKERS", "2")),
+    max_waiting=int(os.getenv("LATEX_QUEUE_SIZE", "16")),
+    timeout=float(os.getenv("LATEX_COMPILE_TIMEOUT", "30"))
+)
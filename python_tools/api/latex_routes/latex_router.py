@@ -1,106 +1,113 @@
 from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
-import os
-import tempfile
-import subprocess
-from supabase import create_client
-from dotenv import load_dotenv
+from typing import Dict
+from ..database import get_supabase
+from .compile_pool import latex_pool, COMPILE_OPTIONS, LatexCompileError, LatexQueueFull, LatexTimeout, LatexUnavailable
+from .pdf_cache import latex_pdf_cache, LatexPdfCache
+import asyncio
 import uuid
-import shutil
-
-load_dotenv()
 
 router = APIRouter(prefix="/latex", tags=["latex"])
 
-# Initialize Supabase client
-supabase_url = os.getenv("SUPABASE_URL")
-supabase_key = os.getenv("SUPABASE_KEY")
-supabase = create_client(supabase_url, supabase_key)
-
-# Known pdflatex paths including your MiKTeX install
-PDFLATEX_PATHS = [
-    r"C:\Users\ashis\AppData\Local\Programs\MiKTeX\miktex\bin\x64\pdflatex.exe",
-    r"C:\Program Files\MiKTeX\miktex\bin\x64\pdflatex.exe",
-    r"C:\Program Files\MiKTeX\miktex\bin\pdflatex.exe",
-    r"C:\texlive\2023\bin\win32\pdflatex.exe",
-    r"C:\texlive\2022\bin\win32\pdflatex.exe"
-]
-
-def find_pdflatex():
-    # Try system path first
-    path = shutil.which("pdflatex")
-    if path:
-        print(f"✅ Found pdflatex in system PATH: {path}")
-        return path
-
-    # Check known paths
-    for path in PDFLATEX_PATHS:
-        if os.path.exists(path):
-            print(f"✅ Found pdflatex at: {path}")
-            return path
-    return None
+# conversions in progress by cache key, so identical concurrent requests
+# share one compile and upload
+_inflight: Dict[str, asyncio.Future] = {}
 
 class LatexRequest(BaseModel):
     latex_code: str
 
+async def compile_pdf(latex_code: str) -> bytes:
+    try:
+        return await latex_pool.compile(latex_code)
+    except LatexUnavailable as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    except LatexQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except LatexTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except LatexCompileError as e:
+        print(f"❌ pdflatex output: {str(e)}")
+        raise HTTPException(
+            status_code=400,
+            detail=f"LaTeX compilation failed: {str(e)}"
+        )
+
+async def upload_pdf(pdf_filename: str, pdf_data: bytes) -> str:
+    print(f"📤 Uploading PDF to Supabase as: {pdf_filename}")
+
+    # Upload to Supabase storage; content-addressed names may already exist
+    supabase = get_supabase()
+    await run_in_threadpool(
+        supabase.storage.from_("uploads").upload,
+        pdf_filename,
+        pdf_data,
+        {"content-type": "application/pdf", "x-upsert": "true"}
+    )
+
+    return supabase.storage.from_("uploads").get_public_url(pdf_filename)
+
+async def convert_cached(key: str, latex_code: str) -> str:
+    """
+    Compile (unless the PDF is on disk) and upload under the content key
+    """
+    pdf_data = await run_in_threadpool(latex_pdf_cache.get_pdf, key)
+    if pdf_data is None:
+        pdf_data = await compile_pdf(latex_code)
+        await run_in_threadpool(latex_pdf_cache.put_pdf, key, pdf_data)
+
+    pdf_url = await upload_pdf(f"latex_{key}.pdf", pdf_data)
+    await run_in_threadpool(latex_pdf_cache.mark_uploaded, key, pdf_url)
+    return pdf_url
+
 @router.post("/convert")
 async def convert_latex_to_pdf(request: LatexRequest):
     try:
-        pdflatex_path = find_pdflatex()
-        if not pdflatex_path:
-            raise HTTPException(
-                status_code=500,
-                detail="pdflatex not found. Please install MiKTeX or TeX Live and ensure it's in your PATH."
-            )
-
-        with tempfile.TemporaryDirectory() as temp_dir:
-            tex_path = os.path.join(temp_dir, "main.tex")
-            with open(tex_path, "w", encoding="utf-8") as f:
-                f.write(request.latex_code)
-
-            print(f"📄 Writing LaTeX to: {tex_path}")
-            print(f"⚙️  Running pdflatex from: {pdflatex_path}")
-
-            process = subprocess.run(
-                [pdflatex_path, "-interaction=nonstopmode", "-output-directory", temp_dir, tex_path],
-                capture_output=True,
-                text=True
-            )
-
-            if process.returncode != 0:
-                print(f"❌ pdflatex stderr: {process.stderr}")
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"LaTeX compilation failed: {process.stderr}"
-                )
-
-            pdf_path = os.path.join(temp_dir, "main.pdf")
-            if not os.path.exists(pdf_path):
-                raise HTTPException(
-                    status_code=500,
-                    detail="PDF not generated"
-                )
-
-            pdf_filename = f"latex_{uuid.uuid4()}.pdf"
-            with open(pdf_path, "rb") as f:
-                pdf_data = f.read()
-
-            print(f"📤 Uploading PDF to Supabase as: {pdf_filename}")
-
-            # Upload to Supabase storage
-            supabase.storage.from_("uploads").upload(
-                pdf_filename,
-                pdf_data,
-                {"content-type": "application/pdf"}
-            )
-
-            pdf_url = supabase.storage.from_("uploads").get_public_url(pdf_filename)
-
+        if latex_pdf_cache is None:
+            pdf_data = await compile_pdf(request.latex_code)
+            pdf_url = await upload_pdf(f"latex_{uuid.uuid4()}.pdf", pdf_data)
             return {
                 "message": "LaTeX successfully converted to PDF",
                 "pdf_url": pdf_url
             }
 
+        key = LatexPdfCache.key(request.latex_code, COMPILE_OPTIONS)
+        pdf_url = await run_in_threadpool(latex_pdf_cache.uploaded_url, key)
+        if pdf_url:
+            return {
+                "message": "LaTeX successfully converted to PDF",
+                "pdf_url": pdf_url,
+                "cached": True
+            }
+
+        if key not in _inflight:
+            task = asyncio.ensure_future(convert_cached(key, request.latex_code))
+            _inflight[key] = task
+            task.add_done_callback(lambda _: _inflight.pop(key, None))
+        # shield so one caller disconnecting doesn't cancel the others' conversion
+        pdf_url = await asyncio.shield(_inflight[key])
+
+        return {
+            "message": "LaTeX successfully converted to PDF",
+            "pdf_url": pdf_url,
+            "cached": False
+        }
+
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"🚨 Error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error converting LaTeX to PDF: {str(e)}")
+
+@router.get("/stats")
+async def latex_stats():
+    """
+    Report compile counters, queue depth and PDF cache hit ratio
+    """
+    cache = {"enabled": False}
+    if latex_pdf_cache is not None:
+        cache = {"enabled": True, **await run_in_threadpool(latex_pdf_cache.stats)}
+    return {
+        **latex_pool.stats(),
+        "cache": cache
+    }
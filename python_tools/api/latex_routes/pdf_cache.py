@@ -0,0 +1,126 @@
+"""
+Content-addressed cache of compiled LaTeX PDFs.
+
+Compiled PDFs are keyed by a hash of the LaTeX source and the compiler
+options, and uploaded under that key, so the same source always maps to
+the same object in the uploads bucket. Once a key is known to be uploaded,
+/latex/convert returns its public URL straight away, without compiling or
+uploading.
+
+A local on-disk tier keeps the PDF bytes in an LRU bounded by
+LATEX_CACHE_MAX_BYTES. It covers keys that were compiled but whose upload
+failed or was never confirmed: those are uploaded again from disk instead
+of being recompiled. The uploaded URLs form a second LRU, bounded by
+LATEX_CACHE_URL_MAX_BYTES; a key whose URL was evicted is simply uploaded
+again, to the same object. Both indexes are ByteBoundedStore tables
+(api/sqlite_store.py) in a SQLite file next to the PDFs, so they survive
+restarts. Every method does file or SQLite I/O, so async callers run them
+in the threadpool.
+
+Configuration (environment variables):
+    LATEX_CACHE_ENABLED        "false" disables the cache (default true)
+    LATEX_CACHE_DIR            directory of the on-disk tier (default .cache/latex)
+    LATEX_CACHE_MAX_BYTES      size budget of cached PDF files (default 256 MiB)
+    LATEX_CACHE_URL_MAX_BYTES  size budget of the uploaded URL index (default 16 MiB)
+"""
+import hashlib
+import os
+import threading
+from typing import Dict, List, Optional
+from ..sqlite_store import ByteBoundedStore, open_db
+
+class LatexPdfCache:
+    def __init__(self, directory: str, max_bytes: int, url_max_bytes: int):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self.counters = {"url_hits": 0, "disk_hits": 0, "misses": 0}
+
+        os.makedirs(directory, exist_ok=True)
+        db = open_db(os.path.join(directory, "index.sqlite3"))
+        self._drop_legacy_index(db)
+        self._files = ByteBoundedStore(db, "latex_pdf_files", max_bytes, on_evict=self._remove_file)
+        self._urls = ByteBoundedStore(db, "latex_pdf_urls", url_max_bytes)
+
+    @staticmethod
+    def key(latex_code: str, options: List[str]) -> str:
+        digest = hashlib.sha256()
+        for part in (*options, latex_code):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def uploaded_url(self, key: str) -> Optional[str]:
+        """
+        Public URL of the key if it is known to be uploaded
+        """
+        with self._lock:
+            url = self._urls.get(key)
+            if url is not None:
+                self.counters["url_hits"] += 1
+            return url
+
+    def get_pdf(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            try:
+                with open(self._path(key), "rb") as f:
+                    data = f.read()
+            except FileNotFoundError:
+                self.counters["misses"] += 1
+                return None
+            self._files.touch(key)
+            self.counters["disk_hits"] += 1
+            return data
+
+    def put_pdf(self, key: str, data: bytes) -> None:
+        with self._lock:
+            # write then rename so a concurrent reader never sees half a file
+            tmp_path = f"{self._path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(key))
+            self._files.put(key, None, len(data))
+
+    def mark_uploaded(self, key: str, url: str) -> None:
+        with self._lock:
+            self._urls.put(key, url, len(url.encode("utf-8")))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.counters["url_hits"] + self.counters["disk_hits"] + self.counters["misses"]
+            return {
+                **self.counters,
+                "hit_ratio": (self.counters["url_hits"] + self.counters["disk_hits"]) / lookups if lookups else 0.0,
+                "evictions": self._files.evictions,
+                "url_evictions": self._urls.evictions,
+                "files": self._files.count(),
+                "uploaded": self._urls.count(),
+                "disk_bytes": self._files.total_bytes,
+                "url_index_bytes": self._urls.total_bytes
+            }
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.pdf")
+
+    def _remove_file(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def _drop_legacy_index(self, db) -> None:
+        # latex_pdfs held files and URLs in one table and never evicted URLs;
+        # its PDFs are removed rather than left on disk uncounted
+        if db.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'latex_pdfs'").fetchone() is None:
+            return
+        for (key,) in db.execute("SELECT key FROM latex_pdfs WHERE size > 0").fetchall():
+            self._remove_file(key)
+        db.execute("DROP TABLE latex_pdfs")
+        db.commit()
+
+latex_pdf_cache = None
+if os.getenv("LATEX_CACHE_ENABLED", "true").lower() != "false":
+    latex_pdf_cache = LatexPdfCache(
+        directory=os.getenv("LATEX_CACHE_DIR", os.path.join(".cache", "latex")),
+        max_bytes=int(os.getenv("LATEX_CACHE_MAX_BYTES", str(256 * 1024 * 1024))),
+        url_max_bytes=int(os.getenv("LATEX_CACHE_URL_MAX_BYTES", str(16 * 1024 * 1024)))
+    )
@@ -0,0 +1,136 @@
+"""
+Precompiled format files for shared LaTeX preambles.
+
+Report templates differ in their tables but share a preamble (document
+class, geometry, tables, fonts), and pdflatex re-reads every package of it
+on each compile. Once the same preamble has been seen
+LATEX_FORMAT_MIN_USES times, the compile pool dumps it into a format file
+with `pdflatex -ini "&pdflatex" <preamble>\\dump`. Later documents with
+that preamble compile only their body, starting from the format.
+
+Formats are keyed by a hash of the preamble and the compiler options and
+stored in LATEX_FORMAT_DIR. The LATEX_FORMAT_MAX_FILES most recently used
+are kept. A format that fails to load, for example after a TeX upgrade, is
+discarded, and the document is compiled in full.
+
+Configuration (environment variables):
+    LATEX_FORMATS_ENABLED   "false" disables preamble formats (default true)
+    LATEX_FORMAT_DIR        directory of format files (default .cache/latex/formats)
+    LATEX_FORMAT_MIN_USES   times a preamble is seen before it is dumped (default 2)
+    LATEX_FORMAT_MAX_FILES  format files kept (default 16)
+"""
+import hashlib
+import os
+import shutil
+import threading
+from collections import Counter
+from typing import List, Optional, Tuple
+
+BEGIN_DOCUMENT = "\\begin{document}"
+
+def split_preamble(latex_code: str) -> Tuple[Optional[str], str]:
+    """
+    Split a document into (preamble, body) at \\begin{document}; the
+    preamble is None when there is nothing to split
+    """
+    index = latex_code.find(BEGIN_DOCUMENT)
+    if index <= 0 or "\\documentclass" not in latex_code[:index]:
+        return None, latex_code
+    return latex_code[:index], latex_code[index:]
+
+class PreambleFormatCache:
+    def __init__(self, directory: str, min_uses: int, max_files: int):
+        self.directory = directory
+        self.min_uses = min_uses
+        self.max_files = max_files
+        self._uses: Counter = Counter()
+        self._building: set = set()
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "builds": 0, "build_failures": 0, "discarded": 0}
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(preamble: str, options: List[str]) -> str:
+        digest = hashlib.sha256()
+        for part in (*options, preamble.strip()):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        # format names end up on the pdflatex command line; keep them short
+        return f"pre_{digest.hexdigest()[:32]}"
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.fmt")
+
+    def get(self, key: str) -> bool:
+        """
+        Whether a format for key is ready to use
+        """
+        try:
+            # the mtime is the LRU clock
+            os.utime(self.path(key))
+        except FileNotFoundError:
+            return False
+        self.counters["hits"] += 1
+        return True
+
+    def should_build(self, key: str) -> bool:
+        """
+        Count a use of a preamble without a format, and claim the build once
+        it has been seen often enough
+        """
+        with self._lock:
+            self._uses[key] += 1
+            if self._uses[key] < self.min_uses or key in self._building:
+                return False
+            self._building.add(key)
+            return True
+
+    def store(self, key: str, built_path: Optional[str]) -> None:
+        """
+        Move a freshly dumped format into place (None when the build failed)
+        """
+        with self._lock:
+            self._building.discard(key)
+            if built_path is None:
+                self.counters["build_failures"] += 1
+                # start counting again rather than retrying on every compile
+                self._uses[key] = 0
+                return
+            # the pool's working directories may be on another filesystem, so
+            # copy next to the target first and rename into place atomically
+            tmp_path = f"{self.path(key)}.tmp"
+            shutil.move(built_path, tmp_path)
+            os.replace(tmp_path, self.path(key))
+            self._uses.pop(key, None)
+            self.counters["builds"] += 1
+            self._evict()
+
+    def discard(self, key: str) -> None:
+        try:
+            os.remove(self.path(key))
+            self.counters["discarded"] += 1
+        except FileNotFoundError:
+            pass
+
+    def stats(self) -> dict:
+        return {**self.counters, "formats": len(self._format_files())}
+
+    def _format_files(self) -> List[str]:
+        return [name for name in os.listdir(self.directory) if name.endswith(".fmt")]
+
+    def _evict(self) -> None:
+        files = sorted(
+            (os.path.join(self.directory, name) for name in self._format_files()),
+            key=os.path.getmtime
+        )
+        for path in files[:max(0, len(files) - self.max_files)]:
+            os.remove(path)
+
+preamble_formats = None
+if os.getenv("LATEX_FORMATS_ENABLED", "true").lower() != "false":
+    preamble_formats = PreambleFormatCache(
+        # absolute, since pdflatex resolves TEXFORMATS against its own work dir
+        directory=os.path.abspath(os.getenv("LATEX_FORMAT_DIR", os.path.join(".cache", "latex", "formats"))),
+        min_uses=int(os.getenv("LATEX_FORMAT_MIN_USES", "2")),
+        max_files=int(os.getenv("LATEX_FORMAT_MAX_FILES", "16"))
+    )
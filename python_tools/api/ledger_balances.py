@@ -0,0 +1,120 @@
+"""
+Rebuild and verification of the incrementally maintained ledger_balances,
+and month-end balance snapshots.
+
+save_document_results keeps every (user_id, account_name) balance current
+by applying each batch's summed per-account deltas in the same transaction
+as the inserts (migrations/004_ledger_balances.sql, with the lock ordering
+of 007_save_document_results_lock_order.sql). This module recomputes
+the balances from ledger_entries to check that incremental state, and to
+repair it after ledger_entries were changed by hand.
+
+Historical trial balances start from the nearest month-end snapshot
+(migrations/005_ledger_balance_snapshots.sql). snapshot builds the missing
+ones and is meant to run from cron shortly after each month end; back-dated
+entries drop the affected snapshots and the next run rebuilds them.
+
+Usage (from python_tools/):
+    python -m api.ledger_balances verify [--user-id <uuid>]
+    python -m api.ledger_balances rebuild [--user-id <uuid>]
+    python -m api.ledger_balances snapshot [--user-id <uuid>] [--through YYYY-MM-DD]
+
+verify exits with status 1 when any balance has drifted. rebuild reports
+the drift it found, recomputes the balances and verifies them again.
+"""
+import argparse
+import asyncio
+import sys
+from typing import Dict, List, Optional
+from fastapi.concurrency import run_in_threadpool
+from .database import get_supabase
+
+async def verify_ledger_balances(user_id: Optional[str] = None) -> List[Dict]:
+    """
+    Compare stored balances against ones recomputed from ledger_entries
+
+    Args:
+        user_id (Optional[str]): Limit the check to one user; every user when None
+
+    Returns:
+        List[Dict]: {"user_id", "account_name", "stored_balance", "computed_balance"}
+                    for every account whose stored balance is wrong or missing
+    """
+    response = await run_in_threadpool(
+        get_supabase().rpc("verify_ledger_balances", {"p_user_id": user_id}).execute
+    )
+    return response.data or []
+
+async def rebuild_ledger_balances(user_id: Optional[str] = None) -> int:
+    """
+    Recompute balances from ledger_entries and relink each entry to its
+    balance row
+
+    Args:
+        user_id (Optional[str]): Limit the rebuild to one user; every user when None
+
+    Returns:
+        int: Number of balance rows written
+    """
+    response = await run_in_threadpool(
+        get_supabase().rpc("rebuild_ledger_balances", {"p_user_id": user_id}).execute
+    )
+    return response.data or 0
+
+async def snapshot_ledger_balances(user_id: Optional[str] = None, through: Optional[str] = None) -> int:
+    """
+    Build every missing month-end balance snapshot
+
+    Args:
+        user_id (Optional[str]): Limit to one user; every user when None
+        through (Optional[str]): Last date to snapshot (YYYY-MM-DD); the last
+                                 completed month when None
+
+    Returns:
+        int: Number of month-end snapshots written
+    """
+    response = await run_in_threadpool(
+        get_supabase().rpc("snapshot_ledger_balances", {"p_user_id": user_id, "p_through": through}).execute
+    )
+    return response.data or 0
+
+def _print_drift(drift: List[Dict]) -> None:
+    for row in drift:
+        print(
+            f"   {row['user_id']} {row['account_name']}: "
+            f"stored {row['stored_balance']} != computed {row['computed_balance']}"
+        )
+
+async def main(args) -> int:
+    if args.command == "snapshot":
+        written = await snapshot_ledger_balances(args.user_id, args.through)
+        print(f"📸 Wrote {written} month-end ledger snapshots")
+        return 0
+
+    drift = await verify_ledger_balances(args.user_id)
+    if drift:
+        print(f"⚠️  {len(drift)} ledger balances differ from ledger_entries")
+        _print_drift(drift)
+    else:
+        print("✅ Ledger balances match ledger_entries")
+
+    if args.command == "verify":
+        return 1 if drift else 0
+
+    written = await rebuild_ledger_balances(args.user_id)
+    print(f"♻️  Rebuilt {written} ledger balances")
+
+    drift = await verify_ledger_balances(args.user_id)
+    if drift:
+        print(f"🚨 {len(drift)} ledger balances still differ after the rebuild")
+        _print_drift(drift)
+        return 1
+    print("✅ Ledger balances match ledger_entries")
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["verify", "rebuild", "snapshot"])
+    parser.add_argument("--user-id")
+    parser.add_argument("--through")
+    sys.exit(asyncio.run(main(parser.parse_args())))
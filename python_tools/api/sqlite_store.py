@@ -0,0 +1,97 @@
+"""
+SQLite table of cache entries bounded by their total size in bytes.
+
+Shared by the LLM result cache and the LaTeX PDF cache. Every entry records
+its size; once the sizes add up to more than max_bytes, the least recently
+accessed entries are deleted, a batch at a time through the last_access
+index. The total is kept as a running sum and only summed from the table
+when the store is opened.
+
+A store does no locking of its own: the cache that owns it serializes
+access under its lock.
+"""
+import os
+import sqlite3
+import time
+from typing import Callable, Optional
+
+# rows read per eviction query
+EVICTION_BATCH = 64
+
+def open_db(path: str) -> sqlite3.Connection:
+    """
+    Open (creating its directory) a SQLite file shared across threads
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    db = sqlite3.connect(path, check_same_thread=False)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    return db
+
+class ByteBoundedStore:
+    def __init__(self, db: sqlite3.Connection, table: str, max_bytes: int, on_evict: Optional[Callable[[str], None]] = None):
+        """
+        Args:
+            db (sqlite3.Connection): connection from open_db
+            table (str): table holding the entries, created if missing
+            max_bytes (int): budget for the sum of the entries' sizes
+            on_evict (callable, optional): called with the key of every
+                evicted entry, to drop what the entry stands for
+        """
+        self._db = db
+        self.table = table
+        self.max_bytes = max_bytes
+        self.on_evict = on_evict
+        self.evictions = 0
+        db.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, value TEXT, size INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        db.execute(f"CREATE INDEX IF NOT EXISTS {table}_last_access ON {table} (last_access)")
+        db.commit()
+        # the only full scan; puts and evictions keep the total from here on
+        self.total_bytes = db.execute(f"SELECT COALESCE(SUM(size), 0) FROM {table}").fetchone()[0]
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Value stored under the key, or None, refreshing its last access
+        """
+        row = self._db.execute(f"SELECT value FROM {self.table} WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        self.touch(key)
+        return row[0]
+
+    def touch(self, key: str) -> None:
+        self._db.execute(f"UPDATE {self.table} SET last_access = ? WHERE key = ?", (time.time(), key))
+        self._db.commit()
+
+    def put(self, key: str, value: Optional[str], size: int) -> None:
+        replaced = self._db.execute(f"SELECT size FROM {self.table} WHERE key = ?", (key,)).fetchone()
+        self._db.execute(
+            f"INSERT OR REPLACE INTO {self.table} (key, value, size, last_access) VALUES (?, ?, ?, ?)",
+            (key, value, size, time.time())
+        )
+        self.total_bytes += size - (replaced[0] if replaced else 0)
+        self._evict()
+        self._db.commit()
+
+    def count(self) -> int:
+        return self._db.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    def _evict(self) -> None:
+        while self.total_bytes > self.max_bytes:
+            rows = self._db.execute(
+                f"SELECT key, size FROM {self.table} ORDER BY last_access LIMIT {EVICTION_BATCH}"
+            ).fetchall()
+            if not rows:
+                self.total_bytes = 0
+                return
+            for key, size in rows:
+                if self.total_bytes <= self.max_bytes:
+                    return
+                self._db.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                if self.on_evict is not None:
+                    self.on_evict(key)
+                self.total_bytes -= size
+                self.evictions += 1
@@ -1,57 +1,56 @@
-from fastapi import APIRouter, HTTPException, Request
-import os
-from typing import Dict, List
-from supabase import create_client, Client
-from dotenv import load_dotenv
+from fastapi import APIRouter, Depends, HTTPException
+from typing import Dict, Optional
+from ...auth import get_current_user
+from ...entries_cache import cached_json_response
+from ...json_response import FastJSONResponse
+from ..journal_entry_pages import fetch_entries_page, page_size, select_columns, stream_entries
 # from ..user_router import router
 
-# Load environment variables
-load_dotenv()
-
-# Initialize Supabase client
-supabase_url = os.getenv("SUPABASE_URL", "")
-supabase_key = os.getenv("SUPABASE_KEY", "")
-supabase = create_client(supabase_url, supabase_key)
-
 router = APIRouter()
 
 @router.get("/fetch-user-entries")
-async def fetch_user_entries(request: Request) -> Dict:
+async def fetch_user_entries(
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    stream: bool = False,
+    fields: Optional[str] = None,
+    include_user: bool = False,
+    user: Dict = Depends(get_current_user)
+):
     """
-    Fetch all journal entries for the authenticated user from the Supabase database
+    Fetch the authenticated user's journal entries from the Supabase database, newest first.
+    Returns one page of at most limit entries; pass next_cursor back as cursor for the next page.
+    With stream=true every entry from cursor onwards is sent as NDJSON instead.
+    fields (comma-separated, see JOURNAL_ENTRY_FIELDS) limits the columns returned;
+    include_user=true echoes the authenticated user.
     """
     try:
-        # Get the authorization header
-        auth_header = request.headers.get("Authorization")
-        if not auth_header:
-            raise HTTPException(status_code=401, detail="Authorization header is missing")
-
-        # Extract the token from Bearer token
-        if not auth_header.startswith("Bearer "):
-            raise HTTPException(status_code=401, detail="Invalid authorization header format. Must be 'Bearer <token>'")
-        
-        token = auth_header.split(" ")[1]
-
-        # Verify the user and get their ID
-        response = supabase.auth.get_user(token)
-        user_id = response.user.id
-
-        # Fetch all entries for the user from the journal_entries table
-        entries = supabase.table("journal_entries") \
-            .select("*") \
-            .eq("user_id", user_id) \
-            .order("entry_date", desc=True) \
-            .execute()
-
-        if hasattr(entries, 'error') and entries.error:
-            raise HTTPException(status_code=500, detail=str(entries.error))
-
-        return {
-            "success": True,
-            "user": response.user,
-            "data": entries.data,
-            "error": None
-        }
-
+        user_id = user["id"]
+        columns = select_columns(fields)
+
+        if stream:
+            return stream_entries(user_id, cursor, columns=columns)
+
+        size = page_size(limit)
+
+        async def build() -> Dict:
+            entries, next_cursor = await fetch_entries_page(user_id, size, cursor, columns=columns)
+            content = {
+                "success": True,
+                "data": entries,
+                "next_cursor": next_cursor,
+                "error": None
+            }
+            if include_user:
+                content["user"] = user
+            return content
+
+        # the user echo carries per-token claims, so it is never cached
+        if include_user:
+            return FastJSONResponse(await build())
+        return await cached_json_response(user_id, ("all", columns, size, cursor), build)
+
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching user entries: {str(e)}")
@@ -1,20 +1,13 @@
-from fastapi import APIRouter, HTTPException, Request
-import os
-from typing import Dict, List, Optional
-from supabase import create_client, Client
-from dotenv import load_dotenv
+from fastapi import APIRouter, Depends, HTTPException
+from typing import Dict, Optional
+from ...auth import get_current_user
+from ...entries_cache import cached_json_response, entries_cache
+from ...json_response import FastJSONResponse
+from ..journal_entry_pages import fetch_entries_page, page_size, select_columns, stream_entries
 from datetime import datetime
 from pydantic import BaseModel
 # from ..user_router import router
 
-# Load environment variables
-load_dotenv()
-
-# Initialize Supabase client
-supabase_url = os.getenv("SUPABASE_URL", "")
-supabase_key = os.getenv("SUPABASE_KEY", "")
-supabase = create_client(supabase_url, supabase_key)
-
 router = APIRouter()
 
 class DateRange(BaseModel):
@@ -22,26 +15,23 @@ class DateRange(BaseModel):
     end_date: Optional[str] = None  # Format: YYYY-MM-DD, defaults to current date
 
 @router.post("/fetch-user-entries-between-dates")
-async def fetch_user_entries_between_dates(date_range: DateRange, request: Request) -> Dict:
+async def fetch_user_entries_between_dates(
+    date_range: DateRange,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    stream: bool = False,
+    fields: Optional[str] = None,
+    include_user: bool = False,
+    user: Dict = Depends(get_current_user)
+):
     """
     Fetch journal entries for the authenticated user between two dates from the Supabase database.
     If end_date is not provided, it defaults to the current date.
+    Paginated, streamable and projectable like /fetch-user-entries.
     """
     try:
-        # Get the authorization header
-        auth_header = request.headers.get("Authorization")
-        if not auth_header:
-            raise HTTPException(status_code=401, detail="Authorization header is missing")
-
-        # Extract the token from Bearer token
-        if not auth_header.startswith("Bearer "):
-            raise HTTPException(status_code=401, detail="Invalid authorization header format. Must be 'Bearer <token>'")
-        
-        token = auth_header.split(" ")[1]
-
-        # Verify the user and get their ID
-        response = supabase.auth.get_user(token)
-        user_id = response.user.id
+        user_id = user["id"]
+        columns = select_columns(fields)
 
         # Validate date format for start_date
         try:
@@ -60,23 +50,42 @@ async def fetch_user_entries_between_dates(date_range: DateRange, request: Reque
                 raise HTTPException(status_code=400, detail="Invalid end_date format. Use YYYY-MM-DD")
 
         # Fetch entries for the user between the specified dates
-        entries = supabase.table("journal_entries") \
-            .select("*") \
-            .eq("user_id", user_id) \
-            .gte("entry_date", date_range.start_date) \
-            .lte("entry_date", end_date) \
-            .order("entry_date", desc=True) \
-            .execute()
+        if stream:
+            return stream_entries(user_id, cursor, date_range.start_date, end_date, columns)
 
-        if hasattr(entries, 'error') and entries.error:
-            raise HTTPException(status_code=500, detail=str(entries.error))
+        size = page_size(limit)
 
-        return {
-            "success": True,
-            "user": response.user,
-            "data": entries.data,
-            "error": None
-        }
+        async def build() -> Dict:
+            entries, next_cursor = await fetch_entries_page(
+                user_id, size, cursor, date_range.start_date, end_date, columns
+            )
+            content = {
+                "success": True,
+                "data": entries,
+                "next_cursor": next_cursor,
+                "error": None
+            }
+            if include_user:
+                content["user"] = user
+            return content
 
+        # the user echo carries per-token claims, so it is never cached
+        if include_user:
+            return FastJSONResponse(await build())
+        return await cached_json_response(
+            user_id, ("between", date_range.start_date, end_date, columns, size, cursor), build
+        )
+
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching user entries: {str(e)}")
+
+@router.get("/entries-cache-stats")
+async def entries_cache_stats() -> Dict:
+    """
+    Report hit ratio, size and lookup latency of the entry listing cache
+    """
+    if entries_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **entries_cache.stats()}
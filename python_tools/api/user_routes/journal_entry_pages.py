@@ -0,0 +1,193 @@
+"""
+Keyset pagination and NDJSON streaming over a user's journal_entries.
+
+Entries are ordered newest first on (entry_date, id), and a page continues
+strictly after the last row of the previous one. The database therefore
+seeks straight to the next page through the (user_id, entry_date) index,
+however deep into the history the client is. The position is handed to
+clients as an opaque cursor.
+
+Clients may ask for a subset of JOURNAL_ENTRY_FIELDS, which is sent to the
+database as the select projection so unused columns never leave it.
+
+Configuration (environment variables):
+    ENTRIES_PAGE_SIZE         rows per page when the client gives no limit (default 100)
+    ENTRIES_MAX_PAGE_SIZE     largest limit a client may ask for (default 1000)
+    ENTRIES_STREAM_PAGE_SIZE  rows fetched per database round trip while streaming (default 500)
+"""
+import base64
+import json
+import os
+import re
+import uuid
+from datetime import date
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from ..database import get_supabase
+from ..json_response import dumps
+
+ENTRIES_PAGE_SIZE = int(os.getenv("ENTRIES_PAGE_SIZE", "100"))
+ENTRIES_MAX_PAGE_SIZE = int(os.getenv("ENTRIES_MAX_PAGE_SIZE", "1000"))
+ENTRIES_STREAM_PAGE_SIZE = int(os.getenv("ENTRIES_STREAM_PAGE_SIZE", "500"))
+
+JOURNAL_ENTRY_FIELDS = (
+    "id", "user_id", "entry_date", "account_debited", "account_credited", "amount", "currency",
+    "description", "source_id", "source_type", "source_document_url", "created_at"
+)
+# the cursor is taken from these, so they are always selected
+KEYSET_FIELDS = ("entry_date", "id")
+
+ISO_DATE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+def encode_cursor(row: Dict) -> str:
+    raw = json.dumps([row["entry_date"], row["id"]]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[str, object]:
+    """
+    Turn a cursor back into the (entry_date, id) it was taken at, raising
+    HTTPException(400) if it was not produced by encode_cursor.
+
+    Both values are interpolated into a raw or= filter, so they are checked
+    against the column types: entry_date must be a YYYY-MM-DD date and id
+    an integer or a UUID, returned in canonical form.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        entry_date, entry_id = json.loads(raw)
+        if not isinstance(entry_date, str) or not ISO_DATE.fullmatch(entry_date):
+            raise ValueError("entry_date is not YYYY-MM-DD")
+        date.fromisoformat(entry_date)
+        if isinstance(entry_id, int) and not isinstance(entry_id, bool):
+            return entry_date, entry_id
+        if isinstance(entry_id, str):
+            return entry_date, str(uuid.UUID(entry_id))
+        raise ValueError("id is neither an integer nor a UUID")
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def select_columns(fields: Optional[str]) -> str:
+    """
+    Turn a comma-separated fields parameter into the select projection,
+    raising HTTPException(400) for columns outside JOURNAL_ENTRY_FIELDS.
+    Without fields every column is selected.
+    """
+    if not fields:
+        return "*"
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in JOURNAL_ENTRY_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(JOURNAL_ENTRY_FIELDS)}"
+        )
+    columns = list(dict.fromkeys(requested))
+    columns += [field for field in KEYSET_FIELDS if field not in columns]
+    return ",".join(columns)
+
+def page_size(limit: Optional[int]) -> int:
+    if limit is None:
+        return ENTRIES_PAGE_SIZE
+    if limit < 1:
+        raise HTTPException(status_code=400, detail="limit must be at least 1")
+    return min(limit, ENTRIES_MAX_PAGE_SIZE)
+
+async def fetch_entries_page(
+    user_id: str,
+    limit: int,
+    cursor: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    columns: str = "*"
+) -> Tuple[List[Dict], Optional[str]]:
+    """
+    Fetch one page of journal entries, newest first
+
+    Args:
+        user_id (str): Owner of the entries
+        limit (int): Maximum rows in the page
+        cursor (Optional[str]): next_cursor of the previous page; None for the first page
+        start_date (Optional[str]): Earliest entry_date to include (YYYY-MM-DD)
+        end_date (Optional[str]): Latest entry_date to include (YYYY-MM-DD)
+        columns (str): Select projection from select_columns
+
+    Returns:
+        Tuple[List[Dict], Optional[str]]: The rows and the cursor of the next
+        page, None when this was the last one
+    """
+    query = get_supabase().table("journal_entries") \
+        .select(columns) \
+        .eq("user_id", user_id)
+
+    if start_date is not None:
+        query = query.gte("entry_date", start_date)
+    if end_date is not None:
+        query = query.lte("entry_date", end_date)
+    if cursor is not None:
+        entry_date, entry_id = decode_cursor(cursor)
+        # postgrest-py 0.11 has no or_() builder; add the or= filter directly
+        query.params = query.params.add(
+            "or", f"(entry_date.lt.{entry_date},and(entry_date.eq.{entry_date},id.lt.{entry_id}))"
+        )
+
+    # chained .order() calls would send two order= params, and PostgREST
+    # only honours one, so both keys go in a single parameter
+    query.params = query.params.add("order", "entry_date.desc,id.desc")
+
+    # one extra row tells whether another page follows
+    response = await run_in_threadpool(query.limit(limit + 1).execute)
+
+    if hasattr(response, 'error') and response.error:
+        raise HTTPException(status_code=500, detail=str(response.error))
+
+    rows = response.data or []
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor(rows[-1])
+    return rows, None
+
+async def iter_entries(
+    user_id: str,
+    cursor: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    columns: str = "*"
+) -> AsyncIterator[Dict]:
+    """
+    Yield every entry from cursor onwards, holding one page in memory at a time
+    """
+    while True:
+        rows, cursor = await fetch_entries_page(
+            user_id, ENTRIES_STREAM_PAGE_SIZE, cursor, start_date, end_date, columns
+        )
+        for row in rows:
+            yield row
+        if cursor is None:
+            return
+
+def stream_entries(
+    user_id: str,
+    cursor: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    columns: str = "*"
+) -> StreamingResponse:
+    """
+    Stream entries as NDJSON, one row per line, sending each page as soon as
+    the database returns it. The status code is already sent by the time a
+    later page can fail, so a failure ends the stream with an {"error": ...} line.
+    """
+    if cursor is not None:
+        decode_cursor(cursor)
+
+    async def lines() -> AsyncIterator[bytes]:
+        try:
+            async for row in iter_entries(user_id, cursor, start_date, end_date, columns):
+                yield dumps(row) + b"\n"
+        except Exception as e:
+            detail = e.detail if isinstance(e, HTTPException) else str(e)
+            yield dumps({"error": detail}) + b"\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
@@ -0,0 +1,100 @@
+"""
+Trial balance of the authenticated user as of a date.
+
+The per-account debit and credit totals come from the trial_balance
+database function (migrations/003_trial_balance.sql) in one grouped query,
+which starts from the nearest month-end snapshot and only aggregates the
+entries after it (migrations/005_ledger_balance_snapshots.sql). This module
+only splits the accounts onto their balance side and totals each side.
+"""
+from decimal import Decimal
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from typing import Dict, List, Optional
+from ...database import get_supabase
+from ...auth import get_current_user
+from datetime import datetime
+from pydantic import BaseModel
+
+router = APIRouter()
+
+CENT = Decimal("0.01")
+
+class TrialBalanceRequest(BaseModel):
+    as_of_date: Optional[str] = None  # Format: YYYY-MM-DD, defaults to every entry
+
+def _money(value) -> Decimal:
+    # numeric columns arrive as JSON numbers; go through str so 0.1 stays 0.1
+    return Decimal(str(value or 0)).quantize(CENT)
+
+def summarise_trial_balance(rows: List[Dict]) -> Dict:
+    """
+    Split per-account totals onto the debit and credit side and check that
+    both sides agree
+
+    Args:
+        rows (List[Dict]): {"account_name", "total_debit", "total_credit", "balance"} per account
+
+    Returns:
+        Dict: Accounts on each side, side totals, difference and balanced flag
+    """
+    debit, credit = [], []
+    total_debit = total_credit = Decimal(0)
+
+    for row in rows:
+        balance = _money(row["balance"])
+        account = {
+            "account_name": row["account_name"],
+            "total_debit": float(_money(row["total_debit"])),
+            "total_credit": float(_money(row["total_credit"])),
+            "balance_amount": float(abs(balance))
+        }
+        if balance >= 0:
+            debit.append(account)
+            total_debit += balance
+        else:
+            credit.append(account)
+            total_credit -= balance
+
+    return {
+        "debit": debit,
+        "credit": credit,
+        "total_debit": float(total_debit),
+        "total_credit": float(total_credit),
+        "difference": float(total_debit - total_credit),
+        "balanced": total_debit == total_credit
+    }
+
+@router.post("/trial-balance")
+async def trial_balance(request: TrialBalanceRequest, user: Dict = Depends(get_current_user)) -> Dict:
+    """
+    Compute the trial balance of the authenticated user as of a date.
+    Without as_of_date every ledger entry is included.
+    """
+    if request.as_of_date is not None:
+        try:
+            datetime.strptime(request.as_of_date, "%Y-%m-%d")
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid as_of_date format. Use YYYY-MM-DD")
+
+    try:
+        response = await run_in_threadpool(
+            get_supabase().rpc("trial_balance", {"p_user_id": user["id"], "p_as_of": request.as_of_date}).execute
+        )
+
+        if hasattr(response, 'error') and response.error:
+            raise HTTPException(status_code=500, detail=str(response.error))
+
+        return {
+            "success": True,
+            "data": {
+                "as_of_date": request.as_of_date,
+                **summarise_trial_balance(response.data or [])
+            },
+            "error": None
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error computing trial balance: {str(e)}")
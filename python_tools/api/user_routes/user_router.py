@@ -4,5 +4,7 @@ router = APIRouter(prefix="/api/user", tags=["entries"])
 
 from .fetch_user_entries.fetch_user_entries import router as fetch_user_entries
 from .fetch_user_entries_between_dates.fetch_user_entries_between_dates import router as fetch_user_entries_between_dates
+from .trial_balance.trial_balance import router as trial_balance
 router.include_router(fetch_user_entries)
-router.include_router(fetch_user_entries_between_dates)
\ No newline at end of file
+router.include_router(fetch_user_entries_between_dates)
+router.include_router(trial_balance)
@@ -0,0 +1,71 @@
+"""
+Measures bearer token verification latency (p50/p99) for the three paths
+in api/auth.py: remote /auth/v1/user check, local JWT verification, and a
+token cache hit.
+
+The local and cached paths run against a token signed here with a
+throwaway HS256 secret. The remote path needs a real access token for the
+project in .env and is skipped without --token.
+
+Usage (from python_tools/):
+    python benchmarks/auth_benchmark.py [--token <supabase access token>] [-n 200]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import jwt
+
+from api import auth
+
+
+def percentiles(samples):
+    ordered = sorted(samples)
+    return (
+        statistics.median(ordered) * 1000,
+        ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000,
+    )
+
+
+async def measure(fn, n):
+    samples = []
+    for _ in range(n):
+        start = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - start)
+    return percentiles(samples)
+
+
+async def main(args):
+    results = []
+
+    if args.token:
+        results.append(("remote (/auth/v1/user)", await measure(lambda: auth._verify_remotely(args.token), args.n)))
+
+    auth.SUPABASE_JWT_SECRET = "benchmark-secret"
+    token = jwt.encode(
+        {"sub": "00000000-0000-0000-0000-000000000000", "aud": "authenticated", "role": "authenticated",
+         "exp": int(time.time()) + 3600},
+        auth.SUPABASE_JWT_SECRET,
+        algorithm="HS256",
+    )
+    results.append(("local JWT verification", await measure(lambda: auth._verify_locally(token), args.n)))
+
+    await auth.verify_token(token)
+    results.append(("token cache hit", await measure(lambda: auth.verify_token(token), args.n)))
+
+    print(f"{'path':<26} {'p50 (ms)':>10} {'p99 (ms)':>10}")
+    for name, (p50, p99) in results:
+        print(f"{name:<26} {p50:>10.3f} {p99:>10.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--token")
+    parser.add_argument("-n", type=int, default=200)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,75 @@
+"""
+Measures how /api/document/process-document behaves under concurrent load.
+
+Sends one request on its own, then N requests in parallel, and reports the
+wall time of both runs. While the parallel batch is in flight it keeps
+polling GET / so a blocked event loop shows up as a latency spike.
+
+Usage:
+    python benchmarks/concurrency_benchmark.py --token <supabase access token> \
+        --document-url <public pdf url> --job-id <job id> [--job-id ...] -n 8
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+async def process_once(client: httpx.AsyncClient, base_url: str, token: str, document_url: str, job_id: str) -> float:
+    start = time.perf_counter()
+    response = await client.post(
+        f"{base_url}/api/document/process-document",
+        json={"document_url": document_url, "job_id": job_id},
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    elapsed = time.perf_counter() - start
+    print(f"  job {job_id}: {response.status_code} in {elapsed:.2f}s")
+    return elapsed
+
+
+async def probe_root(client: httpx.AsyncClient, base_url: str, stop: asyncio.Event) -> list:
+    latencies = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get(f"{base_url}/")
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(0.05)
+    return latencies
+
+
+async def main(args: argparse.Namespace) -> None:
+    job_ids = args.job_id * (args.n // len(args.job_id) + 1)
+    async with httpx.AsyncClient(timeout=None) as client:
+        print("Single request:")
+        single = await process_once(client, args.base_url, args.token, args.document_url, job_ids[0])
+
+        print(f"{args.n} parallel requests:")
+        stop = asyncio.Event()
+        probe = asyncio.create_task(probe_root(client, args.base_url, stop))
+        start = time.perf_counter()
+        await asyncio.gather(*[
+            process_once(client, args.base_url, args.token, args.document_url, job_id)
+            for job_id in job_ids[:args.n]
+        ])
+        parallel = time.perf_counter() - start
+        stop.set()
+        root_latencies = await probe
+
+    print()
+    print(f"single request wall time:   {single:.2f}s")
+    print(f"{args.n} parallel wall time:     {parallel:.2f}s ({parallel / single:.2f}x single)")
+    if root_latencies:
+        print(f"GET / during load: median {statistics.median(root_latencies) * 1000:.1f}ms, "
+              f"max {max(root_latencies) * 1000:.1f}ms over {len(root_latencies)} probes")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--token", required=True)
+    parser.add_argument("--document-url", required=True)
+    parser.add_argument("--job-id", action="append", required=True)
+    parser.add_argument("-n", type=int, default=8)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,94 @@
+"""
+Compares the two-call (validate_document + extract_data) and combined
+(classify_and_extract) LLM paths on the fixture set.
+
+For every fixture both paths are run against the local Ollama model and
+the script reports per-path latency plus document type accuracy and field
+accuracy against the expected values.
+
+Usage (from python_tools/, with Ollama running and .env in place):
+    python benchmarks/extraction_mode_benchmark.py [--rounds 3]
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.document_routes.process_document.tools.validate_document import validate_document
+from api.document_routes.process_document.tools.extract_data import extract_data
+from api.document_routes.process_document.tools.classify_and_extract import classify_and_extract
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "extraction_fixtures.json")
+
+
+async def two_call(content):
+    validation = await validate_document(content)
+    extraction = await extract_data(content, validation["document_type"])
+    return validation["document_type"], extraction["extracted_data"]
+
+
+async def combined(content):
+    result = await classify_and_extract(content)
+    return result["validation"]["document_type"], result["extraction"]["extracted_data"]
+
+
+def field_matches(actual, expected) -> bool:
+    if isinstance(expected, float):
+        try:
+            return abs(float(actual) - expected) < 0.01
+        except (TypeError, ValueError):
+            return False
+    return str(actual).strip().lower() == str(expected).strip().lower()
+
+
+async def run_mode(name, fn, fixtures, rounds):
+    latencies, type_hits, field_hits, field_total = [], 0, 0, 0
+    for _ in range(rounds):
+        for fixture in fixtures:
+            start = time.perf_counter()
+            try:
+                document_type, data = await fn(fixture["content"])
+            except Exception as e:
+                print(f"  {name} {fixture['name']}: error {e}")
+                document_type, data = None, {}
+            latencies.append(time.perf_counter() - start)
+
+            expected = fixture["expected"]
+            type_hits += document_type == expected["document_type"]
+            for field, value in expected["fields"].items():
+                field_total += 1
+                field_hits += field_matches((data or {}).get(field), value)
+
+    runs = rounds * len(fixtures)
+    return {
+        "mode": name,
+        "p50_s": statistics.median(latencies),
+        "mean_s": statistics.mean(latencies),
+        "type_accuracy": type_hits / runs,
+        "field_accuracy": field_hits / field_total if field_total else 0.0,
+    }
+
+
+async def main(args):
+    with open(FIXTURES, encoding="utf-8") as f:
+        fixtures = json.load(f)
+
+    results = [
+        await run_mode("two_call", two_call, fixtures, args.rounds),
+        await run_mode("combined", combined, fixtures, args.rounds),
+    ]
+
+    print(f"{'mode':<10} {'p50 (s)':>8} {'mean (s)':>9} {'type acc':>9} {'field acc':>10}")
+    for r in results:
+        print(f"{r['mode']:<10} {r['p50_s']:>8.2f} {r['mean_s']:>9.2f} {r['type_accuracy']:>9.0%} {r['field_accuracy']:>10.0%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=3)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,64 @@
+"""
+Measures how long the chart-of-accounts rules in
+tools/journal_rules.py take per journal entry (p50/p99), per document type,
+over synthetic extracted data shaped like req_formats.
+
+The LLM path this replaces is not measured here; compare with the
+create_journal_entry latency in /api/document/model-tier-stats of a
+running server.
+
+Usage (from python_tools/):
+    python benchmarks/journal_rules_benchmark.py [-n 100000]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.document_routes.process_document.tools.journal_rules import DEFAULT_CHART_OF_ACCOUNTS, JournalRules
+
+SAMPLES = {
+    "purchase_invoices": {"invoice_number": "PI-104", "vendor_name": "Acme Traders", "date": "2024-03-01",
+                          "items": [], "total_amount": 11800, "tax_amount": 1800, "payment_mode": "Bank transfer"},
+    "sales_invoices": {"invoice_number": "SI-88", "customer_name": "Globex", "date": "2024-03-02",
+                       "items": [], "total_amount": 5900, "tax_amount": 900, "payment_terms": "Net 30"},
+    "cash_receipts": {"receipt_number": "R-12", "payer_name": "Initech", "date": "2024-03-03",
+                      "amount": 2500, "payment_mode": "cash", "description": "Advance received"},
+    "cash_payments": {"payment_number": "P-7", "payee_name": "Umbrella Supplies", "date": "2024-03-04",
+                      "amount": 1200, "payment_mode": "cheque", "description": "Settlement of dues"},
+    "expense_bills": {"bill_number": "B-3", "vendor_name": "City Power", "date": "2024-03-05",
+                      "expense_category": "Utilities", "amount": 3400, "tax_amount": 0, "payment_mode": "UPI"},
+    "bank_transactions": {"date": "2024-03-06", "description": "NEFT charges", "debit_amount": 5.9,
+                          "credit_amount": 0, "balance": 10450.1, "transaction_type": "NEFT"}
+}
+
+
+def percentiles(samples):
+    ordered = sorted(samples)
+    return (
+        statistics.median(ordered) * 1e6,
+        ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1e6,
+    )
+
+
+def main(args):
+    rules = JournalRules(DEFAULT_CHART_OF_ACCOUNTS)
+    print(f"{'document type':<20} {'p50 (us)':>10} {'p99 (us)':>10}")
+    for document_type, data in SAMPLES.items():
+        samples = []
+        for _ in range(args.n):
+            start = time.perf_counter()
+            entry, reason = rules.journal_entry(document_type, data)
+            samples.append(time.perf_counter() - start)
+        assert entry is not None, reason
+        p50, p99 = percentiles(samples)
+        print(f"{document_type:<20} {p50:>10.2f} {p99:>10.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, default=100000)
+    main(parser.parse_args())
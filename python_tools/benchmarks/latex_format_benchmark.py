@@ -0,0 +1,125 @@
+"""
+Measures /latex/convert compile latency with and without a precompiled
+preamble format, on report templates shaped like the ones the app
+produces: a journal/ledger listing and a trial balance.
+
+For each template it runs n full compiles, dumps the preamble into a
+format the way the compile pool does, then runs n compiles of the body on
+top of the format. Needs pdflatex on PATH.
+
+Usage (from python_tools/):
+    python benchmarks/latex_format_benchmark.py [-n 10] [--rows 40]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("LATEX_FORMAT_DIR", tempfile.mkdtemp(prefix="latex_formats_"))
+
+from api.latex_routes.compile_pool import COMPILE_OPTIONS, LatexCompilePool
+from api.latex_routes.preamble_formats import preamble_formats, split_preamble
+
+PREAMBLE = r"""
+\documentclass[10pt]{article}
+\usepackage[T1]{fontenc}
+\usepackage[utf8]{inputenc}
+\usepackage{lmodern}
+\usepackage[margin=1in]{geometry}
+\usepackage{array}
+\usepackage{booktabs}
+\usepackage{longtable}
+\usepackage[table]{xcolor}
+\usepackage{fancyhdr}
+\pagestyle{fancy}
+\fancyhead[L]{In the books of M/s M}
+"""
+
+
+def ledger_report(rows):
+    lines = "\n".join(
+        rf"2024-01-{i % 28 + 1:02d} & Purchases A/c \dotfill Dr. & & {1000 + i}.00 & \\"
+        "\n"
+        rf"& \quad To Cash A/c & & & {1000 + i}.00 \\ \hline"
+        for i in range(rows)
+    )
+    return PREAMBLE + rf"""
+\begin{{document}}
+\begin{{center}}\textbf{{Journal}}\end{{center}}
+\begin{{longtable}}{{|p{{2cm}}|p{{7cm}}|p{{1cm}}|p{{2cm}}|p{{2cm}}|}}
+\hline
+\textbf{{Date}} & \textbf{{Particulars}} & \textbf{{L.F.}} & \textbf{{Debit}} & \textbf{{Credit}} \\ \hline
+{lines}
+\end{{longtable}}
+\end{{document}}
+"""
+
+
+def trial_balance_report(rows):
+    lines = "\n".join(
+        rf"Account {i:03d} A/c & {2000 + i}.00 & \\" if i % 2 else rf"Account {i:03d} A/c & & {2000 + i}.00 \\"
+        for i in range(rows)
+    )
+    return PREAMBLE + rf"""
+\begin{{document}}
+\begin{{center}}\textbf{{Trial Balance as of 2024-03-31}}\end{{center}}
+\rowcolors{{2}}{{gray!10}}{{white}}
+\begin{{longtable}}{{lrr}}
+\toprule
+Particulars & Debit (Rs.) & Credit (Rs.) \\ \midrule
+{lines}
+\bottomrule
+\end{{longtable}}
+\end{{document}}
+"""
+
+
+async def timed(fn, n):
+    samples = []
+    for _ in range(n):
+        start = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+async def main(args):
+    pool = LatexCompilePool(concurrency=1, max_waiting=0, timeout=120)
+    pool.start()
+    if not pool.pdflatex_path:
+        print("pdflatex not found on PATH")
+        return
+    work_dir = await pool._work_dirs.get()
+
+    print(f"{'template':<16} {'full (ms)':>10} {'format (ms)':>12} {'speedup':>8}")
+    try:
+        for name, build in (("ledger", ledger_report), ("trial balance", trial_balance_report)):
+            latex_code = build(args.rows)
+            preamble, body = split_preamble(latex_code)
+            key = preamble_formats.key(preamble, COMPILE_OPTIONS)
+
+            full = await timed(lambda: pool._run(work_dir, latex_code), args.n)
+
+            pool._work_dirs.put_nowait(work_dir)
+            await pool._build_format(key, preamble)
+            work_dir = await pool._work_dirs.get()
+            if not preamble_formats.get(key):
+                print(f"{name:<16} {full:>10.0f} {'dump failed':>12}")
+                continue
+
+            from_format = await timed(lambda: pool._run(work_dir, body, format_key=key), args.n)
+            print(f"{name:<16} {full:>10.0f} {from_format:>12.0f} {full / from_format:>7.1f}x")
+    finally:
+        pool._work_dirs.put_nowait(work_dir)
+        await pool.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, default=10)
+    parser.add_argument("--rows", type=int, default=40)
+    asyncio.run(main(parser.parse_args()))
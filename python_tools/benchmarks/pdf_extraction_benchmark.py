@@ -0,0 +1,90 @@
+"""
+Compares sequential and process-pool PDF text extraction.
+
+Generates text-heavy PDFs of 1, 20 and 200 pages (or uses the files given
+with --pdf) and times read_pdf_pages (one thread, page by page) against
+extract_pages (process pool above PDF_PARALLEL_MIN_PAGES) and
+read_pdf_prefix (stops at the --budget character prompt budget).
+
+Usage (from python_tools/):
+    python benchmarks/pdf_extraction_benchmark.py [--pages 1 20 200] [--pdf file.pdf ...]
+"""
+import argparse
+import asyncio
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyPDF2 import PageObject, PdfWriter
+from PyPDF2.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+from api.document_routes.extract_document import pdf_text
+
+
+def make_pdf(pages: int, lines_per_page: int = 60) -> bytes:
+    """
+    Build a PDF whose pages each carry a block of statement-like text
+    """
+    writer = PdfWriter()
+    font = DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"),
+        NameObject("/Subtype"): NameObject("/Type1"),
+        NameObject("/BaseFont"): NameObject("/Helvetica"),
+    })
+    for page_number in range(pages):
+        page = PageObject.create_blank_page(writer, width=612, height=792)
+        page[NameObject("/Resources")] = DictionaryObject({
+            NameObject("/Font"): DictionaryObject({NameObject("/F1"): font})
+        })
+        lines = [
+            f"2024-03-{(i % 28) + 1:02d} NEFT-VENDOR {page_number:03d}-{i:03d} REF{page_number * 1000 + i} "
+            f"{(i * 137) % 9000 + 100}.00 {(page_number * 7919 + i * 31) % 500000}.25"
+            for i in range(lines_per_page)
+        ]
+        text_ops = "BT /F1 8 Tf 10 TL 36 770 Td " + " ".join(f"({line}) '" for line in lines) + " ET"
+        content = DecodedStreamObject()
+        content.set_data(text_ops.encode("latin-1"))
+        page[NameObject("/Contents")] = writer._add_object(content)
+        writer.add_page(page)
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+def time_it(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(args: argparse.Namespace) -> None:
+    documents = [(f"{n} pages (generated)", make_pdf(n)) for n in args.pages]
+    for path in args.pdf:
+        with open(path, "rb") as f:
+            documents.append((os.path.basename(path), f.read()))
+
+    print(f"pool workers: {pdf_text.PDF_EXTRACT_WORKERS}, parallel from {pdf_text.PDF_PARALLEL_MIN_PAGES} pages")
+    print(f"{'document':<24} {'sequential (s)':>15} {'extract_pages (s)':>18} {'speedup':>8} {'prefix (s)':>11} {'speedup':>8}")
+    for name, data in documents:
+        sequential = time_it(lambda: pdf_text.read_pdf_pages(io.BytesIO(data)), args.repeat)
+        parallel = time_it(lambda: asyncio.run(pdf_text.extract_pages(io.BytesIO(data))), args.repeat)
+        prefix = time_it(lambda: pdf_text.read_pdf_prefix(io.BytesIO(data), args.budget), args.repeat)
+        assert pdf_text.read_pdf_pages(io.BytesIO(data)) == asyncio.run(pdf_text.extract_pages(io.BytesIO(data)))
+        print(f"{name:<24} {sequential:>15.3f} {parallel:>18.3f} {sequential / parallel:>7.2f}x "
+              f"{prefix:>11.3f} {sequential / prefix:>7.2f}x")
+    pdf_text.shutdown_pool()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, nargs="*", default=[1, 20, 200])
+    parser.add_argument("--pdf", nargs="*", default=[])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--budget", type=int, default=4000)
+    main(parser.parse_args())
@@ -0,0 +1,103 @@
+"""
+Measures payload size and serialization time of a large journal entry
+listing, before and after the lean response path of the fetch endpoints:
+
+  before        every column, the user echoed, jsonable_encoder + JSONResponse
+                (what FastAPI does with a returned dict)
+  after/stdlib  the columns JournalEntryTable shows, no user, FastJSONResponse
+                without orjson
+  after         the same with orjson
+
+Rows are synthetic but shaped like journal_entries.
+
+Usage (from python_tools/):
+    python benchmarks/serialization_benchmark.py [--rows 50000] [--repeat 5]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from api import json_response
+from api.json_response import FastJSONResponse
+
+TABLE_FIELDS = ["id", "entry_date", "account_debited", "account_credited", "amount", "description"]
+
+
+def make_rows(n):
+    rng = random.Random(7)
+    user_id = str(uuid.uuid4())
+    accounts = ["Purchases A/c", "Sales A/c", "Cash A/c", "Bank A/c", "Rent A/c", "Salaries A/c"]
+    rows = []
+    for i in range(n):
+        debit, credit = rng.sample(accounts, 2)
+        rows.append({
+            "id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "user_id": user_id,
+            "entry_date": (date(2022, 1, 1) + timedelta(days=rng.randrange(900))).isoformat(),
+            "account_debited": debit,
+            "account_credited": credit,
+            "amount": round(rng.uniform(10, 100000), 2),
+            "currency": "INR",
+            "description": f"Being goods purchased on invoice INV-{i:06d} paid by {credit}",
+            "source_id": rng.randrange(1, 10**6),
+            "source_type": "document",
+            "source_document_url": f"https://example.supabase.co/storage/v1/object/public/invoices/{user_id}/{i}.pdf",
+            "created_at": datetime(2024, 1, 1).isoformat(),
+        })
+    user = {"id": user_id, "email": "auditor@example.com", "role": "authenticated", "aud": "authenticated", "exp": 1900000000}
+    return rows, user
+
+
+def before(rows, user):
+    content = {"success": True, "user": user, "data": rows, "next_cursor": None, "error": None}
+    return JSONResponse(jsonable_encoder(content)).body
+
+
+def after(rows, user):
+    return FastJSONResponse({"success": True, "data": rows, "next_cursor": None, "error": None}).body
+
+
+def measure(fn, rows, user, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = fn(rows, user)
+        samples.append(time.perf_counter() - start)
+    return len(body), statistics.median(samples) * 1000
+
+
+def main(args):
+    rows, user = make_rows(args.rows)
+    # the projection happens in the database for real requests; time only
+    # the encoding of the rows it would return
+    projected_rows = [{field: row[field] for field in TABLE_FIELDS} for row in rows]
+
+    orjson = json_response.orjson
+    results = [("before", measure(before, rows, user, args.repeat))]
+    json_response.orjson = None
+    results.append(("after/stdlib", measure(after, projected_rows, user, args.repeat)))
+    json_response.orjson = orjson
+    if orjson is not None:
+        results.append(("after", measure(after, projected_rows, user, args.repeat)))
+
+    print(f"{args.rows:,} rows")
+    print(f"{'path':<14} {'bytes':>12} {'ms (p50)':>10}")
+    for name, (size, ms) in results:
+        print(f"{name:<14} {size:>12,} {ms:>10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=5)
+    main(parser.parse_args())
@@ -0,0 +1,217 @@
+"""
+Compares the ways of computing a trial balance as of a date on a
+synthetic ledger:
+
+  per-account  what src/app/trial-balance/page.tsx did: list the accounts,
+               then one ledger_entries query per account summed row by row
+  grouped      migration 003's trial_balance: one GROUP BY query over
+               every entry up to the date, then summarise_trial_balance
+  snapshot     migration 005's trial_balance: the nearest month-end
+               snapshot plus a GROUP BY over the entries after it
+
+The ledger is generated into an on-disk SQLite database with the same
+columns and covering index as ledger_entries, so the query shapes match
+what Postgres runs. Absolute numbers differ from Postgres, and the
+per-account path here leaves out the network round trip each of its
+queries costs in production.
+
+Usage (from python_tools/):
+    python benchmarks/trial_balance_benchmark.py [--rows 1000000] [--accounts 300] [--skip-per-account]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.user_routes.trial_balance.trial_balance import summarise_trial_balance
+
+USER_ID = "00000000-0000-0000-0000-000000000000"
+
+GROUPED_QUERY = """
+    select
+        account_name,
+        coalesce(sum(case when transaction_type = 'debit' then amount end), 0) as total_debit,
+        coalesce(sum(case when transaction_type = 'credit' then amount end), 0) as total_credit,
+        coalesce(sum(case when transaction_type = 'debit' then amount else -amount end), 0) as balance
+    from ledger_entries
+    where user_id = ? and entry_date <= ?
+    group by account_name
+    order by account_name
+"""
+
+SNAPSHOT_QUERY = """
+    with base as (
+        select max(period_end) as period_end from ledger_snapshot_periods
+        where user_id = ? and period_end <= ?
+    ),
+    totals as (
+        select s.account_name, s.total_debit, s.total_credit, s.balance
+        from ledger_balance_snapshots s, base
+        where s.user_id = ? and s.period_end = base.period_end
+        union all
+        select
+            account_name,
+            case when transaction_type = 'debit' then amount else 0 end,
+            case when transaction_type = 'credit' then amount else 0 end,
+            case when transaction_type = 'debit' then amount else -amount end
+        from ledger_entries, base
+        where user_id = ? and entry_date > coalesce(base.period_end, '') and entry_date <= ?
+    )
+    select account_name, sum(total_debit), sum(total_credit), sum(balance)
+    from totals
+    group by account_name
+    order by account_name
+"""
+
+
+def build_ledger(path, rows, accounts):
+    """
+    Double-entry ledger: every journal entry adds one debit and one credit
+    row of the same amount, so the trial balance must come out balanced
+    """
+    rng = random.Random(42)
+    names = [f"Account {i:04d} A/c" for i in range(accounts)]
+    start = date(2020, 1, 1)
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "create table ledger_entries (id integer primary key, user_id text, account_name text, "
+        "transaction_type text, amount integer, entry_date text)"
+    )
+
+    def entries():
+        for _ in range(rows // 2):
+            debit, credit = rng.sample(names, 2)
+            # whole paise, so sums are exact whatever the engine
+            amount = rng.randint(100, 10_000_000)
+            entry_date = (start + timedelta(days=rng.randrange(2000))).isoformat()
+            yield (USER_ID, debit, "debit", amount, entry_date)
+            yield (USER_ID, credit, "credit", amount, entry_date)
+
+    conn.executemany(
+        "insert into ledger_entries (user_id, account_name, transaction_type, amount, entry_date) values (?, ?, ?, ?, ?)",
+        entries(),
+    )
+    conn.execute(
+        "create index ledger_entries_user_entry_date_idx on ledger_entries "
+        "(user_id, entry_date, account_name, transaction_type, amount)"
+    )
+    conn.commit()
+    return conn
+
+
+def build_snapshots(conn):
+    """
+    Month-end snapshots built the way snapshot_ledger_balances does: each
+    month from the previous snapshot plus that month's entries
+    """
+    conn.execute("create table ledger_snapshot_periods (user_id text, period_end text, primary key (user_id, period_end))")
+    conn.execute(
+        "create table ledger_balance_snapshots (user_id text, period_end text, account_name text, "
+        "total_debit integer, total_credit integer, balance integer, primary key (user_id, period_end, account_name))"
+    )
+    first, last = conn.execute("select min(entry_date), max(entry_date) from ledger_entries").fetchone()
+    period = month_end(date.fromisoformat(first))
+    last_complete = month_end(date.fromisoformat(last).replace(day=1) - timedelta(days=1))
+    previous = ""
+    while period <= last_complete:
+        conn.execute("insert into ledger_snapshot_periods values (?, ?)", (USER_ID, period.isoformat()))
+        conn.execute(
+            """
+            insert into ledger_balance_snapshots
+            select ?, ?, account_name, sum(total_debit), sum(total_credit), sum(balance) from (
+                select account_name, total_debit, total_credit, balance from ledger_balance_snapshots
+                where user_id = ? and period_end = ?
+                union all
+                select account_name,
+                    case when transaction_type = 'debit' then amount else 0 end,
+                    case when transaction_type = 'credit' then amount else 0 end,
+                    case when transaction_type = 'debit' then amount else -amount end
+                from ledger_entries
+                where user_id = ? and entry_date > ? and entry_date <= ?
+            ) group by account_name
+            """,
+            (USER_ID, period.isoformat(), USER_ID, previous, USER_ID, previous, period.isoformat()),
+        )
+        previous = period.isoformat()
+        period = month_end(period + timedelta(days=1))
+    conn.commit()
+
+
+def month_end(day):
+    next_month = (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return next_month - timedelta(days=1)
+
+
+def per_account(conn, as_of):
+    accounts = [row[0] for row in conn.execute(
+        "select distinct account_name from ledger_entries where user_id = ?", (USER_ID,)
+    )]
+    total_debit = total_credit = 0
+    for account in accounts:
+        balance = 0
+        for transaction_type, amount in conn.execute(
+            "select transaction_type, amount from ledger_entries "
+            "where user_id = ? and account_name = ? and entry_date <= ?",
+            (USER_ID, account, as_of),
+        ):
+            balance += amount if transaction_type == "debit" else -amount
+        if balance >= 0:
+            total_debit += balance
+        else:
+            total_credit -= balance
+    return len(accounts) + 1, total_debit, total_credit
+
+
+def grouped(conn, as_of):
+    rows = [
+        {"account_name": name, "total_debit": debit, "total_credit": credit, "balance": balance}
+        for name, debit, credit, balance in conn.execute(GROUPED_QUERY, (USER_ID, as_of))
+    ]
+    summary = summarise_trial_balance(rows)
+    return 1, summary["total_debit"], summary["total_credit"]
+
+
+def snapshot(conn, as_of):
+    rows = [
+        {"account_name": name, "total_debit": debit, "total_credit": credit, "balance": balance}
+        for name, debit, credit, balance in conn.execute(SNAPSHOT_QUERY, (USER_ID, as_of, USER_ID, USER_ID, as_of))
+    ]
+    summary = summarise_trial_balance(rows)
+    return 1, summary["total_debit"], summary["total_credit"]
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        conn = build_ledger(os.path.join(tmp, "ledger.sqlite3"), args.rows, args.accounts)
+        print(f"built {args.rows:,} ledger rows over {args.accounts} accounts in {time.perf_counter() - start:.1f}s")
+        start = time.perf_counter()
+        build_snapshots(conn)
+        print(f"built month-end snapshots in {time.perf_counter() - start:.1f}s")
+
+        methods = [("grouped", grouped), ("snapshot", snapshot)]
+        if not args.skip_per_account:
+            methods.insert(0, ("per-account", per_account))
+
+        print(f"{'method':<12} {'queries':>8} {'seconds':>9} {'total debit':>16} {'total credit':>16}")
+        for name, fn in methods:
+            start = time.perf_counter()
+            queries, total_debit, total_credit = fn(conn, args.as_of)
+            elapsed = time.perf_counter() - start
+            print(f"{name:<12} {queries:>8} {elapsed:>9.3f} {total_debit:>16,.0f} {total_credit:>16,.0f}")
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--accounts", type=int, default=300)
+    parser.add_argument("--as-of", default="2024-12-31")
+    parser.add_argument("--skip-per-account", action="store_true")
+    main(parser.parse_args())
@@ -1,10 +1,32 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from api.document_routes.document_router import router as document_router
 from api.user_routes.user_router import router as user_router
 from api.latex_routes.latex_router import router as latex_router
+from api.latex_routes.compile_pool import latex_pool
+from api.database import init_supabase, close_supabase
+from api.document_routes.process_document.job_queue import job_queue
+from api.document_routes.extract_document.extract_document import http_client
+from api.document_routes.extract_document.pdf_text import shutdown_pool
+from api.document_routes.process_document.tools.llm_gateway import client as llm_client
 
-app = FastAPI(title="Document Processing API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Open the shared Supabase client, start the background document
+    # workers and the LaTeX compile pool, and tear them down on shutdown
+    init_supabase()
+    await job_queue.start()
+    latex_pool.start()
+    yield
+    await job_queue.drain()
+    await latex_pool.stop()
+    await http_client.aclose()
+    await llm_client.close()
+    shutdown_pool()
+    close_supabase()
+
+app = FastAPI(title="Document Processing API", lifespan=lifespan)
 
 # Configure CORS
 app.add_middleware(
@@ -0,0 +1,11 @@
+-- Content fingerprints for duplicate-document detection.
+-- file_hash: sha256 of the downloaded PDF bytes
+-- text_hash: sha256 of the case- and whitespace-normalized extracted text
+alter table documents add column if not exists file_hash text;
+alter table documents add column if not exists text_hash text;
+
+create index if not exists documents_user_file_hash_idx on documents (user_id, file_hash);
+create index if not exists documents_user_text_hash_idx on documents (user_id, text_hash) where text_hash is not null;
+
+-- find_duplicate_document looks up the parsed job that produced a document
+create index if not exists document_jobs_document_id_idx on document_jobs (document_id);
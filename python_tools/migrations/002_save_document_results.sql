@@ -0,0 +1,75 @@
+-- Unit-of-work writer for processed documents.
+-- Inserts the documents row, its journal entry and ledger entries, and marks
+-- the document_jobs row parsed, for every item in one transaction and one
+-- round trip. Rows are built with jsonb_populate_record so every value gets
+-- its column's type.
+--
+-- items: [{"job_id", "document": {...}, "journal_entry": {...}, "ledger_entries": [{...}, ...]}, ...]
+-- returns: [{"job_id", "document_id", "journal_entry_id", "ledger_entry_ids": [...]}, ...]
+create or replace function save_document_results(items jsonb)
+returns jsonb
+language plpgsql
+as $$
+declare
+  item jsonb;
+  ledger jsonb;
+  doc documents%rowtype;
+  je journal_entries%rowtype;
+  le ledger_entries%rowtype;
+  job document_jobs%rowtype;
+  v_document_id documents.id%type;
+  v_journal_entry_id journal_entries.id%type;
+  v_ledger_entry_id ledger_entries.id%type;
+  v_ledger_entry_ids jsonb;
+  v_debit_ledger_entry_id ledger_entries.id%type;
+  v_credit_ledger_entry_id ledger_entries.id%type;
+  results jsonb := '[]'::jsonb;
+begin
+  for item in select value from jsonb_array_elements(items) loop
+    doc := jsonb_populate_record(null::documents, item->'document');
+    insert into documents (user_id, job_id, file_url, document_type, extracted_data, file_hash, text_hash)
+    values (doc.user_id, doc.job_id, doc.file_url, doc.document_type, doc.extracted_data, doc.file_hash, doc.text_hash)
+    returning id into v_document_id;
+
+    je := jsonb_populate_record(null::journal_entries, item->'journal_entry');
+    insert into journal_entries (user_id, entry_date, source_id, account_debited, account_credited, amount, description)
+    values (je.user_id, je.entry_date, v_document_id, je.account_debited, je.account_credited, je.amount, je.description)
+    returning id into v_journal_entry_id;
+
+    v_ledger_entry_ids := '[]'::jsonb;
+    v_debit_ledger_entry_id := null;
+    v_credit_ledger_entry_id := null;
+    for ledger in select value from jsonb_array_elements(item->'ledger_entries') loop
+      le := jsonb_populate_record(null::ledger_entries, ledger);
+      insert into ledger_entries (user_id, journal_entry_id, account_name, transaction_type, amount, entry_date, description)
+      values (le.user_id, v_journal_entry_id, le.account_name, le.transaction_type, le.amount, le.entry_date, le.description)
+      returning id into v_ledger_entry_id;
+      v_ledger_entry_ids := v_ledger_entry_ids || to_jsonb(v_ledger_entry_id);
+      if le.transaction_type = 'debit' then
+        v_debit_ledger_entry_id := coalesce(v_debit_ledger_entry_id, v_ledger_entry_id);
+      else
+        v_credit_ledger_entry_id := coalesce(v_credit_ledger_entry_id, v_ledger_entry_id);
+      end if;
+    end loop;
+
+    job := jsonb_populate_record(null::document_jobs, jsonb_build_object('id', item->'job_id'));
+    update document_jobs
+    set status = 'parsed',
+        document_id = v_document_id,
+        journal_entry_id = v_journal_entry_id,
+        debit_ledger_entry_id = v_debit_ledger_entry_id,
+        credit_ledger_entry_id = v_credit_ledger_entry_id,
+        last_run_at = now()
+    where id = job.id;
+
+    results := results || jsonb_build_object(
+      'job_id', item->>'job_id',
+      'document_id', v_document_id,
+      'journal_entry_id', v_journal_entry_id,
+      'ledger_entry_ids', v_ledger_entry_ids
+    );
+  end loop;
+
+  return results;
+end;
+$$;
@@ -0,0 +1,25 @@
+-- Trial balance as of a date in one grouped query.
+-- Sums each account's debits and credits up to and including p_as_of (all
+-- entries when null). balance is debits minus credits, so a positive
+-- balance sits on the debit side of the trial balance.
+create or replace function trial_balance(p_user_id uuid, p_as_of date default null)
+returns table (account_name text, total_debit numeric, total_credit numeric, balance numeric)
+language sql
+stable
+as $$
+  select
+    le.account_name::text,
+    coalesce(sum(le.amount) filter (where le.transaction_type = 'debit'), 0) as total_debit,
+    coalesce(sum(le.amount) filter (where le.transaction_type = 'credit'), 0) as total_credit,
+    coalesce(sum(case when le.transaction_type = 'debit' then le.amount else -le.amount end), 0) as balance
+  from ledger_entries le
+  where le.user_id = p_user_id
+    and (p_as_of is null or le.entry_date <= p_as_of)
+  group by le.account_name
+  order by le.account_name;
+$$;
+
+-- covers the function's filter and every column it reads, so the
+-- aggregate is answered from the index alone
+create index if not exists ledger_entries_user_entry_date_idx
+  on ledger_entries (user_id, entry_date) include (account_name, transaction_type, amount);
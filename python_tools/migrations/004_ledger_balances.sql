@@ -0,0 +1,192 @@
+-- Incrementally maintained ledger_balances.
+-- save_document_results now applies each ledger entry's signed delta
+-- (debit +amount, credit -amount) to its (user_id, account_name) balance row
+-- in the same transaction as the insert, and links the entry to that row
+-- through ledger_entries.ledger_balance_id. Reading a balance is then a
+-- single-row lookup instead of a scan of ledger_entries.
+-- rebuild_ledger_balances / verify_ledger_balances recompute the balances
+-- from scratch (python -m api.ledger_balances rebuild|verify).
+
+create or replace function ledger_delta(p_transaction_type text, p_amount numeric)
+returns numeric
+language sql
+immutable
+as $$
+  select case when p_transaction_type = 'debit' then p_amount else -p_amount end;
+$$;
+
+-- merge duplicate balance rows so (user_id, account_name) can be unique;
+-- their amounts are recomputed by the rebuild below. The row with the
+-- lowest id survives; distinct on rather than min(id), which has no uuid
+-- aggregate.
+update ledger_entries le
+set ledger_balance_id = keep.id
+from ledger_balances lb
+join (
+  select distinct on (user_id, account_name) user_id, account_name, id
+  from ledger_balances
+  order by user_id, account_name, id
+) keep on keep.user_id = lb.user_id and keep.account_name = lb.account_name
+where le.ledger_balance_id = lb.id and lb.id <> keep.id;
+
+delete from ledger_balances lb
+using ledger_balances other
+where lb.user_id = other.user_id
+  and lb.account_name = other.account_name
+  and lb.id > other.id;
+
+create unique index if not exists ledger_balances_user_account_idx on ledger_balances (user_id, account_name);
+
+-- balances recomputed from ledger_entries that disagree with the stored
+-- ones, for one user or (p_user_id null) everyone
+create or replace function verify_ledger_balances(p_user_id uuid default null)
+returns table (user_id uuid, account_name text, stored_balance numeric, computed_balance numeric)
+language sql
+stable
+as $$
+  with computed as (
+    select le.user_id, le.account_name, sum(ledger_delta(le.transaction_type, le.amount)) as balance
+    from ledger_entries le
+    where p_user_id is null or le.user_id = p_user_id
+    group by le.user_id, le.account_name
+  ),
+  stored as (
+    select lb.user_id, lb.account_name, lb.balance_amount as balance
+    from ledger_balances lb
+    where p_user_id is null or lb.user_id = p_user_id
+  )
+  select
+    coalesce(s.user_id, c.user_id),
+    coalesce(s.account_name, c.account_name)::text,
+    coalesce(s.balance, 0),
+    coalesce(c.balance, 0)
+  from stored s
+  full outer join computed c on c.user_id = s.user_id and c.account_name = s.account_name
+  where coalesce(s.balance, 0) <> coalesce(c.balance, 0) or s.user_id is null;
+$$;
+
+-- recompute every balance from ledger_entries and relink the entries;
+-- returns the number of balance rows written
+create or replace function rebuild_ledger_balances(p_user_id uuid default null)
+returns integer
+language plpgsql
+as $$
+declare
+  written integer;
+begin
+  with computed as (
+    select le.user_id, le.account_name, sum(ledger_delta(le.transaction_type, le.amount)) as balance
+    from ledger_entries le
+    where p_user_id is null or le.user_id = p_user_id
+    group by le.user_id, le.account_name
+  )
+  insert into ledger_balances as lb (user_id, account_name, balance_amount, last_updated_at)
+  select user_id, account_name, balance, now() from computed
+  on conflict (user_id, account_name) do update
+    set balance_amount = excluded.balance_amount,
+        last_updated_at = excluded.last_updated_at
+    where lb.balance_amount is distinct from excluded.balance_amount;
+  get diagnostics written = row_count;
+
+  -- accounts whose entries are all gone keep their row at zero, so existing
+  -- links from the ledger pages stay valid
+  update ledger_balances lb
+  set balance_amount = 0, last_updated_at = now()
+  where (p_user_id is null or lb.user_id = p_user_id)
+    and lb.balance_amount <> 0
+    and not exists (
+      select 1 from ledger_entries le
+      where le.user_id = lb.user_id and le.account_name = lb.account_name
+    );
+
+  update ledger_entries le
+  set ledger_balance_id = lb.id
+  from ledger_balances lb
+  where lb.user_id = le.user_id
+    and lb.account_name = le.account_name
+    and (p_user_id is null or le.user_id = p_user_id)
+    and le.ledger_balance_id is distinct from lb.id;
+
+  return written;
+end;
+$$;
+
+select rebuild_ledger_balances();
+
+create or replace function save_document_results(items jsonb)
+returns jsonb
+language plpgsql
+as $$
+declare
+  item jsonb;
+  ledger jsonb;
+  doc documents%rowtype;
+  je journal_entries%rowtype;
+  le ledger_entries%rowtype;
+  job document_jobs%rowtype;
+  v_document_id documents.id%type;
+  v_journal_entry_id journal_entries.id%type;
+  v_ledger_entry_id ledger_entries.id%type;
+  v_ledger_balance_id ledger_balances.id%type;
+  v_ledger_entry_ids jsonb;
+  v_debit_ledger_entry_id ledger_entries.id%type;
+  v_credit_ledger_entry_id ledger_entries.id%type;
+  results jsonb := '[]'::jsonb;
+begin
+  for item in select value from jsonb_array_elements(items) loop
+    doc := jsonb_populate_record(null::documents, item->'document');
+    insert into documents (user_id, job_id, file_url, document_type, extracted_data, file_hash, text_hash)
+    values (doc.user_id, doc.job_id, doc.file_url, doc.document_type, doc.extracted_data, doc.file_hash, doc.text_hash)
+    returning id into v_document_id;
+
+    je := jsonb_populate_record(null::journal_entries, item->'journal_entry');
+    insert into journal_entries (user_id, entry_date, source_id, account_debited, account_credited, amount, description)
+    values (je.user_id, je.entry_date, v_document_id, je.account_debited, je.account_credited, je.amount, je.description)
+    returning id into v_journal_entry_id;
+
+    v_ledger_entry_ids := '[]'::jsonb;
+    v_debit_ledger_entry_id := null;
+    v_credit_ledger_entry_id := null;
+    for ledger in select value from jsonb_array_elements(item->'ledger_entries') loop
+      le := jsonb_populate_record(null::ledger_entries, ledger);
+      -- the upsert locks the balance row, so concurrent writers to the same
+      -- account apply their deltas one after the other
+      insert into ledger_balances as lb (user_id, account_name, balance_amount, last_updated_at)
+      values (le.user_id, le.account_name, ledger_delta(le.transaction_type, le.amount), now())
+      on conflict (user_id, account_name) do update
+        set balance_amount = lb.balance_amount + excluded.balance_amount,
+            last_updated_at = excluded.last_updated_at
+      returning id into v_ledger_balance_id;
+
+      insert into ledger_entries (user_id, journal_entry_id, ledger_balance_id, account_name, transaction_type, amount, entry_date, description)
+      values (le.user_id, v_journal_entry_id, v_ledger_balance_id, le.account_name, le.transaction_type, le.amount, le.entry_date, le.description)
+      returning id into v_ledger_entry_id;
+      v_ledger_entry_ids := v_ledger_entry_ids || to_jsonb(v_ledger_entry_id);
+      if le.transaction_type = 'debit' then
+        v_debit_ledger_entry_id := coalesce(v_debit_ledger_entry_id, v_ledger_entry_id);
+      else
+        v_credit_ledger_entry_id := coalesce(v_credit_ledger_entry_id, v_ledger_entry_id);
+      end if;
+    end loop;
+
+    job := jsonb_populate_record(null::document_jobs, jsonb_build_object('id', item->'job_id'));
+    update document_jobs
+    set status = 'parsed',
+        document_id = v_document_id,
+        journal_entry_id = v_journal_entry_id,
+        debit_ledger_entry_id = v_debit_ledger_entry_id,
+        credit_ledger_entry_id = v_credit_ledger_entry_id,
+        last_run_at = now()
+    where id = job.id;
+
+    results := results || jsonb_build_object(
+      'job_id', item->>'job_id',
+      'document_id', v_document_id,
+      'journal_entry_id', v_journal_entry_id,
+      'ledger_entry_ids', v_ledger_entry_ids
+    );
+  end loop;
+
+  return results;
+end;
+$$;
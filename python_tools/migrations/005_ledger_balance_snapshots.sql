@@ -0,0 +1,177 @@
+-- Month-end balance snapshots for historical trial balances.
+-- ledger_snapshot_periods records which month ends have been snapshotted
+-- for a user; ledger_balance_snapshots holds the per-account totals up to
+-- and including that day. trial_balance then reads the nearest snapshot at
+-- or before the requested date and adds only the entries after it.
+--
+-- Snapshots are built by snapshot_ledger_balances (python -m
+-- api.ledger_balances snapshot, run after each month end). Each month is
+-- built from the previous month's snapshot plus that month's entries.
+-- Any insert, update or delete of a ledger entry dated on or before a
+-- snapshotted month end drops that snapshot and every later one.
+
+create table if not exists ledger_snapshot_periods (
+  user_id uuid not null,
+  period_end date not null,
+  created_at timestamptz not null default now(),
+  primary key (user_id, period_end)
+);
+
+create table if not exists ledger_balance_snapshots (
+  user_id uuid not null,
+  period_end date not null,
+  account_name text not null,
+  total_debit numeric not null,
+  total_credit numeric not null,
+  balance numeric not null,
+  primary key (user_id, period_end, account_name),
+  foreign key (user_id, period_end) references ledger_snapshot_periods (user_id, period_end) on delete cascade
+);
+
+-- Serialises snapshot building with back-dated writes of the same user, so
+-- a snapshot can never commit without an entry that invalidated it
+create or replace function lock_ledger_snapshots(p_user_id uuid)
+returns void
+language sql
+as $$
+  select pg_advisory_xact_lock(hashtext('ledger_snapshots:' || p_user_id::text));
+$$;
+
+create or replace function invalidate_ledger_snapshots(p_user_id uuid, p_entry_date date)
+returns void
+language plpgsql
+as $$
+begin
+  -- only completed months are ever snapshotted, so entries dated in the
+  -- current month skip the lock entirely
+  if p_entry_date < date_trunc('month', current_date) then
+    perform lock_ledger_snapshots(p_user_id);
+    delete from ledger_snapshot_periods
+    where user_id = p_user_id and period_end >= p_entry_date;
+  end if;
+end;
+$$;
+
+create or replace function ledger_entries_invalidate_snapshots()
+returns trigger
+language plpgsql
+as $$
+begin
+  if tg_op in ('UPDATE', 'DELETE') then
+    perform invalidate_ledger_snapshots(old.user_id, old.entry_date);
+  end if;
+  if tg_op in ('INSERT', 'UPDATE') then
+    perform invalidate_ledger_snapshots(new.user_id, new.entry_date);
+  end if;
+  return null;
+end;
+$$;
+
+drop trigger if exists ledger_entries_invalidate_snapshots on ledger_entries;
+create trigger ledger_entries_invalidate_snapshots
+after insert or update of user_id, account_name, transaction_type, amount, entry_date or delete
+on ledger_entries
+for each row execute function ledger_entries_invalidate_snapshots();
+
+-- Build every missing month-end snapshot up to p_through (default: the
+-- last completed month) for one user or (p_user_id null) everyone.
+-- Returns the number of month-end snapshots written.
+create or replace function snapshot_ledger_balances(p_user_id uuid default null, p_through date default null)
+returns integer
+language plpgsql
+as $$
+declare
+  v_user_id uuid;
+  v_prev date;
+  v_period date;
+  v_last date;
+  written integer := 0;
+begin
+  v_last := least(
+    (date_trunc('month', coalesce(p_through, current_date) + 1) - interval '1 day')::date,
+    (date_trunc('month', current_date) - interval '1 day')::date
+  );
+
+  for v_user_id in
+    select distinct le.user_id from ledger_entries le
+    where p_user_id is null or le.user_id = p_user_id
+  loop
+    perform lock_ledger_snapshots(v_user_id);
+
+    -- invalidation always drops a suffix, so the latest period is the end
+    -- of an unbroken run of valid snapshots
+    select max(period_end) into v_prev
+    from ledger_snapshot_periods where user_id = v_user_id;
+
+    if v_prev is null then
+      select (date_trunc('month', min(entry_date)) + interval '1 month' - interval '1 day')::date into v_period
+      from ledger_entries where user_id = v_user_id;
+    else
+      v_period := (date_trunc('month', v_prev) + interval '2 month' - interval '1 day')::date;
+    end if;
+
+    while v_period <= v_last loop
+      insert into ledger_snapshot_periods (user_id, period_end) values (v_user_id, v_period);
+
+      insert into ledger_balance_snapshots (user_id, period_end, account_name, total_debit, total_credit, balance)
+      select v_user_id, v_period, account_name, sum(total_debit), sum(total_credit), sum(balance)
+      from (
+        select s.account_name, s.total_debit, s.total_credit, s.balance
+        from ledger_balance_snapshots s
+        where s.user_id = v_user_id and s.period_end = v_prev
+        union all
+        select
+          le.account_name,
+          case when le.transaction_type = 'debit' then le.amount else 0 end,
+          case when le.transaction_type = 'credit' then le.amount else 0 end,
+          ledger_delta(le.transaction_type, le.amount)
+        from ledger_entries le
+        where le.user_id = v_user_id
+          and le.entry_date > coalesce(v_prev, '-infinity'::date)
+          and le.entry_date <= v_period
+      ) month_totals
+      group by account_name;
+
+      written := written + 1;
+      v_prev := v_period;
+      v_period := (date_trunc('month', v_period) + interval '2 month' - interval '1 day')::date;
+    end loop;
+  end loop;
+
+  return written;
+end;
+$$;
+
+-- trial_balance from migration 003, now starting from the nearest snapshot
+-- at or before p_as_of so it only aggregates the entries after it
+create or replace function trial_balance(p_user_id uuid, p_as_of date default null)
+returns table (account_name text, total_debit numeric, total_credit numeric, balance numeric)
+language sql
+stable
+as $$
+  with base as (
+    select max(period_end) as period_end
+    from ledger_snapshot_periods
+    where user_id = p_user_id
+      and period_end <= coalesce(p_as_of, 'infinity'::date)
+  ),
+  totals as (
+    select s.account_name, s.total_debit, s.total_credit, s.balance
+    from ledger_balance_snapshots s, base
+    where s.user_id = p_user_id and s.period_end = base.period_end
+    union all
+    select
+      le.account_name,
+      case when le.transaction_type = 'debit' then le.amount else 0 end,
+      case when le.transaction_type = 'credit' then le.amount else 0 end,
+      ledger_delta(le.transaction_type, le.amount)
+    from ledger_entries le, base
+    where le.user_id = p_user_id
+      and le.entry_date > coalesce(base.period_end, '-infinity'::date)
+      and (p_as_of is null or le.entry_date <= p_as_of)
+  )
+  select totals.account_name::text, sum(totals.total_debit), sum(totals.total_credit), sum(totals.balance)
+  from totals
+  group by totals.account_name
+  order by totals.account_name;
+$$;
@@ -0,0 +1,4 @@
+-- Keyset pagination of journal entries (api/user_routes/journal_entry_pages.py)
+-- walks (entry_date, id) newest first within one user.
+create index if not exists journal_entries_user_entry_date_id_idx
+  on journal_entries (user_id, entry_date desc, id desc);
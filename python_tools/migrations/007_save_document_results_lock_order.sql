@@ -0,0 +1,111 @@
+-- save_document_results took its locks in the order the ledger entries of a
+-- batch came in: one ledger_balances row per upsert, plus the per-user
+-- snapshot lock when a back-dated entry fired the invalidation trigger.
+-- Two batches with opposite account pairs (Bank Dr / Cash Cr against Cash
+-- Dr / Bank Cr) could then each hold the row the other one waited for.
+--
+-- It now takes every lock up front in a fixed order. First the snapshot
+-- locks of the users with back-dated entries, by user_id. Then the batch's
+-- deltas are summed per account and upserted by (user_id, account_name).
+-- Only then are documents, journal entries and ledger entries inserted.
+-- The trigger's lock is already held at that point, and no balance row is
+-- locked later in the transaction.
+
+create or replace function save_document_results(items jsonb)
+returns jsonb
+language plpgsql
+as $$
+declare
+  item jsonb;
+  ledger jsonb;
+  doc documents%rowtype;
+  je journal_entries%rowtype;
+  le ledger_entries%rowtype;
+  job document_jobs%rowtype;
+  balance record;
+  v_user_id uuid;
+  v_document_id documents.id%type;
+  v_journal_entry_id journal_entries.id%type;
+  v_ledger_entry_id ledger_entries.id%type;
+  v_ledger_entry_ids jsonb;
+  v_debit_ledger_entry_id ledger_entries.id%type;
+  v_credit_ledger_entry_id ledger_entries.id%type;
+  results jsonb := '[]'::jsonb;
+begin
+  for v_user_id in
+    select distinct l.user_id
+    from jsonb_array_elements(items) i,
+         jsonb_populate_recordset(null::ledger_entries, i.value->'ledger_entries') l
+    where l.entry_date < date_trunc('month', current_date)
+    order by l.user_id
+  loop
+    perform lock_ledger_snapshots(v_user_id);
+  end loop;
+
+  for balance in
+    select l.user_id, l.account_name, sum(ledger_delta(l.transaction_type, l.amount)) as delta
+    from jsonb_array_elements(items) i,
+         jsonb_populate_recordset(null::ledger_entries, i.value->'ledger_entries') l
+    group by l.user_id, l.account_name
+    order by l.user_id, l.account_name
+  loop
+    insert into ledger_balances as lb (user_id, account_name, balance_amount, last_updated_at)
+    values (balance.user_id, balance.account_name, balance.delta, now())
+    on conflict (user_id, account_name) do update
+      set balance_amount = lb.balance_amount + excluded.balance_amount,
+          last_updated_at = excluded.last_updated_at;
+  end loop;
+
+  for item in select value from jsonb_array_elements(items) loop
+    doc := jsonb_populate_record(null::documents, item->'document');
+    insert into documents (user_id, job_id, file_url, document_type, extracted_data, file_hash, text_hash)
+    values (doc.user_id, doc.job_id, doc.file_url, doc.document_type, doc.extracted_data, doc.file_hash, doc.text_hash)
+    returning id into v_document_id;
+
+    je := jsonb_populate_record(null::journal_entries, item->'journal_entry');
+    insert into journal_entries (user_id, entry_date, source_id, account_debited, account_credited, amount, description)
+    values (je.user_id, je.entry_date, v_document_id, je.account_debited, je.account_credited, je.amount, je.description)
+    returning id into v_journal_entry_id;
+
+    v_ledger_entry_ids := '[]'::jsonb;
+    v_debit_ledger_entry_id := null;
+    v_credit_ledger_entry_id := null;
+    for ledger in select value from jsonb_array_elements(item->'ledger_entries') loop
+      le := jsonb_populate_record(null::ledger_entries, ledger);
+      -- the balance row was upserted (and locked) above
+      insert into ledger_entries (user_id, journal_entry_id, ledger_balance_id, account_name, transaction_type, amount, entry_date, description)
+      values (
+        le.user_id, v_journal_entry_id,
+        (select lb.id from ledger_balances lb where lb.user_id = le.user_id and lb.account_name = le.account_name),
+        le.account_name, le.transaction_type, le.amount, le.entry_date, le.description
+      )
+      returning id into v_ledger_entry_id;
+      v_ledger_entry_ids := v_ledger_entry_ids || to_jsonb(v_ledger_entry_id);
+      if le.transaction_type = 'debit' then
+        v_debit_ledger_entry_id := coalesce(v_debit_ledger_entry_id, v_ledger_entry_id);
+      else
+        v_credit_ledger_entry_id := coalesce(v_credit_ledger_entry_id, v_ledger_entry_id);
+      end if;
+    end loop;
+
+    job := jsonb_populate_record(null::document_jobs, jsonb_build_object('id', item->'job_id'));
+    update document_jobs
+    set status = 'parsed',
+        document_id = v_document_id,
+        journal_entry_id = v_journal_entry_id,
+        debit_ledger_entry_id = v_debit_ledger_entry_id,
+        credit_ledger_entry_id = v_credit_ledger_entry_id,
+        last_run_at = now()
+    where id = job.id;
+
+    results := results || jsonb_build_object(
+      'job_id', item->>'job_id',
+      'document_id', v_document_id,
+      'journal_entry_id', v_journal_entry_id,
+      'ledger_entry_ids', v_ledger_entry_ids
+    );
+  end loop;
+
+  return results;
+end;
+$$;
@@ -0,0 +1,180 @@
+-- One document per PDF per user. find_duplicate_document only sees
+-- documents that are already saved, so two requests carrying the same file
+-- could both pass the lookup and both be written, posting the ledger twice.
+-- (user_id, file_hash) is now unique, and save_document_results resolves a
+-- conflict instead of failing the whole call.
+
+-- Existing copies keep their rows but lose their file fingerprint, so the
+-- earliest document of each file stays the one duplicates resolve to.
+update documents d
+set file_hash = null
+from (
+  select id, row_number() over (partition by user_id, file_hash order by id) as copy
+  from documents
+  where file_hash is not null
+) copies
+where d.id = copies.id and copies.copy > 1;
+
+create unique index if not exists documents_user_file_hash_key
+  on documents (user_id, file_hash) where file_hash is not null;
+drop index if exists documents_user_file_hash_idx;
+
+-- Documents are now inserted first, in (user_id, file_hash) order, so two
+-- calls saving the same files wait on each other in the same order. An item
+-- whose file is already saved, by an earlier call, a concurrent one or an
+-- earlier item of this one, writes nothing else: no balances, entries or
+-- job update. It is returned as
+--   {"job_id", "duplicate_of": {"document_id", "job": <parsed document_jobs row or null>}}
+-- and the caller applies its duplicate policy. The remaining locks are
+-- then taken in the order of 007: snapshot locks, then balance rows.
+
+create or replace function save_document_results(items jsonb)
+returns jsonb
+language plpgsql
+as $$
+declare
+  entry record;
+  ledger jsonb;
+  doc documents%rowtype;
+  je journal_entries%rowtype;
+  le ledger_entries%rowtype;
+  job document_jobs%rowtype;
+  balance record;
+  v_user_id uuid;
+  v_document_id documents.id%type;
+  v_journal_entry_id journal_entries.id%type;
+  v_ledger_entry_id ledger_entries.id%type;
+  v_ledger_entry_ids jsonb;
+  v_debit_ledger_entry_id ledger_entries.id%type;
+  v_credit_ledger_entry_id ledger_entries.id%type;
+  -- item ordinality -> id of the document it saved, or of the one it duplicates
+  v_document_ids jsonb := '{}'::jsonb;
+  v_duplicates jsonb := '{}'::jsonb;
+  v_saved jsonb := '{}'::jsonb;
+  v_existing_job jsonb;
+  results jsonb := '[]'::jsonb;
+begin
+  for entry in
+    select i.value, i.ord
+    from jsonb_array_elements(items) with ordinality i(value, ord)
+    order by i.value->'document'->>'user_id', i.value->'document'->>'file_hash' nulls last, i.ord
+  loop
+    doc := jsonb_populate_record(null::documents, entry.value->'document');
+    v_document_id := null;
+    insert into documents (user_id, job_id, file_url, document_type, extracted_data, file_hash, text_hash)
+    values (doc.user_id, doc.job_id, doc.file_url, doc.document_type, doc.extracted_data, doc.file_hash, doc.text_hash)
+    on conflict (user_id, file_hash) where file_hash is not null do nothing
+    returning id into v_document_id;
+
+    if v_document_id is null then
+      select d.id into v_document_id
+      from documents d
+      where d.user_id = doc.user_id and d.file_hash = doc.file_hash;
+      v_duplicates := v_duplicates || jsonb_build_object(entry.ord::text, true);
+    end if;
+    v_document_ids := v_document_ids || jsonb_build_object(entry.ord::text, v_document_id);
+  end loop;
+
+  for v_user_id in
+    select distinct l.user_id
+    from jsonb_array_elements(items) with ordinality i(value, ord),
+         jsonb_populate_recordset(null::ledger_entries, i.value->'ledger_entries') l
+    where l.entry_date < date_trunc('month', current_date)
+      and not v_duplicates ? i.ord::text
+    order by l.user_id
+  loop
+    perform lock_ledger_snapshots(v_user_id);
+  end loop;
+
+  for balance in
+    select l.user_id, l.account_name, sum(ledger_delta(l.transaction_type, l.amount)) as delta
+    from jsonb_array_elements(items) with ordinality i(value, ord),
+         jsonb_populate_recordset(null::ledger_entries, i.value->'ledger_entries') l
+    where not v_duplicates ? i.ord::text
+    group by l.user_id, l.account_name
+    order by l.user_id, l.account_name
+  loop
+    insert into ledger_balances as lb (user_id, account_name, balance_amount, last_updated_at)
+    values (balance.user_id, balance.account_name, balance.delta, now())
+    on conflict (user_id, account_name) do update
+      set balance_amount = lb.balance_amount + excluded.balance_amount,
+          last_updated_at = excluded.last_updated_at;
+  end loop;
+
+  for entry in select i.value, i.ord from jsonb_array_elements(items) with ordinality i(value, ord) loop
+    if v_duplicates ? entry.ord::text then
+      continue;
+    end if;
+    doc := jsonb_populate_record(null::documents, jsonb_build_object('id', v_document_ids->entry.ord::text));
+    v_document_id := doc.id;
+
+    je := jsonb_populate_record(null::journal_entries, entry.value->'journal_entry');
+    insert into journal_entries (user_id, entry_date, source_id, account_debited, account_credited, amount, description)
+    values (je.user_id, je.entry_date, v_document_id, je.account_debited, je.account_credited, je.amount, je.description)
+    returning id into v_journal_entry_id;
+
+    v_ledger_entry_ids := '[]'::jsonb;
+    v_debit_ledger_entry_id := null;
+    v_credit_ledger_entry_id := null;
+    for ledger in select value from jsonb_array_elements(entry.value->'ledger_entries') loop
+      le := jsonb_populate_record(null::ledger_entries, ledger);
+      -- the balance row was upserted (and locked) above
+      insert into ledger_entries (user_id, journal_entry_id, ledger_balance_id, account_name, transaction_type, amount, entry_date, description)
+      values (
+        le.user_id, v_journal_entry_id,
+        (select lb.id from ledger_balances lb where lb.user_id = le.user_id and lb.account_name = le.account_name),
+        le.account_name, le.transaction_type, le.amount, le.entry_date, le.description
+      )
+      returning id into v_ledger_entry_id;
+      v_ledger_entry_ids := v_ledger_entry_ids || to_jsonb(v_ledger_entry_id);
+      if le.transaction_type = 'debit' then
+        v_debit_ledger_entry_id := coalesce(v_debit_ledger_entry_id, v_ledger_entry_id);
+      else
+        v_credit_ledger_entry_id := coalesce(v_credit_ledger_entry_id, v_ledger_entry_id);
+      end if;
+    end loop;
+
+    job := jsonb_populate_record(null::document_jobs, jsonb_build_object('id', entry.value->'job_id'));
+    update document_jobs
+    set status = 'parsed',
+        document_id = v_document_id,
+        journal_entry_id = v_journal_entry_id,
+        debit_ledger_entry_id = v_debit_ledger_entry_id,
+        credit_ledger_entry_id = v_credit_ledger_entry_id,
+        last_run_at = now()
+    where id = job.id;
+
+    v_saved := v_saved || jsonb_build_object(entry.ord::text, jsonb_build_object(
+      'job_id', entry.value->>'job_id',
+      'document_id', v_document_id,
+      'journal_entry_id', v_journal_entry_id,
+      'ledger_entry_ids', v_ledger_entry_ids,
+      'debit_ledger_entry_id', v_debit_ledger_entry_id,
+      'credit_ledger_entry_id', v_credit_ledger_entry_id
+    ));
+  end loop;
+
+  -- duplicates are resolved last, so one that repeats an earlier item of
+  -- this call sees that item's job already parsed
+  for entry in select i.value, i.ord from jsonb_array_elements(items) with ordinality i(value, ord) loop
+    if not v_duplicates ? entry.ord::text then
+      results := results || (v_saved->entry.ord::text);
+      continue;
+    end if;
+    doc := jsonb_populate_record(null::documents, jsonb_build_object('id', v_document_ids->entry.ord::text));
+    select to_jsonb(j) into v_existing_job
+    from (
+      select id, document_id, journal_entry_id, debit_ledger_entry_id, credit_ledger_entry_id
+      from document_jobs
+      where document_id = doc.id and status = 'parsed'
+      limit 1
+    ) j;
+    results := results || jsonb_build_object(
+      'job_id', entry.value->>'job_id',
+      'duplicate_of', jsonb_build_object('document_id', doc.id, 'job', v_existing_job)
+    );
+  end loop;
+
+  return results;
+end;
+$$;
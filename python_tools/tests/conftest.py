@@ -0,0 +1,63 @@
+"""
+Shared fixtures. Tests run from python_tools/:
+
+    python -m pytest -q
+
+Nothing here talks to Supabase or an LLM: the Supabase client is the real
+pinned supabase-py client with its REST session routed to an in-process
+handler, so query building is exercised exactly as in production.
+"""
+import json
+import os
+import sys
+
+import httpx
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# set before the api modules load their settings; .env does not override them
+os.environ.setdefault("SUPABASE_URL", "http://supabase.test")
+os.environ.setdefault("SUPABASE_KEY", "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoiYW5vbiJ9.test")
+os.environ["LLM_CACHE_ENABLED"] = "false"
+os.environ["LATEX_CACHE_ENABLED"] = "false"
+
+from postgrest.utils import SyncClient
+from supabase import create_client
+
+
+class FakeRest:
+    """
+    Records the REST requests a client sends and answers each with the
+    next queued JSON body (an empty list once the queue runs out), or with
+    what respond(request) returns when it is set
+    """
+    def __init__(self):
+        self.requests = []
+        self.responses = []
+        self.respond = None
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if self.respond is not None:
+            body = self.respond(request)
+        else:
+            body = self.responses.pop(0) if self.responses else []
+        return httpx.Response(200, content=json.dumps(body), headers={"content-type": "application/json"})
+
+
+@pytest.fixture
+def fake_rest():
+    return FakeRest()
+
+
+@pytest.fixture
+def supabase_client(fake_rest):
+    client = create_client(os.environ["SUPABASE_URL"], os.environ["SUPABASE_KEY"])
+    session = client.postgrest.session
+    client.postgrest.session = SyncClient(
+        base_url=session.base_url,
+        headers=session.headers,
+        transport=httpx.MockTransport(fake_rest)
+    )
+    return client
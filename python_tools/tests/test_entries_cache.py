@@ -0,0 +1,39 @@
+from api.entries_cache import EntriesCache
+
+
+def test_invalidation_drops_entries_and_blocks_stale_writes():
+    cache = EntriesCache(max_bytes=1024, ttl=60)
+    generation = cache.generation("user-1")
+    cache.set("user-1", "page-1", b"[1]", generation)
+    cache.set("user-2", "page-1", b"[2]", cache.generation("user-2"))
+
+    # a read that started before the invalidation finishes after it
+    stale_generation = cache.generation("user-1")
+    cache.invalidate_user("user-1")
+    cache.set("user-1", "page-2", b"[old]", stale_generation)
+
+    assert cache.get("user-1", "page-1") is None
+    assert cache.get("user-1", "page-2") is None
+    assert cache.get("user-2", "page-1") == b"[2]"
+    assert cache.counters["stale_writes_skipped"] == 1
+
+    cache.set("user-1", "page-2", b"[new]", cache.generation("user-1"))
+    assert cache.get("user-1", "page-2") == b"[new]"
+
+
+def test_evicts_least_recently_used_past_the_byte_budget():
+    cache = EntriesCache(max_bytes=8, ttl=60)
+    cache.set("user-1", "a", b"aaaa", 0)
+    cache.set("user-1", "b", b"bbbb", 0)
+    cache.get("user-1", "a")
+    cache.set("user-1", "c", b"cccc", 0)
+
+    assert cache.get("user-1", "b") is None
+    assert cache.get("user-1", "a") == b"aaaa"
+    assert cache.stats()["bytes"] == 8
+
+
+def test_expired_entries_miss():
+    cache = EntriesCache(max_bytes=1024, ttl=0)
+    cache.set("user-1", "a", b"[]", 0)
+    assert cache.get("user-1", "a") is None
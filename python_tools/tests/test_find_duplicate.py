@@ -0,0 +1,48 @@
+import asyncio
+
+from api.document_routes.process_document.tools import find_duplicate
+from api.document_routes.process_document.tools.find_duplicate import find_duplicate_document
+
+
+def lookup(monkeypatch, client, fingerprint):
+    monkeypatch.setattr(find_duplicate, "get_supabase", lambda: client)
+    return asyncio.run(find_duplicate_document("user-1", fingerprint))
+
+
+def test_matches_on_file_or_text_hash(monkeypatch, supabase_client, fake_rest):
+    fake_rest.responses = [
+        [{"id": 7, "job_id": "job-a", "file_url": "https://x/a.pdf", "document_type": "purchase_invoices"}],
+        [{"id": "job-a", "document_id": 7, "journal_entry_id": 3,
+          "debit_ledger_entry_id": 4, "credit_ledger_entry_id": 5}]
+    ]
+
+    result = lookup(monkeypatch, supabase_client, {"file_hash": "f00d", "text_hash": "beef"})
+
+    documents = fake_rest.requests[0]
+    assert documents.url.path == "/rest/v1/documents"
+    assert documents.url.params["user_id"] == "eq.user-1"
+    assert documents.url.params["or"] == "(file_hash.eq.f00d,text_hash.eq.beef)"
+    assert documents.url.params["limit"] == "1"
+    jobs = fake_rest.requests[1]
+    assert jobs.url.params["document_id"] == "eq.7"
+    assert jobs.url.params["status"] == "eq.parsed"
+    assert result["document"]["id"] == 7
+    assert result["job"]["journal_entry_id"] == 3
+
+
+def test_without_text_hash_matches_file_hash_only(monkeypatch, supabase_client, fake_rest):
+    result = lookup(monkeypatch, supabase_client, {"file_hash": "f00d", "text_hash": None})
+
+    assert fake_rest.requests[0].url.params["or"] == "(file_hash.eq.f00d)"
+    # no document, so no job lookup
+    assert len(fake_rest.requests) == 1
+    assert result is None
+
+
+def test_document_without_parsed_job(monkeypatch, supabase_client, fake_rest):
+    fake_rest.responses = [[{"id": 7, "job_id": "job-a", "file_url": "u", "document_type": "expense_bills"}], []]
+
+    result = lookup(monkeypatch, supabase_client, {"file_hash": "f00d", "text_hash": "beef"})
+
+    assert result["document"]["id"] == 7
+    assert result["job"] is None
@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+
+from api.document_routes.process_document import job_queue as job_queue_module
+from api.document_routes.process_document.job_queue import DocumentJob, DocumentJobQueue
+
+
+@pytest.fixture
+def queue(monkeypatch, supabase_client):
+    monkeypatch.setattr(job_queue_module, "get_supabase", lambda: supabase_client)
+    return DocumentJobQueue(concurrency=1, max_size=10, drain_timeout=1, stale_after=0.3, sweep_interval=60)
+
+
+def test_sweep_interval_is_bounded_by_stale_after(queue):
+    assert queue.sweep_interval == pytest.approx(0.1)
+
+
+def test_heartbeat_refreshes_only_held_unfinished_jobs(queue, fake_rest):
+    async def scenario():
+        with queue.holding(["job-b", "job-a"]):
+            await queue.heartbeat()
+        await queue.heartbeat()
+
+    asyncio.run(scenario())
+
+    assert len(fake_rest.requests) == 1
+    request = fake_rest.requests[0]
+    assert request.method == "PATCH"
+    assert request.url.params["id"] == "in.(job-a,job-b)"
+    assert request.url.params["status"] == "in.(pending,in_progress)"
+
+
+def test_recovery_claims_expired_jobs_but_not_held_ones(queue, fake_rest):
+    stale = [
+        {"id": "job-dead", "user_id": "u", "file_url": "https://x/a.pdf", "status": "in_progress"},
+        {"id": "job-ours", "user_id": "u", "file_url": "https://x/b.pdf", "status": "in_progress"}
+    ]
+    fake_rest.responses = [stale, [stale[0]]]
+
+    async def scenario():
+        queue._queue = asyncio.Queue(maxsize=queue.max_size)
+        queue._accepting = True
+        with queue.holding(["job-ours"]):
+            return await queue.recover_stuck_jobs()
+
+    assert asyncio.run(scenario()) == 1
+
+    lookup, claim = fake_rest.requests
+    assert lookup.url.params["limit"] == "10"
+    assert lookup.url.params["last_run_at"].startswith("lt.")
+    assert claim.url.params["id"] == "eq.job-dead"
+    assert claim.url.params["status"] == "eq.in_progress"
+    # the claim re-checks the lease, so a late heartbeat of its owner wins
+    assert claim.url.params["last_run_at"] == lookup.url.params["last_run_at"]
+    assert queue._queue.get_nowait() == DocumentJob("https://x/a.pdf", "job-dead", "u")
+
+
+def test_running_queue_reclaims_jobs_without_a_restart(queue, fake_rest, monkeypatch):
+    """
+    A job orphaned after start (say by another process that crashed) is
+    picked up by the periodic sweep
+    """
+    ran = []
+    orphaned = {"id": "job-orphan", "user_id": "u", "file_url": "https://x/a.pdf", "status": "in_progress"}
+    sweeps = {"lookups": 0}
+
+    def respond(request):
+        if request.method == "GET":
+            sweeps["lookups"] += 1
+            # nothing is stale at start; the orphan shows up on a later sweep
+            return [orphaned] if sweeps["lookups"] == 3 else []
+        if request.url.params.get("id") == "eq.job-orphan":
+            return [orphaned]
+        return []
+    fake_rest.respond = respond
+
+    async def run_pipeline(document_url, job_id, user_id):
+        ran.append(job_id)
+    monkeypatch.setattr(job_queue_module, "run_pipeline", run_pipeline)
+
+    async def scenario():
+        await queue.start()
+        await asyncio.sleep(0.5)
+        await queue.drain()
+
+    asyncio.run(scenario())
+
+    assert ran == ["job-orphan"]
+    assert queue.counters["recovered"] == 1
+    assert queue.counters["sweeps"] >= 2
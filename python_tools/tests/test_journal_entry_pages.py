@@ -0,0 +1,76 @@
+import asyncio
+import base64
+import json
+
+import pytest
+from fastapi import HTTPException
+
+from api.user_routes import journal_entry_pages as pages
+from api.user_routes.journal_entry_pages import decode_cursor, encode_cursor, fetch_entries_page, select_columns
+
+
+def raw_cursor(value) -> str:
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip("=")
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor({"entry_date": "2024-03-01", "id": 42})) == ("2024-03-01", 42)
+    entry_id = "0B5E3F9C-8D4A-4C5B-9E6F-1A2B3C4D5E6F"
+    assert decode_cursor(encode_cursor({"entry_date": "2024-03-01", "id": entry_id})) == ("2024-03-01", entry_id.lower())
+
+
+@pytest.mark.parametrize("cursor", [
+    "not a cursor",
+    raw_cursor({"entry_date": "2024-03-01", "id": 1}),
+    raw_cursor(["2024-02-30", 1]),
+    raw_cursor(["2024-03-01T00:00", 1]),
+    raw_cursor(["2024-03-01", True]),
+    raw_cursor(["2024-03-01", 1.5]),
+    # would otherwise widen the or= filter
+    raw_cursor(["2024-03-01", "1),user_id.neq.x"]),
+])
+def test_rejects_foreign_cursors(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor)
+    assert error.value.status_code == 400
+
+
+def test_select_columns():
+    assert select_columns(None) == "*"
+    # duplicates collapse and the keyset columns are always added
+    assert select_columns("amount, description,amount") == "amount,description,entry_date,id"
+    with pytest.raises(HTTPException) as error:
+        select_columns("amount,password")
+    assert error.value.status_code == 400
+    assert "password" in error.value.detail
+
+
+def test_page_continues_after_the_cursor(monkeypatch, supabase_client, fake_rest):
+    monkeypatch.setattr(pages, "get_supabase", lambda: supabase_client)
+    fake_rest.responses = [[
+        {"id": 9, "entry_date": "2024-02-28"},
+        {"id": 8, "entry_date": "2024-02-27"},
+        {"id": 7, "entry_date": "2024-02-27"}
+    ]]
+
+    cursor = encode_cursor({"entry_date": "2024-03-01", "id": 10})
+    rows, next_cursor = asyncio.run(fetch_entries_page("user-1", 2, cursor, columns="id,entry_date"))
+
+    params = fake_rest.requests[0].url.params
+    assert params["user_id"] == "eq.user-1"
+    assert params["or"] == "(entry_date.lt.2024-03-01,and(entry_date.eq.2024-03-01,id.lt.10))"
+    assert params.get_list("order") == ["entry_date.desc,id.desc"]
+    assert params["limit"] == "3"
+    assert [row["id"] for row in rows] == [9, 8]
+    assert decode_cursor(next_cursor) == ("2024-02-27", 8)
+
+
+def test_last_page_has_no_cursor(monkeypatch, supabase_client, fake_rest):
+    monkeypatch.setattr(pages, "get_supabase", lambda: supabase_client)
+    fake_rest.responses = [[{"id": 1, "entry_date": "2024-01-01"}]]
+
+    rows, next_cursor = asyncio.run(fetch_entries_page("user-1", 2))
+
+    assert "or" not in fake_rest.requests[0].url.params
+    assert len(rows) == 1
+    assert next_cursor is None
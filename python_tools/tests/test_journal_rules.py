@@ -0,0 +1,41 @@
+import pytest
+
+from api.document_routes.process_document.tools.journal_rules import DEFAULT_CHART_OF_ACCOUNTS, JournalRules
+
+
+@pytest.fixture
+def rules():
+    return JournalRules(DEFAULT_CHART_OF_ACCOUNTS)
+
+
+@pytest.mark.parametrize("document_type, data, debit, credit, amount", [
+    ("purchase_invoices", {"vendor_name": "ACME", "total_amount": "1,180.00", "payment_mode": "UPI"},
+     "Purchases A/c", "Bank A/c", 1180.0),
+    ("purchase_invoices", {"vendor_name": "ACME", "total_amount": 500, "payment_mode": None},
+     "Purchases A/c", "ACME A/c", 500),
+    # payment terms like "Net 30" are a credit sale
+    ("sales_invoices", {"customer_name": "Globex", "total_amount": 900, "payment_terms": "Net 30"},
+     "Globex A/c", "Sales A/c", 900),
+    ("cash_receipts", {"payer_name": "Initech", "amount": 250, "payment_mode": "cash"},
+     "Cash A/c", "Initech A/c", 250),
+    ("expense_bills", {"expense_category": "Travel", "amount": 75, "payment_mode": "card"},
+     "Travel Expenses A/c", "Bank A/c", 75),
+    ("bank_transactions", {"description": "Monthly rental payment", "debit_amount": 1200, "credit_amount": 0},
+     "Rent A/c", "Bank A/c", 1200),
+])
+def test_rule_entries(rules, document_type, data, debit, credit, amount):
+    entry, reason = rules.journal_entry(document_type, data)
+    assert reason is None
+    assert (entry["account_debited"], entry["account_credited"], entry["amount"]) == (debit, credit, amount)
+
+
+@pytest.mark.parametrize("document_type, data, reason", [
+    ("unknown_type", {}, "no rule for document type"),
+    ("purchase_invoices", {"vendor_name": "ACME", "total_amount": 10, "payment_mode": "barter"}, "unrecognised payment mode"),
+    ("cash_payments", {"payee_name": "ACME", "amount": -5}, "amount missing or not positive"),
+    # "rent" must not match inside "current"
+    ("bank_transactions", {"description": "Current account sweep", "debit_amount": 10}, "no counter-account for bank transaction"),
+])
+def test_undecided_documents_fall_back_to_the_llm(rules, document_type, data, reason):
+    assert rules.journal_entry(document_type, data) == (None, reason)
+    assert rules.stats()["fallback_reasons"] == {reason: 1}
@@ -0,0 +1,52 @@
+import asyncio
+
+import pytest
+
+from api.document_routes.process_document.tools.llm_gateway import AdaptiveLimiter, LLMQueueTimeout
+
+
+def limiter(**overrides):
+    settings = {"initial": 2, "minimum": 1, "maximum": 4, "target_latency": 10, "queue_timeout": 5}
+    settings.update(overrides)
+    return AdaptiveLimiter(**settings)
+
+
+def test_grows_one_slot_per_window_of_fast_completions():
+    gate = limiter()
+
+    async def complete(count):
+        for _ in range(count):
+            await gate.acquire()
+            gate.release(0.1, ok=True)
+
+    # 2 -> 2.5 -> 2.9 -> 3.24
+    asyncio.run(complete(3))
+    assert int(gate.limit) == 3
+    asyncio.run(complete(10))
+    assert int(gate.limit) == 4
+
+
+def test_halves_once_per_window_on_overload():
+    gate = limiter(initial=4)
+    for _ in range(3):
+        gate.in_flight += 1
+        gate.release(30, ok=True)
+    assert int(gate.limit) == 2
+    assert gate.counters["slow"] == 3
+    assert gate.counters["decreases"] == 1
+
+
+def test_queued_callers_time_out():
+    gate = limiter(initial=1, queue_timeout=0.05)
+
+    async def scenario():
+        await gate.acquire()
+        with pytest.raises(LLMQueueTimeout):
+            await gate.acquire()
+        gate.release(0.1, ok=True)
+        # the timed-out waiter gave up its place
+        await gate.acquire()
+
+    asyncio.run(scenario())
+    assert gate.counters["queue_timeouts"] == 1
+    assert gate.stats()["queued"] == 0
@@ -0,0 +1,61 @@
+import asyncio
+import json
+
+import pytest
+
+from api.document_routes.process_document.tools import llm_cache, model_tiers
+from api.document_routes.process_document.tools.llm_cache import LLMCache
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = LLMCache(memory_entries=16, disk_path=None, disk_max_bytes=0)
+    monkeypatch.setattr(llm_cache, "llm_cache", cache)
+    monkeypatch.setenv("LLM_MODELS_TEST_STAGE", "small,large")
+    monkeypatch.setenv("LLM_ESCALATE_BELOW_TEST_STAGE", "0.7")
+    return cache
+
+
+def check(reply):
+    if "value" not in reply:
+        return "value is missing", None
+    return None, reply["confidence"]
+
+
+def run(replies, calls):
+    async def call(model):
+        calls.append(model)
+        reply = replies[model]
+        if isinstance(reply, Exception):
+            raise reply
+        return dict(reply)
+
+    return asyncio.run(model_tiers.tiered_completion("test_stage", "1", "payload", call, check))
+
+
+def test_only_the_accepted_answer_is_cached(cache):
+    replies = {"small": {"value": 1, "confidence": 0.2}, "large": {"value": 2, "confidence": 0.9}}
+    calls = []
+    assert run(replies, calls) == replies["large"]
+    assert calls == ["small", "large"]
+    assert cache.counters["writes"] == 1
+
+    # the weak small-model answer is asked for again, the accepted one is served
+    calls.clear()
+    assert run(replies, calls) == replies["large"]
+    assert calls == ["small"]
+    assert cache.counters["writes"] == 1
+
+
+def test_malformed_answers_are_not_cached(cache):
+    calls = []
+    replies = {"small": json.JSONDecodeError("bad", "", 0), "large": {"confidence": 0.9}}
+    # the last tier's reply is returned even though it fails the check
+    assert run(replies, calls) == {"confidence": 0.9}
+    assert cache.counters["writes"] == 0
+
+    replies = {"small": {"value": 1, "confidence": 0.8}, "large": {"value": 2, "confidence": 0.9}}
+    calls.clear()
+    assert run(replies, calls) == replies["small"]
+    assert calls == ["small"]
+    assert cache.counters["writes"] == 1
@@ -0,0 +1,56 @@
+from api.document_routes.process_document.tools.extract_data import req_formats
+from api.document_routes.process_document.tools.pattern_extractor import PatternExtractor
+
+INVOICE = """ACME Supplies Pvt Ltd
+Tax Invoice
+Invoice No: INV-2024-017
+Invoice Date: 05/03/2024
+Vendor: ACME Supplies
+
+Item            Qty   Rate     Amount
+Printer paper   10    250.00   2,500.00
+Toner           2     1,200.00 2,400.00
+
+Tax: 882.00
+Grand Total: Rs. 5,782.00
+Payment Mode: UPI
+"""
+
+
+def test_reads_labelled_fields_and_reconciled_items():
+    found = PatternExtractor(0.85).extract("purchase_invoices", INVOICE)
+
+    assert found["invoice_number"][0] == "INV-2024-017"
+    # numeric dates are read day first by default
+    assert found["date"][0] == "2024-03-05"
+    assert found["total_amount"][0] == 5782.0
+    assert found["payment_mode"][0] == "UPI"
+    items, confidence = found["items"]
+    assert [item["amount"] for item in items] == [2500.0, 2400.0]
+    # the items add up to the total less tax
+    assert confidence == 0.9
+
+
+def test_asks_the_llm_only_for_what_is_missing():
+    extractor = PatternExtractor(0.85)
+    terms = "".join(f"Term {i}: goods once sold will not be taken back.\n" for i in range(20))
+    text = INVOICE.replace("Rs. 5,782.00", "see attached") + "\n" + terms
+    found = extractor.extract("purchase_invoices", text)
+
+    missing = extractor.missing_fields("purchase_invoices", req_formats["purchase_invoices"], found)
+    assert "total_amount" in missing
+    assert "invoice_number" not in missing
+    # unreconciled items are not trusted
+    assert "items" in missing
+
+    context = extractor.context("purchase_invoices", missing, text)
+    assert "Tax: 882.00" in context
+    assert "Toner" in context
+    # only the lines around the missing fields' labels
+    assert "Term 19" not in context
+
+
+def test_nothing_missing_when_every_field_is_confident():
+    extractor = PatternExtractor(0.7)
+    found = extractor.extract("purchase_invoices", INVOICE)
+    assert extractor.missing_fields("purchase_invoices", req_formats["purchase_invoices"], found) == []
@@ -0,0 +1,99 @@
+import asyncio
+
+import pytest
+
+from api.document_routes.process_document import pipeline
+from api.document_routes.process_document import process_documents as batch
+from api.document_routes.process_document.process_document import DocumentRequest
+
+
+@pytest.fixture
+def stages(monkeypatch):
+    """
+    Stub every stage around process_documents; files are named by URL, so
+    http://x/a.pdf and http://x/a-copy.pdf carry the same file hash
+    """
+    calls = {"analysed": [], "saved": [], "jobs": {}}
+
+    async def update_in_db(item_id, updated_data, table_name):
+        calls["jobs"].setdefault(item_id, {}).update(updated_data)
+        return {"success": True}
+
+    async def extract_document(doc_url):
+        name = str(doc_url.url).rsplit("/", 1)[-1].replace("-copy", "")
+        return {"content": ["Invoice"], "total_pages": 1, "fingerprint": {"file_hash": name, "text_hash": None}}
+
+    async def resolve_duplicate(fingerprint, job_id, user_id):
+        return None
+
+    async def analyse_document(content, document_url, job_id, user_id, fingerprint):
+        calls["analysed"].append(job_id)
+        return {"validation": {"is_valid": True}}
+
+    async def build_result_item(analysis, job_id, user_id):
+        return {"job_id": job_id}
+
+    async def save_document_results(items):
+        calls["saved"].extend(item["job_id"] for item in items)
+        return {"success": True, "error": None, "data": [
+            {"job_id": item["job_id"], "document_id": f"doc-{item['job_id']}", "journal_entry_id": 1,
+             "ledger_entry_ids": [2, 3], "debit_ledger_entry_id": 2, "credit_ledger_entry_id": 3}
+            for item in items
+        ]}
+
+    for module in (batch, pipeline):
+        monkeypatch.setattr(module, "update_in_db", update_in_db)
+    for name, stub in [("extract_document", extract_document), ("resolve_duplicate", resolve_duplicate),
+                       ("analyse_document", analyse_document), ("build_result_item", build_result_item),
+                       ("save_document_results", save_document_results)]:
+        monkeypatch.setattr(batch, name, stub)
+    return calls
+
+
+def run_batch(*urls):
+    payload = batch.BatchRequest(documents=[
+        DocumentRequest(document_url=url, job_id=f"job-{i}") for i, url in enumerate(urls)
+    ])
+    response = asyncio.run(batch.process_documents(payload, {"id": "user-1"}))
+    return {result["job_id"]: result for result in response["results"]}
+
+
+def test_copies_in_a_batch_are_analysed_once(stages, monkeypatch):
+    monkeypatch.setattr(pipeline, "DUPLICATE_DOCUMENT_POLICY", "reuse")
+
+    results = run_batch("http://x/a.pdf", "http://x/b.pdf", "http://x/a-copy.pdf")
+
+    assert sorted(stages["analysed"]) == ["job-0", "job-1"]
+    assert sorted(stages["saved"]) == ["job-0", "job-1"]
+    assert results["job-2"]["status"] == "parsed"
+    assert results["job-2"]["duplicate_of"]["document_id"] == "doc-job-0"
+    assert stages["jobs"]["job-2"]["document_id"] == "doc-job-0"
+    assert stages["jobs"]["job-2"]["debit_ledger_entry_id"] == 2
+
+
+def test_copies_in_a_batch_are_flagged(stages, monkeypatch):
+    monkeypatch.setattr(pipeline, "DUPLICATE_DOCUMENT_POLICY", "flag")
+
+    results = run_batch("http://x/a.pdf", "http://x/a-copy.pdf")
+
+    assert stages["saved"] == ["job-0"]
+    assert results["job-1"]["status"] == "failed"
+    assert stages["jobs"]["job-1"]["status"] == "failed"
+
+
+def test_file_saved_concurrently_is_reused(stages, monkeypatch):
+    existing_job = {"id": "job-old", "document_id": "doc-old", "journal_entry_id": 9,
+                    "debit_ledger_entry_id": 10, "credit_ledger_entry_id": 11}
+
+    async def save_document_results(items):
+        return {"success": True, "error": None, "data": [
+            {"job_id": item["job_id"], "duplicate_of": {"document_id": "doc-old", "job": existing_job}}
+            for item in items
+        ]}
+    monkeypatch.setattr(batch, "save_document_results", save_document_results)
+    monkeypatch.setattr(pipeline, "DUPLICATE_DOCUMENT_POLICY", "off")
+
+    results = run_batch("http://x/a.pdf")
+
+    assert results["job-0"]["status"] == "parsed"
+    assert stages["jobs"]["job-0"]["document_id"] == "doc-old"
@@ -0,0 +1,55 @@
+import os
+import sqlite3
+
+from api.latex_routes.pdf_cache import LatexPdfCache
+from api.sqlite_store import ByteBoundedStore, open_db
+
+
+def test_store_evicts_least_recently_accessed(tmp_path):
+    evicted = []
+    store = ByteBoundedStore(open_db(str(tmp_path / "store.sqlite3")), "entries", 10, on_evict=evicted.append)
+    store.put("a", "aaaa", 4)
+    store.put("b", "bbbb", 4)
+    assert store.get("a") == "aaaa"
+    store.put("c", "cccc", 4)
+
+    assert evicted == ["b"]
+    assert store.get("b") is None
+    assert store.total_bytes == 8
+
+    # the running total survives a reopen and a replaced entry counts once
+    reopened = ByteBoundedStore(open_db(str(tmp_path / "store.sqlite3")), "entries", 10)
+    reopened.put("a", "aa", 2)
+    assert reopened.total_bytes == 6
+    assert reopened.count() == 2
+
+
+def test_pdf_cache_bounds_files_and_uploaded_urls(tmp_path):
+    cache = LatexPdfCache(str(tmp_path), max_bytes=8, url_max_bytes=40)
+    cache.put_pdf("one", b"12345")
+    cache.put_pdf("two", b"12345")
+    assert cache.get_pdf("one") is None
+    assert not os.path.exists(tmp_path / "one.pdf")
+    assert cache.get_pdf("two") == b"12345"
+
+    for key in ("one", "two", "three"):
+        cache.mark_uploaded(key, f"http://bucket.test/{key}.pdf")
+    assert cache.uploaded_url("one") is None
+    assert cache.uploaded_url("three") == "http://bucket.test/three.pdf"
+
+    stats = cache.stats()
+    assert (stats["files"], stats["evictions"]) == (1, 1)
+    assert (stats["uploaded"], stats["url_evictions"]) == (1, 2)
+
+
+def test_pdf_cache_drops_the_legacy_index(tmp_path):
+    db = sqlite3.connect(str(tmp_path / "index.sqlite3"))
+    db.execute("CREATE TABLE latex_pdfs (key TEXT PRIMARY KEY, size INTEGER NOT NULL, url TEXT, last_access REAL NOT NULL)")
+    db.execute("INSERT INTO latex_pdfs VALUES ('old', 3, 'http://bucket.test/old.pdf', 0)")
+    db.commit()
+    db.close()
+    (tmp_path / "old.pdf").write_bytes(b"pdf")
+
+    cache = LatexPdfCache(str(tmp_path), max_bytes=8, url_max_bytes=40)
+    assert not os.path.exists(tmp_path / "old.pdf")
+    assert cache.uploaded_url("old") is None
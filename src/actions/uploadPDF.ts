@@ -71,7 +71,7 @@ export async function uploadPDF(formData: FormData, uid: string) {
         }
 
         // Start processing in the background without waiting for it
-        fetch(`${process.env.NEXT_PUBLIC_PYTHON_BACKEND_URL}/api/document/process-document`, {
+        fetch(`${process.env.NEXT_PUBLIC_PYTHON_BACKEND_URL}/api/document/process-document?enqueue=true`, {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
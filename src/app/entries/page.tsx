@@ -69,7 +69,7 @@ export default function EntriesPage() {
 
       // Call the processing API
       const response = await fetch(
-        `${process.env.NEXT_PUBLIC_PYTHON_BACKEND_URL}/api/document/process-document`,
+        `${process.env.NEXT_PUBLIC_PYTHON_BACKEND_URL}/api/document/process-document?enqueue=true`,
         {
           method: "POST",
           headers: {
@@ -30,42 +30,21 @@ export default function LedgersPage() {
           return;
         }
 
-        // First get unique account names from ledger_entries
-        const { data: uniqueAccounts, error: uniqueAccountsError } =
-          await supabase
-            .from("ledger_entries")
-            .select("account_name")
-            .eq("user_id", session.user.id)
-            .order("account_name", { ascending: true });
-
-        if (uniqueAccountsError) throw uniqueAccountsError;
-
-        // Get unique account names by filtering duplicates
-        const uniqueAccountNames = Array.from(
-          new Set(uniqueAccounts?.map((entry) => entry.account_name))
-        ).map((account_name) => ({ account_name }));
-
-        // Get the corresponding balances
+        // ledger_balances holds one up-to-date row per account
         const { data: balances, error: balancesError } = await supabase
           .from("ledger_balances")
-          .select("*")
-          .eq("user_id", session.user.id);
+          .select("id, account_name, balance_amount, last_updated_at")
+          .eq("user_id", session.user.id)
+          .order("account_name", { ascending: true });
 
         if (balancesError) throw balancesError;
 
-        // Combine the data
-        const accounts = uniqueAccountNames.map((entry) => {
-          const balance = balances?.find(
-            (b) => b.account_name === entry.account_name
-          );
-          return {
-            account_name: entry.account_name,
-            balance_amount: balance?.balance_amount || 0,
-            last_updated_at:
-              balance?.last_updated_at || new Date().toISOString(),
-            ledger_balance_id: balance?.id || "",
-          };
-        });
+        const accounts = (balances || []).map((balance) => ({
+          account_name: balance.account_name,
+          balance_amount: balance.balance_amount,
+          last_updated_at: balance.last_updated_at,
+          ledger_balance_id: balance.id,
+        }));
 
         setLedgerAccounts(accounts);
       } catch (err) {
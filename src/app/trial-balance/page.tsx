@@ -50,53 +50,39 @@ export default function TrialBalancePage() {
         let calculatedTotalCredit = 0;
 
         if (appliedDate) {
-          const { data: uniqueAccounts, error: uniqueAccountsError } =
-            await supabase
-              .from("ledger_balances")
-              .select("account_name")
-              .eq("user_id", session.user.id);
-
-          if (uniqueAccountsError) throw uniqueAccountsError;
-
-          const accountBalances: { [key: string]: number } = {};
-
-          for (const account of uniqueAccounts || []) {
-            const { data: entries, error: entriesError } = await supabase
-              .from("ledger_entries")
-              .select("transaction_type, amount, entry_date")
-              .eq("user_id", session.user.id)
-              .eq("account_name", account.account_name)
-              .lte("entry_date", appliedDate);
-
-            if (entriesError) throw entriesError;
+          const response = await fetch(
+            `${process.env.NEXT_PUBLIC_PYTHON_BACKEND_URL}/api/user/trial-balance`,
+            {
+              method: "POST",
+              headers: {
+                "Content-Type": "application/json",
+                Authorization: `Bearer ${session.access_token}`,
+              },
+              body: JSON.stringify({ as_of_date: appliedDate }),
+            }
+          );
 
-            let netBalance = 0;
-            entries?.forEach((entry) => {
-              if (entry.transaction_type === "debit") {
-                netBalance += entry.amount;
-              } else {
-                netBalance -= entry.amount;
-              }
-            });
-            accountBalances[account.account_name] = netBalance;
-          }
+          if (!response.ok) throw new Error(await response.text());
 
-          Object.keys(accountBalances).forEach((account_name) => {
-            const balance = accountBalances[account_name];
-            const account: TrialBalanceAccount = {
-              account_name,
-              balance_amount: Math.abs(balance),
-              last_updated_at: new Date().toISOString(),
-            };
+          const { data } = await response.json();
+          const asOf = new Date(appliedDate).toISOString();
 
-            if (balance >= 0) {
-              calculatedDebitAccounts.push(account);
-              calculatedTotalDebit += balance;
-            } else {
-              calculatedCreditAccounts.push(account);
-              calculatedTotalCredit += Math.abs(balance);
-            }
-          });
+          calculatedDebitAccounts = data.debit.map(
+            (account: { account_name: string; balance_amount: number }) => ({
+              account_name: account.account_name,
+              balance_amount: account.balance_amount,
+              last_updated_at: asOf,
+            })
+          );
+          calculatedCreditAccounts = data.credit.map(
+            (account: { account_name: string; balance_amount: number }) => ({
+              account_name: account.account_name,
+              balance_amount: account.balance_amount,
+              last_updated_at: asOf,
+            })
+          );
+          calculatedTotalDebit = data.total_debit;
+          calculatedTotalCredit = data.total_credit;
         } else {
           const { data: balances, error: balancesError } = await supabase
             .from("ledger_balances")